@@ -2,33 +2,68 @@
 
 from fastapi import APIRouter, BackgroundTasks, HTTPException
 from app.services.recon_automation import ReconAutomation
-from app.schemas.automation import AutomationRequest, AutomationResponse, AutomationTaskStatus
+from app.services.recon_workflow import ReconWorkflow, ReconWorkflowError, NODES
+from app.services.task_store import TaskStore
+from app.schemas.automation import (
+    AutomationRequest, AutomationResponse, AutomationTaskStatus, ReconProfileRequest, ReconNodeInfo
+)
+from typing import Any, List, Optional
 import uuid
 import logging
 
 router = APIRouter()
 logger = logging.getLogger("bbrf")
 
-tasks = {}
+tasks = TaskStore("recon", AutomationTaskStatus)
 
 @router.post("/basic-recon", response_model=AutomationResponse)
 async def run_basic_recon(request: AutomationRequest, background_tasks: BackgroundTasks):
     task_id = str(uuid.uuid4())
-    background_tasks.add_task(run_recon_task, task_id, request.domain)
+    await tasks.save_async(
+        AutomationTaskStatus(task_id=task_id, status="in_progress"), request.domain,
+        params={"domain": request.domain, "max_staleness": request.max_staleness, "mode": request.mode}
+    )
+    background_tasks.add_task(run_recon_task, task_id, request.domain, request.max_staleness, request.mode)
     return AutomationResponse(task_id=task_id, message="Basic recon started")
 
-async def run_recon_task(task_id: str, domain: str):
+@router.post("/recon", response_model=AutomationResponse)
+async def run_recon_profile(request: ReconProfileRequest, background_tasks: BackgroundTasks):
+    profile = [step if isinstance(step, str) else step.model_dump(exclude_none=True) for step in request.profile]
     try:
-        tasks[task_id] = AutomationTaskStatus(task_id=task_id, status="in_progress")
-        result = await ReconAutomation.basic_recon(domain)
+        ReconWorkflow(profile)
+    except ReconWorkflowError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    task_id = str(uuid.uuid4())
+    await tasks.save_async(
+        AutomationTaskStatus(task_id=task_id, status="in_progress"), request.domain,
+        params={"domain": request.domain, "max_staleness": request.max_staleness, "mode": "sequential", "profile": profile}
+    )
+    # Profiles always run sequentially, whatever RECON_MODE is
+    background_tasks.add_task(run_recon_task, task_id, request.domain, request.max_staleness, "sequential", profile)
+    return AutomationResponse(task_id=task_id, message="Recon profile started")
+
+@router.get("/nodes", response_model=List[ReconNodeInfo])
+async def get_recon_nodes():
+    return [ReconNodeInfo(
+        name=node.name, inputs=node.inputs, outputs=node.outputs, concurrency=node.concurrency, timeout=node.timeout
+    ) for node in NODES.values()]
+
+@tasks.resumable
+async def run_recon_task(task_id: str, domain: str, max_staleness: Optional[int] = None, mode: Optional[str] = None,
+                         profile: Optional[List[Any]] = None):
+    try:
+        result = await ReconAutomation.basic_recon(
+            domain, max_staleness=max_staleness, mode=mode, task_id=task_id, profile=profile
+        )
         logger.info(f"Recon result for {domain}: {result}")
-        tasks[task_id] = AutomationTaskStatus(task_id=task_id, status="completed", result=result)
+        await tasks.save_async(AutomationTaskStatus(task_id=task_id, status="completed", result=result))
     except Exception as e:
         logger.exception(f"Error during basic recon for {domain}: {str(e)}")
-        tasks[task_id] = AutomationTaskStatus(task_id=task_id, status="failed", error=str(e))
+        await tasks.save_async(AutomationTaskStatus(task_id=task_id, status="failed", error=str(e)))
 
 @router.get("/task/{task_id}", response_model=AutomationTaskStatus)
 async def get_task_status(task_id: str):
-    if task_id not in tasks:
+    task = await tasks.get_async(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return tasks[task_id]
\ No newline at end of file
+    return task
\ No newline at end of file
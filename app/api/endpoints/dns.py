@@ -1,90 +1,84 @@
 # app/api/endpoints/dns.py
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Response, Request
+from typing import List, Literal, Optional
+import asyncio
 import logging
 import uuid
-import time
-import asyncio
 
-from app.schemas.dns import DNSResolutionCreate, DNSResolutionResponse, TaskResponse, TaskStatus
-from app.services.dns_resolver import DNSResolver
-from app.db.operations import get_subdomains, add_dns_resolutions, get_dns_resolutions, get_subdomains_with_resolutions
+from app.schemas.dns import DNSResolutionCreate, DNSResolutionResponse, TaskResponse, TaskStatus, ResolverStatus
+from app.services.dns_stage import DNSStage
+from app.services.resolver_pool import resolver_pool
+from app.services.checkpoint import Checkpoint
+from app.services.task_store import TaskStore
+from app.services.execution_governor import current_domain
+from app.api.pagination import ndjson_response, page_size, set_next_page
+from app.config import settings
+from app.db.async_operations import get_dns_resolution_rows, stream_dns_resolution_rows, get_subdomains_with_resolutions
 
 router = APIRouter()
 logger = logging.getLogger("bbrf")
 
-# In-memory task storage. In a production environment, use a proper task queue.
-tasks = {}
+tasks = TaskStore("dns_resolution", TaskStatus)
 
 @router.post("/resolve", response_model=TaskResponse)
 async def resolve_dns(domain: DNSResolutionCreate, background_tasks: BackgroundTasks):
     logger.info(f"Starting DNS resolution for domain: {domain.domain}")
     task_id = str(uuid.uuid4())
-    background_tasks.add_task(run_dns_resolution, task_id, domain.domain)
-    tasks[task_id] = TaskStatus(task_id=task_id, status="in_progress", progress=0)
+    await tasks.save_async(
+        TaskStatus(task_id=task_id, status="in_progress", progress=0), domain.domain,
+        params={"domain": domain.domain, "max_staleness": domain.max_staleness}
+    )
+    background_tasks.add_task(run_dns_resolution, task_id, domain.domain, domain.max_staleness)
     return TaskResponse(task_id=task_id)
 
-async def run_dns_resolution(task_id: str, domain: str):
+@tasks.resumable
+async def run_dns_resolution(task_id: str, domain: str, max_staleness: Optional[int] = None):
     try:
         logger.info(f"Running DNS resolution for task {task_id}, domain {domain}")
-        subdomains = get_subdomains(domain)
-        subdomain_list = [subdomain.subdomain for subdomain in subdomains]
-        total_subdomains = len(subdomain_list)
-        logger.info(f"Found {total_subdomains} subdomains for {domain}")
-
-        batch_size = 1000  # Process 1000 subdomains at a time
-        resolved_domains = []
-        total_added = 0
+        current_domain.set(domain)
+        checkpoint = await asyncio.to_thread(Checkpoint.load, task_id)
 
-        for i in range(0, total_subdomains, batch_size):
-            batch = subdomain_list[i:i+batch_size]
-            batch_resolved = await DNSResolver.resolve(batch)
-            resolved_domains.extend(batch_resolved)
+        def report_progress(done: int, total: int):
+            # Resolutions are only attached on completion to keep progress writes small
+            progress = min(99, int(done / total * 100))
+            tasks.save_soon(TaskStatus(task_id=task_id, status="in_progress", progress=progress))
 
-            for subdomain in subdomains[i:i+batch_size]:
-                subdomain_resolutions = [d for d in batch_resolved if d['host'] == subdomain.subdomain]
-                if subdomain_resolutions:
-                    added_count = add_dns_resolutions(subdomain.id, subdomain_resolutions)
-                    total_added += added_count
-
-            progress = min(100, int((i + len(batch)) / total_subdomains * 100))
-            tasks[task_id] = TaskStatus(task_id=task_id, status="in_progress", progress=progress, resolutions=resolved_domains)
-
-        logger.info(f"DNS resolution completed. Resolved {len(resolved_domains)} out of {total_subdomains} subdomains")
-        logger.info(f"Total DNS resolutions added to database: {total_added}")
-        tasks[task_id] = TaskStatus(task_id=task_id, status="completed", progress=100, resolutions=resolved_domains)
+        resolved_domains, _, wildcard_filter = await DNSStage.run(domain, max_staleness, checkpoint, report_progress)
+        await tasks.save_async(TaskStatus(task_id=task_id, status="completed", progress=100, resolutions=resolved_domains, wildcards=wildcard_filter.report()))
     except Exception as e:
         logger.exception(f"Error resolving DNS for {domain}: {str(e)}")
-        tasks[task_id] = TaskStatus(task_id=task_id, status="failed", error=str(e))
+        await tasks.save_async(TaskStatus(task_id=task_id, status="failed", error=str(e)))
 
 @router.get("/resolve/status/{task_id}", response_model=TaskStatus)
 async def get_resolution_status(task_id: str):
-    if task_id not in tasks:
+    task = await tasks.get_async(task_id)
+    if task is None:
         logger.warning(f"Task not found: {task_id}")
         raise HTTPException(status_code=404, detail="Task not found")
-    return tasks[task_id]
+    return task
 
 @router.get("/resolutions/{domain}", response_model=List[DNSResolutionResponse])
-async def get_domain_resolutions(domain: str):
+async def get_domain_resolutions(domain: str, request: Request, response: Response, after_id: Optional[int] = Query(None, ge=0),
+                                 limit: Optional[int] = Query(None, ge=1, le=settings.API_MAX_PAGE_SIZE),
+                                 output: Literal["json", "ndjson"] = Query("json", alias="format"),
+                                 unbounded: bool = Query(False, alias="all")):
     logger.info(f"Retrieving DNS resolutions for domain: {domain}")
-    resolutions = get_dns_resolutions(domain)
-    if not resolutions:
+    limit = page_size(limit, unbounded)
+    if output == "ndjson":
+        return ndjson_response(stream_dns_resolution_rows(domain, after_id, limit), DNSResolutionResponse, limit)
+    resolutions = await get_dns_resolution_rows(domain, after_id, limit)
+    if not resolutions and after_id is None:
         logger.warning(f"No DNS resolutions found for domain: {domain}")
         raise HTTPException(status_code=404, detail="No DNS resolutions found for this domain")
     logger.info(f"Retrieved {len(resolutions)} DNS resolutions for {domain}")
-    return [DNSResolutionResponse(
-        subdomain=resolution.subdomain.subdomain,
-        resolved_domain=resolution.resolved_domain,
-        ip_address=resolution.ip_address,
-        ttl=resolution.ttl,
-        created_at=resolution.created_at
-    ) for resolution in resolutions]
+    set_next_page(request, response, resolutions, limit)
+    return resolutions
 
 @router.get("/subdomains-with-resolutions/{domain}", response_model=List[DNSResolutionResponse])
 async def get_subdomains_with_dns_resolutions(domain: str):
     logger.info(f"Retrieving subdomains with DNS resolutions for domain: {domain}")
-    subdomains = get_subdomains_with_resolutions(domain)
+    subdomains = await get_subdomains_with_resolutions(domain)
     if not subdomains:
         logger.warning(f"No subdomains or DNS resolutions found for domain: {domain}")
         raise HTTPException(status_code=404, detail="No subdomains or DNS resolutions found for this domain")
@@ -101,18 +95,10 @@ async def get_subdomains_with_dns_resolutions(domain: str):
     logger.info(f"Retrieved {len(results)} subdomains with DNS resolutions for {domain}")
     return results
 
-async def cleanup_tasks():
-    while True:
-        await asyncio.sleep(3600)  # Run every hour
-        current_time = time.time()
-        tasks_to_remove = [
-            task_id for task_id, task in tasks.items()
-            if task.status in ["completed", "failed"] and current_time - task.timestamp > 86400  # 24 hours
-        ]
-        for task_id in tasks_to_remove:
-            del tasks[task_id]
-        logger.info(f"Cleaned up {len(tasks_to_remove)} completed or failed tasks")
-
-@router.on_event("startup")
-async def start_task_cleanup():
-    asyncio.create_task(cleanup_tasks())
\ No newline at end of file
+@router.get("/resolvers", response_model=List[ResolverStatus])
+async def get_resolver_pool_status():
+    logger.info("Retrieving DNS resolver pool status")
+    if settings.DNS_BACKEND != "native":
+        # Only the native backend records per-resolver outcomes
+        raise HTTPException(status_code=404, detail="Resolver stats are only collected with DNS_BACKEND=native")
+    return [ResolverStatus(**status) for status in resolver_pool.snapshot()]
@@ -0,0 +1,16 @@
+# app/api/endpoints/governor.py
+
+from fastapi import APIRouter
+from typing import List
+import logging
+
+from app.schemas.governor import ToolSlotStatus
+from app.services.execution_governor import governor
+
+router = APIRouter()
+logger = logging.getLogger("bbrf")
+
+@router.get("/tools", response_model=List[ToolSlotStatus])
+async def get_tool_slots():
+    logger.info("Retrieving execution governor status")
+    return [ToolSlotStatus(**status) for status in governor.snapshot()]
@@ -1,89 +1,77 @@
 # app/api/endpoints/http.py
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Response, Request
+from typing import List, Literal, Optional
+import asyncio
 import logging
 import uuid
-import time
-import asyncio
 
 from app.schemas.http import HTTPProbeCreate, HTTPProbeResponse, TaskResponse, TaskStatus
 from app.services.http_prober import HTTPProber
-from app.db.operations import get_http_probe_results
-from app.db.database import SessionLocal
+from app.services.task_store import TaskStore
+from app.services.checkpoint import Checkpoint
+from app.api.pagination import ndjson_response, page_size, set_next_page
+from app.config import settings
+from app.db.async_operations import get_http_probe_result_rows, stream_http_probe_result_rows
 
 router = APIRouter()
 logger = logging.getLogger("bbrf")
 
-# In-memory task storage. In a production environment, use a proper task queue.
-tasks = {}
+tasks = TaskStore("http_probe", TaskStatus)
 
 @router.post("/probe", response_model=TaskResponse)
 async def probe_http(domain: HTTPProbeCreate, background_tasks: BackgroundTasks):
     logger.info(f"Starting HTTP probing for domain: {domain.domain}")
     task_id = str(uuid.uuid4())
+    await tasks.save_async(TaskStatus(task_id=task_id, status="in_progress", progress=0), domain.domain, params={"domain": domain.domain})
     background_tasks.add_task(run_http_probe, task_id, domain.domain)
-    tasks[task_id] = TaskStatus(task_id=task_id, status="in_progress", progress=0)
     return TaskResponse(task_id=task_id)
 
+@tasks.resumable
 async def run_http_probe(task_id: str, domain: str):
     try:
         logger.info(f"Running HTTP probe for task {task_id}, domain {domain}")
-        probe_results = await HTTPProber.probe_domain(domain)
+        def report_progress(probes, total_hosts):
+            progress = min(99, int(len(probes) / total_hosts * 100))
+            # Probes are only attached on completion to keep progress writes small
+            tasks.save_soon(TaskStatus(task_id=task_id, status="in_progress", progress=progress))
+
+        checkpoint = await asyncio.to_thread(Checkpoint.load, task_id)
+        wildcard_filter = await HTTPProber.wildcard_filter_for(domain)
+        probe_results, changes = await HTTPProber.probe_domain_checkpointed(
+            domain, checkpoint, on_progress=report_progress, wildcard_filter=wildcard_filter
+        )
+        if wildcard_filter is not None and wildcard_filter.pruned:
+            logger.info(f"Skipped wildcard hosts of {domain}: {wildcard_filter.report()}")
         total_probes = len(probe_results)
         logger.info(f"Completed {total_probes} HTTP probes for {domain}")
 
-        tasks[task_id] = TaskStatus(task_id=task_id, status="completed", progress=100, probes=probe_results)
+        await tasks.save_async(TaskStatus(task_id=task_id, status="completed", progress=100, probes=probe_results, changes=changes))
     except Exception as e:
         logger.exception(f"Error probing HTTP for {domain}: {str(e)}")
-        tasks[task_id] = TaskStatus(task_id=task_id, status="failed", error=str(e))
+        await tasks.save_async(TaskStatus(task_id=task_id, status="failed", error=str(e)))
 
 @router.get("/probe/status/{task_id}", response_model=TaskStatus)
 async def get_probe_status(task_id: str):
-    if task_id not in tasks:
+    task = await tasks.get_async(task_id)
+    if task is None:
         logger.warning(f"Task not found: {task_id}")
         raise HTTPException(status_code=404, detail="Task not found")
-    return tasks[task_id]
+    return task
 
 @router.get("/probe/results/{domain}", response_model=List[HTTPProbeResponse])
-async def get_probe_results(domain: str):
+async def get_probe_results(domain: str, request: Request, response: Response, after_id: Optional[int] = Query(None, ge=0),
+                            limit: Optional[int] = Query(None, ge=1, le=settings.API_MAX_PAGE_SIZE),
+                            output: Literal["json", "ndjson"] = Query("json", alias="format"),
+                            unbounded: bool = Query(False, alias="all")):
     logger.info(f"Retrieving HTTP probe results for domain: {domain}")
-    db = SessionLocal()
-    try:
-        results = get_http_probe_results(db, domain)
-        if not results:
-            logger.warning(f"No HTTP probe results found for domain: {domain}")
-            raise HTTPException(status_code=404, detail="No HTTP probe results found for this domain")
-        logger.info(f"Retrieved {len(results)} HTTP probe results for {domain}")
-        return [HTTPProbeResponse(
-            subdomain=result.HTTPProbeResult.subdomain.subdomain,
-            url=result.HTTPProbeResult.url,
-            status_code=result.HTTPProbeResult.status_code,
-            title=result.HTTPProbeResult.title,
-            content_length=result.HTTPProbeResult.content_length,
-            technologies=result.HTTPProbeResult.technologies,
-            webserver=result.HTTPProbeResult.webserver,
-            cdn_name=result.HTTPProbeResult.cdn_name,
-            cdn_type=result.HTTPProbeResult.cdn_type,
-            ip_address=result.ip_address,
-            response_time=result.HTTPProbeResult.response_time,
-            created_at=result.HTTPProbeResult.created_at
-        ) for result in results]
-    finally:
-        db.close()
-
-async def cleanup_tasks():
-    while True:
-        await asyncio.sleep(3600)  # Run every hour
-        current_time = time.time()
-        tasks_to_remove = [
-            task_id for task_id, task in tasks.items()
-            if task.status in ["completed", "failed"] and current_time - task.timestamp > 86400  # 24 hours
-        ]
-        for task_id in tasks_to_remove:
-            del tasks[task_id]
-        logger.info(f"Cleaned up {len(tasks_to_remove)} completed or failed tasks")
-
-@router.on_event("startup")
-async def start_task_cleanup():
-    asyncio.create_task(cleanup_tasks())
\ No newline at end of file
+    limit = page_size(limit, unbounded)
+    if output == "ndjson":
+        return ndjson_response(stream_http_probe_result_rows(domain, after_id, limit), HTTPProbeResponse, limit)
+    results = await get_http_probe_result_rows(domain, after_id, limit)
+    if not results and after_id is None:
+        logger.warning(f"No HTTP probe results found for domain: {domain}")
+        raise HTTPException(status_code=404, detail="No HTTP probe results found for this domain")
+    logger.info(f"Retrieved {len(results)} HTTP probe results for {domain}")
+    set_next_page(request, response, results, limit)
+    return results
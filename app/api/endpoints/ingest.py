@@ -0,0 +1,48 @@
+# app/api/endpoints/ingest.py
+
+import asyncio
+import json
+import logging
+import tempfile
+from typing import IO, Dict, Iterator, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.db.operations import ingest
+
+router = APIRouter()
+logger = logging.getLogger("bbrf")
+
+# Request bodies larger than this are spooled to disk instead of memory
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+def _lines(body: IO[bytes]) -> Iterator[str]:
+    body.seek(0)
+    for line in body:
+        line = line.strip()
+        if line:
+            yield line.decode()
+
+def _records(body: IO[bytes]) -> Iterator[Dict]:
+    for line in _lines(body):
+        yield json.loads(line)
+
+@router.post("/{domain}")
+async def import_results(domain: str, request: Request,
+                         kind: Literal["subdomains", "resolutions", "probe_results"] = Query(...),
+                         method: Optional[Literal["insert", "copy"]] = Query(None)) -> Dict[str, int]:
+    """Import external tool output for a domain: subfinder's one name per
+    line, or dnsx / httpx JSON lines. `method` picks the ingest path per
+    call and defaults to INGEST_METHOD; with "copy" the rows are streamed
+    from the spooled body into COPY without being collected first."""
+    logger.info(f"Importing {kind} for {domain}")
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as body:
+        async for chunk in request.stream():
+            await asyncio.to_thread(body.write, chunk)
+        rows = _lines(body) if kind == "subdomains" else _records(body)
+        try:
+            return await asyncio.to_thread(ingest, domain, method=method, **{kind: rows})
+        except (ValueError, KeyError) as e:
+            # Malformed JSON lines, or records without the host / input field
+            raise HTTPException(status_code=400, detail=f"Invalid {kind} input: {str(e)}")
+        except Exception as e:
+            logger.exception(f"Error importing {kind} for {domain}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to import {kind}")
@@ -0,0 +1,43 @@
+# app/api/endpoints/schedule.py
+
+from fastapi import APIRouter, HTTPException
+from typing import List
+import logging
+
+from app.config import settings
+from app.schemas.schedule import ScheduledReconCreate, ScheduledJobResponse
+from app.services.scheduler import scheduler
+from app.db.async_operations import get_scheduled_jobs, get_scheduled_job
+
+router = APIRouter()
+logger = logging.getLogger("bbrf")
+
+@router.post("/recon", response_model=ScheduledJobResponse)
+async def schedule_recon(request: ScheduledReconCreate):
+    if request.interval_seconds < settings.SCHEDULER_MIN_INTERVAL:
+        raise HTTPException(status_code=400, detail=f"interval_seconds must be at least {settings.SCHEDULER_MIN_INTERVAL}")
+    job = await scheduler.add(
+        request.domain, "recon", {"max_staleness": request.max_staleness, "mode": request.mode},
+        request.interval_seconds, request.jitter_seconds
+    )
+    if job is None:
+        raise HTTPException(status_code=500, detail="Failed to schedule recon")
+    return job
+
+@router.get("", response_model=List[ScheduledJobResponse])
+async def list_scheduled_jobs():
+    return await get_scheduled_jobs()
+
+@router.get("/{job_id}", response_model=ScheduledJobResponse)
+async def get_schedule(job_id: int):
+    job = await get_scheduled_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scheduled job not found")
+    return job
+
+@router.delete("/{job_id}")
+async def delete_schedule(job_id: int):
+    if not await scheduler.remove(job_id):
+        raise HTTPException(status_code=404, detail="Scheduled job not found")
+    logger.info(f"Removed scheduled job {job_id}")
+    return {"message": "Scheduled job removed"}
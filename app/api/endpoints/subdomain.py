@@ -1,83 +1,187 @@
 # app/api/endpoints/subdomain.py
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Response, Request
+from typing import List, Literal, Optional
 import logging
 import uuid
 import time
 import asyncio
 from pydantic import Field
 
-from app.schemas.subdomain import SubdomainCreate, SubdomainResponse, TaskResponse, TaskStatus, TaskBase
-from app.services.subdomain_enumerator import SubdomainEnumerator
-from app.db.operations import add_subdomains, get_subdomains
+from app.schemas.subdomain import SubdomainCreate, SubdomainResponse, TaskResponse, TaskStatus, TaskBase, BulkSubdomainCreate, BulkTaskStatus, DomainEnumerationProgress, PermutationCreate, ZoneCount, ZoneSubtree
+from app.services.enumeration_scheduler import enumeration_scheduler
+from app.services.active_discovery import ActiveDiscovery
+from app.services.subdomain_index import subdomain_index
+from app.services.task_store import TaskStore
+from app.config import settings
+from app.api.pagination import ndjson_response, page_size, set_next_page
+from app.db.async_operations import get_subdomain_rows, stream_subdomain_rows, get_subdomains_in_zone
 
 router = APIRouter()
 logger = logging.getLogger("bbrf")
 
-# In-memory task storage. In a production environment, use a proper task queue.
-tasks = {}
-
 class TaskStatus(TaskBase):
     status: str
     progress: int = 0
+    subdomain_count: int = 0
     subdomains: List[str] = []
     error: str = None
     timestamp: float = Field(default_factory=time.time)
 
+tasks = TaskStore("enumeration", TaskStatus)
+bulk_tasks = TaskStore("bulk_enumeration", BulkTaskStatus)
+
 @router.post("/enumerate", response_model=TaskResponse)
 async def enumerate_subdomains(domain: SubdomainCreate, background_tasks: BackgroundTasks):
     logger.info(f"Starting enumeration for domain: {domain.domain}")
     task_id = str(uuid.uuid4())
+    await tasks.save_async(TaskStatus(task_id=task_id, status="in_progress", progress=0), domain.domain)
     background_tasks.add_task(run_enumeration, task_id, domain.domain)
-    tasks[task_id] = TaskStatus(task_id=task_id, status="in_progress", progress=0)
     return TaskResponse(task_id=task_id)
 
 async def run_enumeration(task_id: str, domain: str):
     try:
         logger.info(f"Running enumeration for task {task_id}, domain {domain}")
-        subdomains = await SubdomainEnumerator.enumerate(domain)
-        
+
+        def report_progress(count: int):
+            tasks.save_soon(TaskStatus(task_id=task_id, status="in_progress", progress=0, subdomain_count=count))
+
+        # Subdomains are stored in chunks as subfinder discovers them, sharing
+        # the provider budget with bulk runs
+        subdomains = await enumeration_scheduler.enumerate(domain, on_progress=report_progress)
+
         if subdomains:
-            added_count = await asyncio.to_thread(add_subdomains, domain, subdomains)
-            logger.info(f"Added/updated {added_count} subdomains for {domain}")
-            tasks[task_id] = TaskStatus(task_id=task_id, status="completed", progress=100, subdomains=subdomains)
+            logger.info(f"Enumerated and stored {len(subdomains)} subdomains for {domain}")
         else:
             logger.warning(f"No subdomains found for {domain}")
-            tasks[task_id] = TaskStatus(task_id=task_id, status="completed", progress=100, subdomains=[])
+        await tasks.save_async(TaskStatus(task_id=task_id, status="completed", progress=100, subdomain_count=len(subdomains), subdomains=subdomains))
     except Exception as e:
         logger.exception(f"Error enumerating subdomains for {domain}: {str(e)}")
-        tasks[task_id] = TaskStatus(task_id=task_id, status="failed", error=str(e))
+        await tasks.save_async(TaskStatus(task_id=task_id, status="failed", error=str(e)))
+
+@router.post("/enumerate/bulk", response_model=TaskResponse)
+async def enumerate_subdomains_bulk(request: BulkSubdomainCreate, background_tasks: BackgroundTasks):
+    domains = list(dict.fromkeys(domain.strip().lower() for domain in request.domains if domain.strip()))
+    if not domains:
+        raise HTTPException(status_code=400, detail="No domains provided")
+    logger.info(f"Starting bulk enumeration for {len(domains)} domains")
+    task_id = str(uuid.uuid4())
+    await bulk_tasks.save_async(BulkTaskStatus(
+        task_id=task_id,
+        status="in_progress",
+        domains={domain: DomainEnumerationProgress(status="queued") for domain in domains}
+    ))
+    background_tasks.add_task(run_bulk_enumeration, task_id, domains)
+    return TaskResponse(task_id=task_id)
+
+async def run_bulk_enumeration(task_id: str, domains: List[str]):
+    domain_progress = {domain: DomainEnumerationProgress(status="queued") for domain in domains}
+
+    def build_status(status: str) -> BulkTaskStatus:
+        finished = sum(1 for progress in domain_progress.values() if progress.status in ["completed", "failed"])
+        return BulkTaskStatus(
+            task_id=task_id,
+            status=status,
+            progress=int(finished / len(domains) * 100),
+            total_subdomains=sum(progress.subdomain_count for progress in domain_progress.values()),
+            domains=domain_progress
+        )
+
+    def on_update(domain: str, progress: dict):
+        domain_progress[domain] = DomainEnumerationProgress(**progress)
+        bulk_tasks.save_soon(build_status("in_progress"))
+
+    try:
+        await enumeration_scheduler.run(domains, on_update)
+        completed = build_status("completed")
+        await bulk_tasks.save_async(completed)
+        logger.info(f"Bulk enumeration {task_id} completed with {completed.total_subdomains} subdomains")
+    except Exception as e:
+        logger.exception(f"Error during bulk enumeration {task_id}: {str(e)}")
+        failed = build_status("failed")
+        failed.error = str(e)
+        await bulk_tasks.save_async(failed)
+
+@router.get("/enumerate/bulk/status/{task_id}", response_model=BulkTaskStatus)
+async def get_bulk_enumeration_status(task_id: str):
+    task = await bulk_tasks.get_async(task_id)
+    if task is None:
+        logger.warning(f"Bulk task not found: {task_id}")
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+@router.post("/permutations", response_model=TaskResponse)
+async def discover_permutations(request: PermutationCreate, background_tasks: BackgroundTasks):
+    logger.info(f"Starting permutation discovery for domain: {request.domain}")
+    task_id = str(uuid.uuid4())
+    await tasks.save_async(TaskStatus(task_id=task_id, status="in_progress", progress=0), request.domain)
+    background_tasks.add_task(run_permutation_discovery, task_id, request.domain, request.words)
+    return TaskResponse(task_id=task_id)
+
+async def run_permutation_discovery(task_id: str, domain: str, words: Optional[List[str]] = None):
+    try:
+        logger.info(f"Running permutation discovery for task {task_id}, domain {domain}")
+
+        def report_progress(count: int):
+            tasks.save_soon(TaskStatus(task_id=task_id, status="in_progress", progress=0, subdomain_count=count))
+
+        discovered = await ActiveDiscovery.discover(domain, words, on_progress=report_progress)
+        await tasks.save_async(TaskStatus(task_id=task_id, status="completed", progress=100, subdomain_count=len(discovered), subdomains=discovered))
+    except Exception as e:
+        logger.exception(f"Error during permutation discovery for {domain}: {str(e)}")
+        await tasks.save_async(TaskStatus(task_id=task_id, status="failed", error=str(e)))
+
+@router.get("/permutations/status/{task_id}", response_model=TaskStatus)
+async def get_permutation_status(task_id: str):
+    return await get_enumeration_status(task_id)
 
 @router.get("/enumerate/status/{task_id}", response_model=TaskStatus)
 async def get_enumeration_status(task_id: str):
-    if task_id not in tasks:
+    task = await tasks.get_async(task_id)
+    if task is None:
         logger.warning(f"Task not found: {task_id}")
         raise HTTPException(status_code=404, detail="Task not found")
-    return tasks[task_id]
+    return task
 
 @router.get("/subdomains/{domain}", response_model=List[SubdomainResponse])
-async def get_domain_subdomains(domain: str):
+async def get_domain_subdomains(domain: str, request: Request, response: Response, after_id: Optional[int] = Query(None, ge=0),
+                                limit: Optional[int] = Query(None, ge=1, le=settings.API_MAX_PAGE_SIZE),
+                                output: Literal["json", "ndjson"] = Query("json", alias="format"),
+                                unbounded: bool = Query(False, alias="all")):
     logger.info(f"Retrieving subdomains for domain: {domain}")
-    subdomains = await asyncio.to_thread(get_subdomains, domain)
-    if not subdomains:
+    limit = page_size(limit, unbounded)
+    if output == "ndjson":
+        return ndjson_response(stream_subdomain_rows(domain, after_id, limit), SubdomainResponse, limit)
+    subdomains = await get_subdomain_rows(domain, after_id, limit)
+    if not subdomains and after_id is None:
         logger.warning(f"No subdomains found for domain: {domain}")
         raise HTTPException(status_code=404, detail="No subdomains found for this domain")
     logger.info(f"Retrieved {len(subdomains)} subdomains for {domain}")
+    set_next_page(request, response, subdomains, limit)
     return subdomains
 
-async def cleanup_tasks():
-    while True:
-        await asyncio.sleep(3600)  # Run every hour
-        current_time = time.time()
-        tasks_to_remove = [
-            task_id for task_id, task in tasks.items()
-            if task.status in ["completed", "failed"] and current_time - task.timestamp > 86400  # 24 hours
-        ]
-        for task_id in tasks_to_remove:
-            del tasks[task_id]
-        logger.info(f"Cleaned up {len(tasks_to_remove)} completed or failed tasks")
-
-@router.on_event("startup")
-async def start_task_cleanup():
-    asyncio.create_task(cleanup_tasks())
\ No newline at end of file
+def _check_zone(domain: str, zone: Optional[str]) -> str:
+    zone = (zone or domain).lower().rstrip(".")
+    if zone != domain and not zone.endswith(f".{domain}"):
+        raise HTTPException(status_code=400, detail=f"Zone must be {domain} or one of its subdomains")
+    return zone
+
+@router.get("/subdomains/{domain}/tree", response_model=ZoneSubtree)
+async def get_zone_subtree(domain: str, zone: Optional[str] = None, limit: int = Query(1000, ge=1, le=100000)):
+    zone = _check_zone(domain, zone)
+    total = await asyncio.to_thread(subdomain_index.read, domain, lambda trie: trie.count(zone))
+    if not total:
+        raise HTTPException(status_code=404, detail="No subdomains found under this zone")
+    subdomains = await get_subdomains_in_zone(domain, zone, limit)
+    return ZoneSubtree(domain=domain, zone=zone, total=total, subdomains=subdomains)
+
+@router.get("/subdomains/{domain}/zones", response_model=ZoneSubtree)
+async def get_zone_counts(domain: str, zone: Optional[str] = None, depth: int = Query(1, ge=1, le=5)):
+    zone = _check_zone(domain, zone)
+    total, counts = await asyncio.to_thread(
+        subdomain_index.read, domain, lambda trie: (trie.count(zone), trie.zone_counts(zone, depth))
+    )
+    if not total:
+        raise HTTPException(status_code=404, detail="No subdomains found under this zone")
+    zones = [ZoneCount(zone=name, count=count) for name, count in counts]
+    return ZoneSubtree(domain=domain, zone=zone, total=total, zones=zones)
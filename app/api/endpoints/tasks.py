@@ -0,0 +1,20 @@
+# app/api/endpoints/tasks.py
+
+from fastapi import APIRouter, HTTPException
+import logging
+
+from app.schemas.task import TaskResumeResponse
+from app.services.task_store import resume_task
+
+router = APIRouter()
+logger = logging.getLogger("bbrf")
+
+@router.post("/{task_id}/resume", response_model=TaskResumeResponse)
+async def resume(task_id: str):
+    logger.info(f"Resume requested for task {task_id}")
+    if not await resume_task(task_id, include_failed=True):
+        raise HTTPException(
+            status_code=409,
+            detail="Task not found, not resumable, or still running"
+        )
+    return TaskResumeResponse(task_id=task_id, message="Task resumed from its last checkpoint")
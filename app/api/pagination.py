@@ -0,0 +1,39 @@
+# app/api/pagination.py
+
+from typing import AsyncIterator, Dict, List, Optional, Type
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from app.config import settings
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def page_size(limit: Optional[int], unbounded: bool) -> Optional[int]:
+    # Without a limit a page holds API_DEFAULT_PAGE_SIZE rows, unless every row was asked for
+    if limit is not None:
+        return limit
+    return None if unbounded else min(settings.API_DEFAULT_PAGE_SIZE, settings.API_MAX_PAGE_SIZE)
+
+def set_page_limit(response: Response, limit: Optional[int]):
+    # Present on every bounded page, so clients can tell a page from the full set
+    if limit is not None:
+        response.headers["X-Page-Limit"] = str(limit)
+
+def set_next_page(request: Request, response: Response, rows: List[Dict], limit: Optional[int]):
+    set_page_limit(response, limit)
+    # A full page may have a successor; clients pass this back as after_id
+    if limit is not None and len(rows) == limit:
+        after_id = rows[-1]["id"]
+        response.headers["X-Next-After-Id"] = str(after_id)
+        response.headers["Link"] = f'<{request.url.include_query_params(after_id=after_id, limit=limit)}>; rel="next"'
+
+def ndjson_response(rows: AsyncIterator[Dict], model: Type[BaseModel], limit: Optional[int] = None) -> StreamingResponse:
+    """Write each row as one JSON line as soon as it is fetched. Headers go
+    out before the rows, so only the page limit is set; a stream with that
+    many lines continues after the id of its last line."""
+    async def lines():
+        async for row in rows:
+            yield model(**row).model_dump_json() + "\n"
+    response = StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+    set_page_limit(response, limit)
+    return response
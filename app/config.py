@@ -1,6 +1,7 @@
 # app/config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import AnyUrl
+from typing import List, Dict, Optional
 
 class Settings(BaseSettings):
     DB_USER: str
@@ -8,10 +9,121 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_NAME: str
     DB_PORT: str = "5432"
+    # Connection pools, per engine and API process
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    # asyncpg prepared statement cache; set to 0 behind pgbouncer in transaction mode
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
+    # Read endpoints: page size when a client passes no limit (all=true reads
+    # every row), largest page a client can ask for, and rows fetched per
+    # round trip when streaming NDJSON
+    API_DEFAULT_PAGE_SIZE: int = 1000
+    API_MAX_PAGE_SIZE: int = 10000
+    STREAM_YIELD_PER: int = 1000
     DISCORD_BOT_TOKEN: str
     API_HOST: str = "localhost"
     API_PORT: str = "8000"
 
+    # Subdomains are written to the DB in chunks of this size while subfinder runs
+    SUBDOMAIN_FLUSH_CHUNK_SIZE: int = 500
+
+    # Bulk enumeration: parallel subfinder runs and shared rate budgets (requests/s)
+    SUBFINDER_MAX_PARALLEL: int = 5
+    SUBFINDER_RATE_LIMIT: Optional[int] = None
+    SUBFINDER_SOURCE_RATE_LIMITS: Dict[str, int] = {}
+
+    # Permutation discovery
+    PERMUTATION_WORDLIST: Optional[str] = None
+    PERMUTATION_MAX_CANDIDATES: int = 5000000
+
+    # dnsx batch resolution
+    DNSX_PROCESSES: int = 1
+    DNSX_THREADS: int = 100
+
+    # DNS backend: "dnsx" (subprocess) or "native" (asyncio UDP)
+    DNS_BACKEND: str = "dnsx"
+    DNS_RESOLVERS: List[str] = ["1.1.1.1", "1.0.0.1", "8.8.8.8", "8.8.4.4", "9.9.9.9"]
+    DNS_CONCURRENCY: int = 1000
+    DNS_TIMEOUT: float = 2.0
+    DNS_RETRIES: int = 2
+
+    # Per-resolver AIMD windows and quarantine (native backend only)
+    DNS_RESOLVER_INITIAL_WINDOW: float = 32.0
+    DNS_RESOLVER_MAX_WINDOW: float = 1024.0
+    DNS_RESOLVER_QUARANTINE_THRESHOLD: float = 0.5
+    DNS_RESOLVER_QUARANTINE_SECONDS: float = 30.0
+
+    # In-process LRU of DNS answers, in entries
+    DNS_CACHE_SIZE: int = 100000
+
+    # Wildcard DNS detection before resolution results are stored
+    WILDCARD_FILTER: bool = True
+    WILDCARD_PROBES: int = 3
+
+    # httpx batch probing
+    HTTPX_SHARDS: int = 1
+    HTTPX_THREADS: int = 50
+    HTTPX_RATE_LIMIT: int = 150
+    HTTP_PERSIST_CHUNK_SIZE: int = 500
+    # Rows per multi-row HTTP probe upsert
+    HTTP_INSERT_CHUNK_SIZE: int = 500
+    # Default for ingest() and POST /import when no method is given: "insert"
+    # (multi-row upserts) or "copy" (COPY into staging tables)
+    INGEST_METHOD: str = "insert"
+
+    # HTTP backend: "httpx" (subprocess) or "native" (aiohttp)
+    HTTP_BACKEND: str = "httpx"
+    HTTP_CONCURRENCY: int = 200
+    HTTP_PER_HOST_CONCURRENCY: int = 4
+    HTTP_MAX_BODY_KB: int = 64
+    HTTP_TIMEOUT: float = 10.0
+
+    # Collapse hosts sharing an IP that only serve its default vhost. Only has
+    # an effect with HTTP_BACKEND=native; every host is still fetched, but
+    # duplicates skip the full probe (see ProbePlanner)
+    HTTP_DEDUP_BY_IP: bool = False
+    HTTP_DEDUP_MIN_GROUP: int = 3
+
+    # Recon mode: "sequential" runs each stage to completion, "pipelined" streams
+    # names between stages over queues of at most this many items, "delta" only
+    # resolves and probes what changed since the previous run
+    RECON_MODE: str = "sequential"
+    RECON_PIPELINE_QUEUE_SIZE: int = 1000
+
+    # Concurrent processes allowed per external tool, shared by all requests
+    GOVERNOR_TOOL_SLOTS: Dict[str, int] = {"subfinder": 4, "dnsx": 4, "httpx": 4}
+    GOVERNOR_DEFAULT_SLOTS: int = 2
+
+    # Streamed tool inputs are batched before a slot is taken: up to this many
+    # items, waiting at most this many seconds for more after the first
+    TOOL_STREAM_BATCH_SIZE: int = 1000
+    TOOL_STREAM_BATCH_LINGER: float = 0.5
+
+    # Finished tasks are kept this many seconds; cleanup runs every interval
+    TASK_TTL_SECONDS: int = 86400
+    TASK_CLEANUP_INTERVAL: int = 3600
+
+    # Running tasks heartbeat every TASK_HEARTBEAT_SECONDS; an in-progress task
+    # without one for TASK_STALE_SECONDS is resumed from its checkpoint
+    TASK_HEARTBEAT_SECONDS: int = 30
+    TASK_STALE_SECONDS: int = 120
+    CHECKPOINT_INTERVAL_SECONDS: int = 10
+    DNS_CHECKPOINT_CHUNK_SIZE: int = 5000
+    # Rows per multi-row DNS upsert, and resolutions buffered before each write
+    DNS_INSERT_CHUNK_SIZE: int = 1000
+    DNS_PERSIST_CHUNK_SIZE: int = 1000
+
+    # Recurring scans: at most SCHEDULER_MAX_CONCURRENT scheduled runs at once;
+    # a run over the cap is retried after SCHEDULER_RETRY_SECONDS
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_MAX_CONCURRENT: int = 2
+    SCHEDULER_RETRY_SECONDS: int = 300
+    SCHEDULER_SYNC_SECONDS: int = 60
+    SCHEDULER_MIN_INTERVAL: int = 3600
+
     @property
     def DATABASE_URL(self) -> AnyUrl:
         return AnyUrl.build(
@@ -23,6 +135,17 @@ class Settings(BaseSettings):
             path=f"{self.DB_NAME}",
         )
     
+    @property
+    def ASYNC_DATABASE_URL(self) -> AnyUrl:
+        return AnyUrl.build(
+            scheme="postgresql+asyncpg",
+            username=self.DB_USER,
+            password=self.DB_PASSWORD,
+            host=self.DB_HOST,
+            port=int(self.DB_PORT),
+            path=f"{self.DB_NAME}",
+        )
+
     @property
     def API_URL(self) -> str:
         return f"http://{self.API_HOST}:{self.API_PORT}"
@@ -0,0 +1,311 @@
+# app/db/async_operations.py
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import joinedload, selectinload
+from typing import AsyncIterator, List, Dict, Optional
+from datetime import datetime
+from .models import Subdomain, DNSResolution, HTTPProbeResult, Task, ScheduledJob
+from .database import AsyncSessionLocal
+from .operations import _scheduled_job_to_dict
+from app.config import settings
+import logging
+
+logger = logging.getLogger("bbrf")
+
+# Async counterparts of app.db.operations for request handlers. Relationships
+# the endpoints read are loaded eagerly, since lazy loads cannot run on an
+# AsyncSession after the query.
+#
+# Not everything in app.db.operations has a counterpart here. These stay sync
+# and are only called from worker threads (asyncio.to_thread), where they do
+# not block the event loop:
+# - bulk writes of the scan stages: add_subdomains, add_dns_resolutions_bulk,
+#   add_http_probe_results, touch_http_probe_results
+# - COPY ingest (ingest), which needs psycopg2's copy_expert
+# - checkpoints: get_task_checkpoint, save_task_checkpoint
+# - task ownership and scheduling: claim_task, touch_tasks, get_stale_task_ids,
+#   delete_finished_tasks, claim_scheduled_run, get_running_scheduled_task_ids
+# - lookups of the scan stages: get_latest_dns_resolutions, get_subdomain_activity,
+#   get_database_time and the validator/target queries of the HTTP prober
+
+async def get_subdomains(domain: str) -> List[Subdomain]:
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await db.scalars(select(Subdomain).where(Subdomain.domain == domain).order_by(Subdomain.id))
+            subdomains = result.all()
+            logger.info(f"Retrieved {len(subdomains)} subdomains for domain {domain}")
+            return subdomains
+        except Exception as e:
+            logger.error(f"Error retrieving subdomains for {domain}: {str(e)}")
+            return []
+
+async def get_subdomain_ids(domain: str, subdomains: List[str]) -> Dict[str, int]:
+    if not subdomains:
+        return {}
+    async with AsyncSessionLocal() as db:
+        try:
+            rows = await db.execute(
+                select(Subdomain.subdomain, Subdomain.id)
+                .where(Subdomain.domain == domain, Subdomain.subdomain.in_(subdomains))
+            )
+            return {row.subdomain: row.id for row in rows}
+        except Exception as e:
+            logger.error(f"Error retrieving subdomain IDs for {domain}: {str(e)}")
+            return {}
+
+async def get_subdomains_in_zone(domain: str, zone: str, limit: Optional[int] = None) -> List[str]:
+    async with AsyncSessionLocal() as db:
+        try:
+            reversed_zone = Subdomain.reverse_labels(zone)
+            query = (
+                select(Subdomain.subdomain)
+                .where(
+                    Subdomain.domain == domain,
+                    (Subdomain.reversed_subdomain == reversed_zone) |
+                    Subdomain.reversed_subdomain.startswith(f"{reversed_zone}.", autoescape=True)
+                )
+                .order_by(Subdomain.reversed_subdomain)
+            )
+            if limit:
+                query = query.limit(limit)
+            names = (await db.scalars(query)).all()
+            logger.info(f"Retrieved {len(names)} subdomains under {zone}")
+            return names
+        except Exception as e:
+            logger.error(f"Error retrieving subdomains under {zone}: {str(e)}")
+            return []
+
+async def count_subdomains(domain: str) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count(Subdomain.id)).where(Subdomain.domain == domain)) or 0
+
+async def get_dns_resolutions(domain: str) -> List[DNSResolution]:
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await db.scalars(
+                select(DNSResolution)
+                .options(joinedload(DNSResolution.subdomain))
+                .join(Subdomain)
+                .where(Subdomain.domain == domain)
+            )
+            resolutions = result.all()
+            logger.info(f"Retrieved {len(resolutions)} DNS resolutions for domain {domain}")
+            if not resolutions:
+                logger.warning(f"No DNS resolutions found in the database for domain {domain}")
+            return resolutions
+        except Exception as e:
+            logger.error(f"Error retrieving DNS resolutions for {domain}: {str(e)}")
+            return []
+
+async def get_subdomains_with_resolutions(domain: str) -> List[Subdomain]:
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await db.scalars(
+                select(Subdomain).where(Subdomain.domain == domain).options(selectinload(Subdomain.dns_resolutions))
+            )
+            subdomains = result.all()
+            logger.info(f"Retrieved {len(subdomains)} subdomains with DNS resolutions for domain {domain}")
+            return subdomains
+        except Exception as e:
+            logger.error(f"Error retrieving subdomains with DNS resolutions for {domain}: {str(e)}")
+            return []
+
+async def get_http_probe_results(domain: str):
+    async with AsyncSessionLocal() as db:
+        try:
+            logger.info(f"Retrieving HTTP probe results for domain: {domain}")
+            result = await db.execute(
+                select(HTTPProbeResult, DNSResolution.ip_address)
+                .options(joinedload(HTTPProbeResult.subdomain))
+                .join(Subdomain, HTTPProbeResult.subdomain_id == Subdomain.id)
+                .outerjoin(
+                    DNSResolution,
+                    (DNSResolution.subdomain_id == Subdomain.id) &
+                    (DNSResolution.resolved_domain == func.split_part(HTTPProbeResult.url, '://', 2))
+                )
+                .where(Subdomain.domain == domain)
+            )
+            results = result.all()
+            logger.info(f"Retrieved {len(results)} HTTP probe results for {domain}")
+            return results
+        except Exception as e:
+            logger.error(f"Error retrieving HTTP probe results for {domain}: {str(e)}")
+            return []
+
+async def get_urls_for_domain(domain: str) -> List[str]:
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await db.scalars(
+                select(HTTPProbeResult.url)
+                .join(Subdomain, HTTPProbeResult.subdomain_id == Subdomain.id)
+                .where(Subdomain.domain == domain)
+                .distinct(HTTPProbeResult.subdomain_id, HTTPProbeResult.url)
+            )
+            urls = result.all()
+            logger.info(f"Retrieved {len(urls)} unique URLs for domain {domain}")
+            return urls
+        except Exception as e:
+            logger.error(f"Error retrieving URLs for domain {domain}: {str(e)}")
+            return []
+
+# Tasks
+
+async def save_task(task_id: str, kind: str, status: str, progress: Optional[int], error: Optional[str],
+                    data: Dict, domain: Optional[str] = None, params: Optional[Dict] = None, owner: Optional[str] = None):
+    async with AsyncSessionLocal() as db:
+        try:
+            stmt = insert(Task).values(
+                id=task_id, kind=kind, domain=domain, status=status, progress=progress or 0, error=error, data=data,
+                params=params, owner=owner
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['id'],
+                set_=dict(
+                    status=stmt.excluded.status,
+                    progress=stmt.excluded.progress,
+                    error=stmt.excluded.error,
+                    data=stmt.excluded.data,
+                    updated_at=func.now()
+                )
+            )
+            await db.execute(stmt)
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Error saving task {task_id}: {str(e)}")
+            await db.rollback()
+
+async def get_task(task_id: str, kind: Optional[str] = None) -> Optional[Dict]:
+    async with AsyncSessionLocal() as db:
+        try:
+            query = select(Task.data).where(Task.id == task_id)
+            if kind is not None:
+                query = query.where(Task.kind == kind)
+            return await db.scalar(query)
+        except Exception as e:
+            logger.error(f"Error retrieving task {task_id}: {str(e)}")
+            return None
+
+# Scheduled jobs
+
+async def add_scheduled_job(domain: str, kind: str, params: Dict, interval_seconds: int, jitter_seconds: int,
+                            next_run_at: datetime) -> Optional[Dict]:
+    async with AsyncSessionLocal() as db:
+        try:
+            job = ScheduledJob(
+                domain=domain, kind=kind, params=params, interval_seconds=interval_seconds,
+                jitter_seconds=jitter_seconds, enabled=True, next_run_at=next_run_at, skipped_runs=0
+            )
+            db.add(job)
+            await db.commit()
+            await db.refresh(job)
+            logger.info(f"Scheduled {kind} for {domain} every {interval_seconds}s, first run at {next_run_at}")
+            return _scheduled_job_to_dict(job)
+        except Exception as e:
+            logger.error(f"Error scheduling {kind} for {domain}: {str(e)}")
+            await db.rollback()
+            return None
+
+async def get_scheduled_jobs(enabled_only: bool = False) -> List[Dict]:
+    async with AsyncSessionLocal() as db:
+        try:
+            query = select(ScheduledJob).order_by(ScheduledJob.next_run_at)
+            if enabled_only:
+                query = query.where(ScheduledJob.enabled.is_(True))
+            return [_scheduled_job_to_dict(job) for job in await db.scalars(query)]
+        except Exception as e:
+            logger.error(f"Error retrieving scheduled jobs: {str(e)}")
+            return []
+
+async def get_scheduled_job(job_id: int) -> Optional[Dict]:
+    async with AsyncSessionLocal() as db:
+        job = await db.get(ScheduledJob, job_id)
+        return _scheduled_job_to_dict(job) if job else None
+
+async def delete_scheduled_job(job_id: int) -> bool:
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await db.execute(delete(ScheduledJob).where(ScheduledJob.id == job_id))
+            await db.commit()
+            return result.rowcount > 0
+        except Exception as e:
+            logger.error(f"Error deleting scheduled job {job_id}: {str(e)}")
+            await db.rollback()
+            return False
+
+# Keyset pages and streams for the read endpoints. Rows are plain mappings
+# ordered by id; `after_id` is the id of the last row a client has seen.
+
+def _keyset(query, id_column, after_id: Optional[int], limit: Optional[int]):
+    query = query.order_by(id_column)
+    if after_id is not None:
+        query = query.where(id_column > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+async def _fetch_rows(query) -> List[Dict]:
+    async with AsyncSessionLocal() as db:
+        return [dict(row) for row in (await db.execute(query)).mappings()]
+
+async def _stream_rows(query) -> AsyncIterator[Dict]:
+    # Server-side cursor, fetching STREAM_YIELD_PER rows at a time
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=settings.STREAM_YIELD_PER))
+        async for row in result.mappings():
+            yield dict(row)
+
+def _subdomain_rows(domain: str, after_id: Optional[int], limit: Optional[int]):
+    return _keyset(
+        select(Subdomain.id, Subdomain.domain, Subdomain.subdomain, Subdomain.created_at, Subdomain.updated_at)
+        .where(Subdomain.domain == domain),
+        Subdomain.id, after_id, limit
+    )
+
+def _dns_resolution_rows(domain: str, after_id: Optional[int], limit: Optional[int]):
+    return _keyset(
+        select(
+            DNSResolution.id, Subdomain.subdomain, DNSResolution.resolved_domain, DNSResolution.ip_address,
+            DNSResolution.ttl, DNSResolution.created_at
+        )
+        .join(Subdomain, DNSResolution.subdomain_id == Subdomain.id)
+        .where(Subdomain.domain == domain),
+        DNSResolution.id, after_id, limit
+    )
+
+def _http_probe_result_rows(domain: str, after_id: Optional[int], limit: Optional[int]):
+    return _keyset(
+        select(
+            HTTPProbeResult.id, Subdomain.subdomain, HTTPProbeResult.url, HTTPProbeResult.status_code,
+            HTTPProbeResult.title, HTTPProbeResult.content_length, HTTPProbeResult.technologies,
+            HTTPProbeResult.webserver, HTTPProbeResult.cdn_name, HTTPProbeResult.cdn_type,
+            DNSResolution.ip_address, HTTPProbeResult.response_time, HTTPProbeResult.duplicate_of,
+            HTTPProbeResult.created_at
+        )
+        .join(Subdomain, HTTPProbeResult.subdomain_id == Subdomain.id)
+        .outerjoin(
+            DNSResolution,
+            (DNSResolution.subdomain_id == Subdomain.id) &
+            (DNSResolution.resolved_domain == func.split_part(HTTPProbeResult.url, '://', 2))
+        )
+        .where(Subdomain.domain == domain),
+        HTTPProbeResult.id, after_id, limit
+    )
+
+async def get_subdomain_rows(domain: str, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+    return await _fetch_rows(_subdomain_rows(domain, after_id, limit))
+
+def stream_subdomain_rows(domain: str, after_id: Optional[int] = None, limit: Optional[int] = None) -> AsyncIterator[Dict]:
+    return _stream_rows(_subdomain_rows(domain, after_id, limit))
+
+async def get_dns_resolution_rows(domain: str, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+    return await _fetch_rows(_dns_resolution_rows(domain, after_id, limit))
+
+def stream_dns_resolution_rows(domain: str, after_id: Optional[int] = None, limit: Optional[int] = None) -> AsyncIterator[Dict]:
+    return _stream_rows(_dns_resolution_rows(domain, after_id, limit))
+
+async def get_http_probe_result_rows(domain: str, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+    return await _fetch_rows(_http_probe_result_rows(domain, after_id, limit))
+
+def stream_http_probe_result_rows(domain: str, after_id: Optional[int] = None, limit: Optional[int] = None) -> AsyncIterator[Dict]:
+    return _stream_rows(_http_probe_result_rows(domain, after_id, limit))
@@ -0,0 +1,41 @@
+# app/db/migrations.py
+
+import logging
+from sqlalchemy import text
+from .database import engine
+
+logger = logging.getLogger("bbrf")
+
+# Columns and indexes added to tables after they were first created.
+# create_all only creates missing tables, so existing databases get these
+# at startup; every statement must be safe to run again.
+MIGRATIONS = [
+    # HTTP probe results served by another host's default vhost
+    "ALTER TABLE http_probe_results ADD COLUMN IF NOT EXISTS duplicate_of VARCHAR",
+    # Validators used to skip unchanged hosts on re-probes
+    "ALTER TABLE http_probe_results ADD COLUMN IF NOT EXISTS body_hash VARCHAR",
+    "ALTER TABLE http_probe_results ADD COLUMN IF NOT EXISTS etag VARCHAR",
+    "ALTER TABLE http_probe_results ADD COLUMN IF NOT EXISTS last_modified VARCHAR",
+    # Reversed labels for zone subtree queries, backfilled the same way as
+    # Subdomain.reverse_labels before the prefix index is built
+    "ALTER TABLE subdomains ADD COLUMN IF NOT EXISTS reversed_subdomain VARCHAR",
+    """
+    UPDATE subdomains SET reversed_subdomain = array_to_string(ARRAY(
+        SELECT label FROM unnest(string_to_array(lower(rtrim(subdomain, '.')), '.'))
+            WITH ORDINALITY AS labels(label, position)
+        ORDER BY position DESC
+    ), '.')
+    WHERE reversed_subdomain IS NULL
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_subdomains_domain_reversed ON subdomains (domain, reversed_subdomain text_pattern_ops)",
+    # Resume data of tasks tables created before checkpointing
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS params JSON",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS checkpoint JSON",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS owner VARCHAR",
+]
+
+def run_migrations():
+    with engine.begin() as connection:
+        for statement in MIGRATIONS:
+            connection.execute(text(statement))
+    logger.info(f"Applied {len(MIGRATIONS)} schema migrations")
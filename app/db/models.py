@@ -1,6 +1,6 @@
 # app/db/models.py
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index, JSON, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -11,13 +11,26 @@ class Subdomain(Base):
     id = Column(Integer, primary_key=True, index=True)
     domain = Column(String, index=True)
     subdomain = Column(String, index=True)
+    # Labels in reverse order (com.example.dev) so zone subtrees are index prefix scans
+    reversed_subdomain = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     dns_resolutions = relationship("DNSResolution", back_populates="subdomain")
     http_probe_results = relationship("HTTPProbeResult", back_populates="subdomain")
 
-    __table_args__ = (UniqueConstraint('domain', 'subdomain', name='uix_domain_subdomain'),)
+    __table_args__ = (
+        UniqueConstraint('domain', 'subdomain', name='uix_domain_subdomain'),
+        Index(
+            'ix_subdomains_domain_reversed',
+            'domain', 'reversed_subdomain',
+            postgresql_ops={'reversed_subdomain': 'text_pattern_ops'}
+        ),
+    )
+
+    @staticmethod
+    def reverse_labels(name: str) -> str:
+        return '.'.join(reversed(name.lower().rstrip('.').split('.')))
 
 
 class DNSResolution(Base):
@@ -50,9 +63,52 @@ class HTTPProbeResult(Base):
     cdn_type = Column(String)
     ip_address = Column(String)
     response_time = Column(String)
+    duplicate_of = Column(String, nullable=True)
+    body_hash = Column(String)
+    etag = Column(String)
+    last_modified = Column(String)
     raw_data = Column(JSON)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     subdomain = relationship("Subdomain", back_populates="http_probe_results")
 
-    __table_args__ = (UniqueConstraint('subdomain_id', 'url', name='uix_subdomain_url'),)
\ No newline at end of file
+    __table_args__ = (UniqueConstraint('subdomain_id', 'url', name='uix_subdomain_url'),)
+
+
+class Task(Base):
+    __tablename__ = "tasks"
+
+    id = Column(String, primary_key=True)
+    kind = Column(String, index=True)
+    domain = Column(String, index=True)
+    status = Column(String)
+    progress = Column(Integer, default=0)
+    error = Column(String, nullable=True)
+    # Last status payload returned by the task's status endpoint
+    data = Column(JSON)
+    # Arguments of the task runner and its last checkpoint, used to resume it
+    params = Column(JSON)
+    checkpoint = Column(JSON, nullable=True)
+    # API process running the task; refreshed by its heartbeat
+    owner = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (Index('ix_tasks_status_updated_at', 'status', 'updated_at'),)
+
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    domain = Column(String, index=True)
+    # Task kind started on every run, with its runner params besides the domain
+    kind = Column(String, default="recon")
+    params = Column(JSON)
+    interval_seconds = Column(Integer)
+    jitter_seconds = Column(Integer, default=0)
+    enabled = Column(Boolean, default=True)
+    next_run_at = Column(DateTime(timezone=True), index=True)
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+    last_task_id = Column(String, nullable=True)
+    skipped_runs = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
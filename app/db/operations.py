@@ -1,12 +1,16 @@
 # app/db/operations.py
 
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import String, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload, Session
-from sqlalchemy.sql import func
-from typing import List, Dict
-from .models import Subdomain, DNSResolution, HTTPProbeResult
+from sqlalchemy.sql import func, literal_column, text
+from typing import Iterable, List, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+from .models import Subdomain, DNSResolution, HTTPProbeResult, Task, ScheduledJob
 from .database import SessionLocal
+from app.config import settings
+import json
 import logging
 
 logger = logging.getLogger("bbrf")
@@ -14,15 +18,18 @@ logger = logging.getLogger("bbrf")
 # Existing functions
 
 def add_subdomains(domain: str, subdomains: list[str]):
+    if not subdomains:
+        return 0
     db = SessionLocal()
     try:
         stmt = insert(Subdomain).values([
-            {"domain": domain, "subdomain": subdomain} for subdomain in subdomains
+            {"domain": domain, "subdomain": subdomain, "reversed_subdomain": Subdomain.reverse_labels(subdomain)}
+            for subdomain in subdomains
         ])
         
         do_update_stmt = stmt.on_conflict_do_update(
             index_elements=['domain', 'subdomain'],
-            set_=dict(updated_at=stmt.excluded.updated_at)
+            set_=dict(updated_at=stmt.excluded.updated_at, reversed_subdomain=stmt.excluded.reversed_subdomain)
         )
         
         result = db.execute(do_update_stmt)
@@ -43,7 +50,7 @@ def add_subdomains(domain: str, subdomains: list[str]):
 def get_subdomains(domain: str):
     db = SessionLocal()
     try:
-        subdomains = db.query(Subdomain).filter(Subdomain.domain == domain).all()
+        subdomains = db.query(Subdomain).filter(Subdomain.domain == domain).order_by(Subdomain.id).all()
         logger.info(f"Retrieved {len(subdomains)} subdomains for domain {domain}")
         return subdomains
     except Exception as e:
@@ -52,47 +59,191 @@ def get_subdomains(domain: str):
     finally:
         db.close()
 
-# New functions for DNS resolution
+def get_subdomain_ids(domain: str, subdomains: List[str]) -> Dict[str, int]:
+    if not subdomains:
+        return {}
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Subdomain.subdomain, Subdomain.id)
+            .filter(Subdomain.domain == domain, Subdomain.subdomain.in_(subdomains))
+            .all()
+        )
+        return {row.subdomain: row.id for row in rows}
+    except Exception as e:
+        logger.error(f"Error retrieving subdomain IDs for {domain}: {str(e)}")
+        return {}
+    finally:
+        db.close()
 
-def add_dns_resolutions(subdomain_id: int, resolutions: List[Dict]):
+def get_database_time() -> datetime:
     db = SessionLocal()
     try:
-        logger.info(f"Adding DNS resolutions for subdomain ID {subdomain_id}")
-        logger.debug(f"Resolutions to add: {resolutions}")
-        
-        added_count = 0
-        for resolution in resolutions:
-            stmt = insert(DNSResolution).values(
-                subdomain_id=subdomain_id,
-                resolved_domain=resolution['host'],
-                ip_address=resolution['a'][0] if resolution.get('a') else None,
-                ttl=resolution.get('ttl'),
-                raw_data=resolution
+        return db.query(func.now()).scalar()
+    finally:
+        db.close()
+
+def get_subdomain_activity(domain: str, since: datetime) -> Dict[str, List[str]]:
+    """Classify stored names by their timestamps relative to `since`: created
+    after it, re-reported after it (updated_at bumped by the upsert), or not
+    reported since."""
+    db = SessionLocal()
+    try:
+        activity = {"new": [], "seen": [], "missing": []}
+        rows = db.query(Subdomain.subdomain, Subdomain.created_at, Subdomain.updated_at).filter(Subdomain.domain == domain)
+        for row in rows:
+            if row.created_at is not None and row.created_at >= since:
+                activity["new"].append(row.subdomain)
+            elif row.updated_at is not None and row.updated_at >= since:
+                activity["seen"].append(row.subdomain)
+            else:
+                activity["missing"].append(row.subdomain)
+        return activity
+    except Exception as e:
+        logger.error(f"Error retrieving subdomain activity for {domain}: {str(e)}")
+        return {"new": [], "seen": [], "missing": []}
+    finally:
+        db.close()
+
+def backfill_reversed_subdomains(domain: str, batch_size: int = 5000) -> int:
+    db = SessionLocal()
+    try:
+        updated = 0
+        while True:
+            rows = (
+                db.query(Subdomain.id, Subdomain.subdomain)
+                .filter(Subdomain.domain == domain, Subdomain.reversed_subdomain.is_(None))
+                .limit(batch_size)
+                .all()
             )
-            
-            do_update_stmt = stmt.on_conflict_do_update(
-                index_elements=['subdomain_id', 'resolved_domain'],
-                set_=dict(
-                    ip_address=stmt.excluded.ip_address,
-                    ttl=stmt.excluded.ttl,
-                    raw_data=stmt.excluded.raw_data,
-                    created_at=func.now()
-                )
+            if not rows:
+                break
+            db.bulk_update_mappings(Subdomain, [
+                {"id": row.id, "reversed_subdomain": Subdomain.reverse_labels(row.subdomain)} for row in rows
+            ])
+            db.commit()
+            updated += len(rows)
+        if updated:
+            logger.info(f"Backfilled reversed labels for {updated} subdomains of {domain}")
+        return updated
+    except Exception as e:
+        logger.error(f"Error backfilling reversed labels for {domain}: {str(e)}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+def get_subdomains_in_zone(domain: str, zone: str, limit: Optional[int] = None) -> List[str]:
+    db = SessionLocal()
+    try:
+        reversed_zone = Subdomain.reverse_labels(zone)
+        query = (
+            db.query(Subdomain.subdomain)
+            .filter(
+                Subdomain.domain == domain,
+                (Subdomain.reversed_subdomain == reversed_zone) |
+                Subdomain.reversed_subdomain.startswith(f"{reversed_zone}.", autoescape=True)
             )
-            
-            result = db.execute(do_update_stmt)
-            added_count += result.rowcount
+            .order_by(Subdomain.reversed_subdomain)
+        )
+        if limit:
+            query = query.limit(limit)
+        names = [row.subdomain for row in query]
+        logger.info(f"Retrieved {len(names)} subdomains under {zone}")
+        return names
+    except Exception as e:
+        logger.error(f"Error retrieving subdomains under {zone}: {str(e)}")
+        return []
+    finally:
+        db.close()
+
+def count_subdomains(domain: str, max_id: Optional[int] = None) -> int:
+    db = SessionLocal()
+    try:
+        query = db.query(func.count(Subdomain.id)).filter(Subdomain.domain == domain)
+        if max_id is not None:
+            query = query.filter(Subdomain.id <= max_id)
+        return query.scalar() or 0
+    finally:
+        db.close()
 
+def get_reversed_subdomains(domain: str, after_id: int = 0) -> List[Tuple[int, str]]:
+    """(id, reversed name) of a domain's subdomains past `after_id`, in ID order."""
+    db = SessionLocal()
+    try:
+        return [
+            (row.id, row.reversed_subdomain or Subdomain.reverse_labels(row.subdomain)) for row in
+            db.query(Subdomain.id, Subdomain.subdomain, Subdomain.reversed_subdomain)
+            .filter(Subdomain.domain == domain, Subdomain.id > after_id)
+            .order_by(Subdomain.id)
+            .yield_per(10000)
+        ]
+    finally:
+        db.close()
+
+# New functions for DNS resolution
+
+def _upsert_dns_resolutions(db, rows: List[Dict]) -> int:
+    added_count = 0
+    for start in range(0, len(rows), settings.DNS_INSERT_CHUNK_SIZE):
+        stmt = insert(DNSResolution).values(rows[start:start + settings.DNS_INSERT_CHUNK_SIZE])
+        do_update_stmt = stmt.on_conflict_do_update(
+            index_elements=['subdomain_id', 'resolved_domain'],
+            set_=dict(
+                ip_address=stmt.excluded.ip_address,
+                ttl=stmt.excluded.ttl,
+                raw_data=stmt.excluded.raw_data,
+                created_at=func.now()
+            )
+        )
+        added_count += db.execute(do_update_stmt).rowcount
+    return added_count
+
+def _dns_resolution_row(subdomain_id: int, resolution: Dict) -> Dict:
+    return {
+        "subdomain_id": subdomain_id,
+        "resolved_domain": resolution['host'],
+        "ip_address": resolution['a'][0] if resolution.get('a') else None,
+        "ttl": resolution.get('ttl'),
+        "raw_data": resolution,
+    }
+
+def add_dns_resolutions_bulk(subdomain_ids: Dict[str, int], resolutions: List[Dict]) -> int:
+    """Upsert resolutions of many subdomains in one transaction.
+
+    `subdomain_ids` maps each host to its subdomain ID; resolutions of hosts
+    missing from it are skipped. Rows go out as multi-row upserts of
+    DNS_INSERT_CHUNK_SIZE, keeping the last answer when a host repeats.
+    Database errors are raised after the rollback, so callers never take a
+    failed batch for a stored one.
+    """
+    rows = {}
+    for resolution in resolutions:
+        subdomain_id = subdomain_ids.get(resolution.get('host'))
+        if subdomain_id is None:
+            logger.warning(f"Resolved host {resolution.get('host')} does not match a known subdomain. Skipping.")
+            continue
+        # One statement cannot upsert the same key twice
+        rows[(subdomain_id, resolution['host'])] = _dns_resolution_row(subdomain_id, resolution)
+    if not rows:
+        return 0
+
+    db = SessionLocal()
+    try:
+        added_count = _upsert_dns_resolutions(db, list(rows.values()))
         db.commit()
-        logger.info(f"Added/updated {added_count} DNS resolutions for subdomain ID {subdomain_id}")
+        logger.info(f"Added/updated {added_count} DNS resolutions for {len(rows)} hosts")
         return added_count
     except Exception as e:
-        logger.error(f"Error adding DNS resolutions for subdomain ID {subdomain_id}: {str(e)}")
+        logger.error(f"Error adding {len(rows)} DNS resolutions: {str(e)}")
         db.rollback()
-        return 0
+        raise
     finally:
         db.close()
 
+def add_dns_resolutions(subdomain_id: int, resolutions: List[Dict]):
+    return add_dns_resolutions_bulk({resolution['host']: subdomain_id for resolution in resolutions}, resolutions)
+
 def get_dns_resolutions(domain: str):
     db = SessionLocal()
     try:
@@ -130,6 +281,35 @@ def get_subdomains_with_resolutions(domain: str):
     finally:
         db.close()
 
+def get_latest_dns_resolutions(domain: str, names: List[str]) -> Dict[str, Dict]:
+    if not names:
+        return {}
+    db = SessionLocal()
+    try:
+        # One array parameter instead of an IN list, so large partitions keep a single statement
+        rows = (
+            db.query(Subdomain.subdomain, DNSResolution.raw_data, DNSResolution.ttl, DNSResolution.created_at)
+            .join(DNSResolution, DNSResolution.subdomain_id == Subdomain.id)
+            .filter(
+                Subdomain.domain == domain,
+                Subdomain.subdomain == any_(bindparam("names", list(names), type_=ARRAY(String))),
+            )
+            .order_by(DNSResolution.created_at)
+            .all()
+        )
+        # Later rows overwrite earlier ones, leaving the newest answer per subdomain
+        latest = {
+            row.subdomain: {"raw_data": row.raw_data, "ttl": row.ttl, "created_at": row.created_at}
+            for row in rows
+        }
+        logger.info(f"Retrieved latest DNS resolutions for {len(latest)} subdomains of {domain}")
+        return latest
+    except Exception as e:
+        logger.error(f"Error retrieving latest DNS resolutions for {domain}: {str(e)}")
+        return {}
+    finally:
+        db.close()
+
 # Operations for HTTP Module 
 
 def get_dns_resolutions_for_probing(db: Session, domain: str) -> List[DNSResolution]:
@@ -155,30 +335,58 @@ def get_dns_resolutions_for_probing(db: Session, domain: str) -> List[DNSResolut
         logger.exception(f"Error retrieving DNS resolutions for HTTP probing: {str(e)}")
         return []
     
-def add_http_probe_results(db: Session, domain: str, probe_results: List[Dict]):
+def _http_probe_row(subdomain_id: int, result: Dict) -> Dict:
+    return {
+        "subdomain_id": subdomain_id,
+        "url": result['url'],
+        "status_code": result.get('status_code'),
+        "title": result.get('title'),
+        "content_length": result.get('content_length'),
+        "technologies": result.get('tech'),
+        "webserver": result.get('webserver'),
+        "ip_address": result.get('host'),
+        "response_time": result.get('time'),
+        "duplicate_of": result.get('duplicate_of'),
+        "body_hash": (result.get('hash') or {}).get('body_sha256'),
+        "etag": result.get('etag'),
+        "last_modified": result.get('last_modified'),
+        "raw_data": result,
+    }
+
+def add_http_probe_results(db: Session, domain: str, probe_results: List[Dict]) -> Dict[str, int]:
+    """Upsert probe results in chunked multi-row statements.
+
+    Subdomain IDs for the whole batch are loaded in one query. Returns how
+    many rows were inserted and updated, and how many results were skipped
+    for an unknown subdomain or a URL repeated later in the batch. Database
+    errors are raised after the rollback.
+    """
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
     try:
         logger.info(f"Adding HTTP probe results for domain: {domain}")
-        added_count = 0
-        
+        hosts = {result['input'] for result in probe_results}
+        subdomain_ids = dict(
+            db.query(Subdomain.subdomain, Subdomain.id)
+            .filter(Subdomain.domain == domain, Subdomain.subdomain.in_(hosts))
+            .all()
+        ) if hosts else {}
+
+        rows = {}
         for result in probe_results:
-            subdomain = db.query(Subdomain).filter(Subdomain.domain == domain, Subdomain.subdomain == result['input']).first()
-            if not subdomain:
+            subdomain_id = subdomain_ids.get(result['input'])
+            if subdomain_id is None:
                 logger.warning(f"Subdomain not found for {result['input']}. Skipping.")
+                counts["skipped"] += 1
                 continue
+            # One statement cannot upsert the same key twice, the last result wins
+            if (subdomain_id, result['url']) in rows:
+                counts["skipped"] += 1
+            rows[(subdomain_id, result['url'])] = _http_probe_row(subdomain_id, result)
 
-            stmt = insert(HTTPProbeResult).values(
-                subdomain_id=subdomain.id,
-                url=result['url'],
-                status_code=result.get('status_code'),
-                title=result.get('title'),
-                content_length=result.get('content_length'),
-                technologies=result.get('tech'),
-                webserver=result.get('webserver'),
-                ip_address=result.get('host'),
-                response_time=result.get('time'),
-                raw_data=result
-            )
-
+        rows = list(rows.values())
+        chunk_size = settings.HTTP_INSERT_CHUNK_SIZE
+        for start in range(0, len(rows), chunk_size):
+            stmt = insert(HTTPProbeResult).values(rows[start:start + chunk_size])
             do_update_stmt = stmt.on_conflict_do_update(
                 index_elements=['subdomain_id', 'url'],
                 set_=dict(
@@ -189,26 +397,83 @@ def add_http_probe_results(db: Session, domain: str, probe_results: List[Dict]):
                     webserver=stmt.excluded.webserver,
                     ip_address=stmt.excluded.ip_address,
                     response_time=stmt.excluded.response_time,
+                    duplicate_of=stmt.excluded.duplicate_of,
+                    body_hash=stmt.excluded.body_hash,
+                    etag=stmt.excluded.etag,
+                    last_modified=stmt.excluded.last_modified,
                     raw_data=stmt.excluded.raw_data,
                     created_at=func.now()
                 )
-            )
-
-            result = db.execute(do_update_stmt)
-            added_count += result.rowcount
+            # xmax is 0 only on rows this statement inserted
+            ).returning(literal_column("xmax = 0"))
+            for (inserted,) in db.execute(do_update_stmt):
+                counts["inserted" if inserted else "updated"] += 1
 
         db.commit()
-        logger.info(f"Added/updated {added_count} HTTP probe results for domain {domain}")
-        return added_count
+        logger.info(f"Stored HTTP probe results for domain {domain}: {counts}")
+        return counts
     except IntegrityError as e:
         logger.error(f"IntegrityError while adding HTTP probe results for {domain}: {str(e)}")
         db.rollback()
-        return 0
+        raise
     except Exception as e:
         logger.error(f"Error adding HTTP probe results for {domain}: {str(e)}")
         db.rollback()
-        return 0
+        raise
     
+def touch_http_probe_results(db: Session, domain: str, urls: List[str]) -> int:
+    """Refresh created_at (last seen) of stored results whose probe came back
+    unchanged, in one UPDATE instead of rewriting the rows."""
+    if not urls:
+        return 0
+    try:
+        touched = (
+            db.query(HTTPProbeResult)
+            .filter(
+                HTTPProbeResult.subdomain_id.in_(db.query(Subdomain.id).filter(Subdomain.domain == domain)),
+                HTTPProbeResult.url == any_(bindparam("urls", list(urls), type_=ARRAY(String))),
+            )
+            .update({HTTPProbeResult.created_at: func.now()}, synchronize_session=False)
+        )
+        db.commit()
+        logger.info(f"Refreshed last seen of {touched} unchanged HTTP probe results for {domain}")
+        return touched
+    except Exception as e:
+        logger.error(f"Error refreshing unchanged HTTP probe results for {domain}: {str(e)}")
+        db.rollback()
+        return 0
+
+def get_http_probe_validators(db: Session, domain: str) -> Dict[str, Dict]:
+    try:
+        rows = (
+            db.query(
+                HTTPProbeResult.url,
+                HTTPProbeResult.status_code,
+                HTTPProbeResult.body_hash,
+                HTTPProbeResult.etag,
+                HTTPProbeResult.last_modified,
+                Subdomain.subdomain
+            )
+            .join(Subdomain, HTTPProbeResult.subdomain_id == Subdomain.id)
+            .filter(Subdomain.domain == domain)
+            .all()
+        )
+        validators = {
+            row.url: {
+                "host": row.subdomain,
+                "status_code": row.status_code,
+                "body_hash": row.body_hash,
+                "etag": row.etag,
+                "last_modified": row.last_modified
+            }
+            for row in rows
+        }
+        logger.info(f"Retrieved validators for {len(validators)} probed URLs of {domain}")
+        return validators
+    except Exception as e:
+        logger.error(f"Error retrieving HTTP probe validators for {domain}: {str(e)}")
+        return {}
+
 def get_http_probe_results(db: Session, domain: str):
     try:
         logger.info(f"Retrieving HTTP probe results for domain: {domain}")
@@ -247,4 +512,420 @@ def get_urls_for_domain(db: Session, domain: str) -> List[str]:
         return url_list
     except Exception as e:
         logger.error(f"Error retrieving URLs for domain {domain}: {str(e)}")
-        return []
\ No newline at end of file
+        return []
+
+# Operations for tasks
+
+def save_task(task_id: str, kind: str, status: str, progress: Optional[int], error: Optional[str],
+              data: Dict, domain: Optional[str] = None, params: Optional[Dict] = None, owner: Optional[str] = None):
+    db = SessionLocal()
+    try:
+        stmt = insert(Task).values(
+            id=task_id, kind=kind, domain=domain, status=status, progress=progress or 0, error=error, data=data,
+            params=params, owner=owner
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['id'],
+            set_=dict(
+                status=stmt.excluded.status,
+                progress=stmt.excluded.progress,
+                error=stmt.excluded.error,
+                data=stmt.excluded.data,
+                updated_at=func.now()
+            )
+        )
+        db.execute(stmt)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Error saving task {task_id}: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def get_task(task_id: str, kind: Optional[str] = None) -> Optional[Dict]:
+    db = SessionLocal()
+    try:
+        query = db.query(Task.data).filter(Task.id == task_id)
+        if kind is not None:
+            query = query.filter(Task.kind == kind)
+        row = query.first()
+        return row.data if row else None
+    except Exception as e:
+        logger.error(f"Error retrieving task {task_id}: {str(e)}")
+        return None
+    finally:
+        db.close()
+
+def delete_finished_tasks(max_age_seconds: int) -> int:
+    db = SessionLocal()
+    try:
+        cutoff = func.now() - timedelta(seconds=max_age_seconds)
+        deleted = (
+            db.query(Task)
+            .filter(Task.status.in_(["completed", "failed"]), Task.updated_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+    except Exception as e:
+        logger.error(f"Error deleting finished tasks: {str(e)}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+def save_task_checkpoint(task_id: str, checkpoint: Dict):
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.id == task_id).update(
+            {Task.checkpoint: checkpoint, Task.updated_at: func.now()}, synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        logger.error(f"Error saving checkpoint for task {task_id}: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def get_task_checkpoint(task_id: str) -> Optional[Dict]:
+    db = SessionLocal()
+    try:
+        row = db.query(Task.checkpoint).filter(Task.id == task_id).first()
+        return row.checkpoint if row else None
+    finally:
+        db.close()
+
+def touch_tasks(owner: str) -> int:
+    db = SessionLocal()
+    try:
+        touched = (
+            db.query(Task)
+            .filter(Task.owner == owner, Task.status == "in_progress")
+            .update({Task.updated_at: func.now()}, synchronize_session=False)
+        )
+        db.commit()
+        return touched
+    except Exception as e:
+        logger.error(f"Error refreshing task heartbeat: {str(e)}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+def claim_task(task_id: str, owner: str, kinds: List[str], stale_seconds: int, include_failed: bool = False) -> Optional[Dict]:
+    """Atomically take over a task whose owner stopped heartbeating (or a
+    failed one, when asked). Only one API process can win the claim."""
+    db = SessionLocal()
+    try:
+        stale = (Task.status == "in_progress") & (Task.updated_at < func.now() - timedelta(seconds=stale_seconds))
+        condition = (stale | (Task.status == "failed")) if include_failed else stale
+        row = db.execute(
+            Task.__table__.update()
+            .where(Task.id == task_id, Task.kind.in_(kinds), condition)
+            .values(owner=owner, status="in_progress", error=None, updated_at=func.now())
+            .returning(Task.kind, Task.params)
+        ).first()
+        db.commit()
+        return {"kind": row.kind, "params": row.params or {}} if row else None
+    except Exception as e:
+        logger.error(f"Error claiming task {task_id}: {str(e)}")
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+def get_stale_task_ids(stale_seconds: int) -> List[Dict]:
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Task.id, Task.kind)
+            .filter(Task.status == "in_progress", Task.updated_at < func.now() - timedelta(seconds=stale_seconds))
+            .all()
+        )
+        return [{"id": row.id, "kind": row.kind} for row in rows]
+    finally:
+        db.close()
+
+# Operations for scheduled jobs
+
+def _scheduled_job_to_dict(job: ScheduledJob) -> Dict:
+    return {
+        "id": job.id,
+        "domain": job.domain,
+        "kind": job.kind,
+        "params": job.params or {},
+        "interval_seconds": job.interval_seconds,
+        "jitter_seconds": job.jitter_seconds,
+        "enabled": job.enabled,
+        "next_run_at": job.next_run_at,
+        "last_run_at": job.last_run_at,
+        "last_task_id": job.last_task_id,
+        "skipped_runs": job.skipped_runs,
+        "created_at": job.created_at,
+    }
+
+def add_scheduled_job(domain: str, kind: str, params: Dict, interval_seconds: int, jitter_seconds: int,
+                      next_run_at: datetime) -> Optional[Dict]:
+    db = SessionLocal()
+    try:
+        job = ScheduledJob(
+            domain=domain, kind=kind, params=params, interval_seconds=interval_seconds,
+            jitter_seconds=jitter_seconds, enabled=True, next_run_at=next_run_at, skipped_runs=0
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        logger.info(f"Scheduled {kind} for {domain} every {interval_seconds}s, first run at {next_run_at}")
+        return _scheduled_job_to_dict(job)
+    except Exception as e:
+        logger.error(f"Error scheduling {kind} for {domain}: {str(e)}")
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+def get_scheduled_jobs(enabled_only: bool = False) -> List[Dict]:
+    db = SessionLocal()
+    try:
+        query = db.query(ScheduledJob)
+        if enabled_only:
+            query = query.filter(ScheduledJob.enabled.is_(True))
+        return [_scheduled_job_to_dict(job) for job in query.order_by(ScheduledJob.next_run_at)]
+    except Exception as e:
+        logger.error(f"Error retrieving scheduled jobs: {str(e)}")
+        return []
+    finally:
+        db.close()
+
+def get_scheduled_job(job_id: int) -> Optional[Dict]:
+    db = SessionLocal()
+    try:
+        job = db.query(ScheduledJob).filter(ScheduledJob.id == job_id).first()
+        return _scheduled_job_to_dict(job) if job else None
+    finally:
+        db.close()
+
+def delete_scheduled_job(job_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        deleted = db.query(ScheduledJob).filter(ScheduledJob.id == job_id).delete(synchronize_session=False)
+        db.commit()
+        return deleted > 0
+    except Exception as e:
+        logger.error(f"Error deleting scheduled job {job_id}: {str(e)}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+def claim_scheduled_run(job_id: int, expected_next_run: datetime, next_run_at: datetime,
+                        task_id: Optional[str] = None, skipped: bool = False) -> bool:
+    """Move a due job to its next run time, recording the started task or a
+    skipped run. Only the API process that still sees the expected run time
+    wins, so a run fires once however many processes are scheduling."""
+    db = SessionLocal()
+    try:
+        values = {ScheduledJob.next_run_at: next_run_at}
+        if task_id is not None:
+            values.update({ScheduledJob.last_task_id: task_id, ScheduledJob.last_run_at: func.now()})
+        elif skipped:
+            values[ScheduledJob.skipped_runs] = ScheduledJob.skipped_runs + 1
+        claimed = (
+            db.query(ScheduledJob)
+            .filter(ScheduledJob.id == job_id, ScheduledJob.next_run_at == expected_next_run)
+            .update(values, synchronize_session=False)
+        )
+        db.commit()
+        return claimed == 1
+    except Exception as e:
+        logger.error(f"Error claiming run of scheduled job {job_id}: {str(e)}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+def get_running_scheduled_task_ids() -> List[str]:
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Task.id)
+            .join(ScheduledJob, ScheduledJob.last_task_id == Task.id)
+            .filter(Task.status == "in_progress")
+            .all()
+        )
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+# Bulk ingest through COPY into temporary staging tables
+
+_STAGING_TABLES = {
+    "staging_subdomains": ["subdomain", "reversed_subdomain"],
+    "staging_dns_resolutions": ["host", "ip_address", "ttl", "raw_data"],
+    "staging_http_probe_results": [
+        "host", "url", "status_code", "title", "content_length", "technologies", "webserver", "ip_address",
+        "response_time", "duplicate_of", "body_hash", "etag", "last_modified", "raw_data"
+    ],
+}
+
+_STAGING_DDL = {
+    "staging_subdomains": "subdomain text, reversed_subdomain text",
+    "staging_dns_resolutions": "host text, ip_address text, ttl integer, raw_data json",
+    "staging_http_probe_results": (
+        "host text, url text, status_code integer, title text, content_length integer, technologies json, "
+        "webserver text, ip_address text, response_time text, duplicate_of text, body_hash text, etag text, "
+        "last_modified text, raw_data json"
+    ),
+}
+
+# Within a batch the last staged row of a key wins, as with the INSERT path
+_MERGE_SUBDOMAINS = """
+INSERT INTO subdomains (domain, subdomain, reversed_subdomain)
+SELECT DISTINCT ON (subdomain) :domain, subdomain, reversed_subdomain
+FROM staging_subdomains
+ORDER BY subdomain, seq DESC
+ON CONFLICT (domain, subdomain) DO UPDATE
+SET updated_at = now(), reversed_subdomain = EXCLUDED.reversed_subdomain
+"""
+
+_MERGE_DNS_RESOLUTIONS = """
+INSERT INTO dns_resolutions (subdomain_id, resolved_domain, ip_address, ttl, raw_data)
+SELECT DISTINCT ON (s.id, st.host) s.id, st.host, st.ip_address, st.ttl, st.raw_data
+FROM staging_dns_resolutions st
+JOIN subdomains s ON s.domain = :domain AND s.subdomain = st.host
+ORDER BY s.id, st.host, st.seq DESC
+ON CONFLICT (subdomain_id, resolved_domain) DO UPDATE
+SET ip_address = EXCLUDED.ip_address, ttl = EXCLUDED.ttl, raw_data = EXCLUDED.raw_data, created_at = now()
+"""
+
+_MERGE_HTTP_PROBE_RESULTS = """
+INSERT INTO http_probe_results (
+    subdomain_id, url, status_code, title, content_length, technologies, webserver, ip_address,
+    response_time, duplicate_of, body_hash, etag, last_modified, raw_data
+)
+SELECT DISTINCT ON (s.id, st.url)
+    s.id, st.url, st.status_code, st.title, st.content_length, st.technologies, st.webserver, st.ip_address,
+    st.response_time, st.duplicate_of, st.body_hash, st.etag, st.last_modified, st.raw_data
+FROM staging_http_probe_results st
+JOIN subdomains s ON s.domain = :domain AND s.subdomain = st.host
+ORDER BY s.id, st.url, st.seq DESC
+ON CONFLICT (subdomain_id, url) DO UPDATE
+SET status_code = EXCLUDED.status_code, title = EXCLUDED.title, content_length = EXCLUDED.content_length,
+    technologies = EXCLUDED.technologies, webserver = EXCLUDED.webserver, ip_address = EXCLUDED.ip_address,
+    response_time = EXCLUDED.response_time, duplicate_of = EXCLUDED.duplicate_of, body_hash = EXCLUDED.body_hash,
+    etag = EXCLUDED.etag, last_modified = EXCLUDED.last_modified, raw_data = EXCLUDED.raw_data, created_at = now()
+"""
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    # Text format escapes; NUL cannot be stored in a text column at all
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+        .replace("\r", "\\r").replace("\x00", "")
+    )
+
+class _CopyStream:
+    """File object for copy_expert that renders rows as COPY text lines only
+    as psycopg2 reads them, so the rows are never held in memory."""
+
+    def __init__(self, rows: Iterable[tuple]):
+        self._rows = iter(rows)
+        self._buffer = bytearray()
+        self.count = 0
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += ("\t".join(_copy_value(value) for value in row) + "\n").encode()
+            self.count += 1
+        size = len(self._buffer) if size < 0 else size
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+def _copy_into_staging(db: Session, table: str, rows: Iterable[tuple]) -> int:
+    db.execute(text(f"CREATE TEMP TABLE {table} (seq bigserial, {_STAGING_DDL[table]}) ON COMMIT DROP"))
+    stream = _CopyStream(rows)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(_STAGING_TABLES[table])}) FROM STDIN", stream)
+    finally:
+        cursor.close()
+    return stream.count
+
+def _ingest_copy(domain: str, subdomains: Iterable[str], resolutions: Iterable[Dict],
+                 probe_results: Iterable[Dict]) -> Dict[str, int]:
+    counts = {}
+    db = SessionLocal()
+    try:
+        counts["subdomains_staged"] = _copy_into_staging(db, "staging_subdomains", (
+            (subdomain, Subdomain.reverse_labels(subdomain)) for subdomain in subdomains
+        ))
+        counts["subdomains"] = db.execute(text(_MERGE_SUBDOMAINS), {"domain": domain}).rowcount
+
+        counts["dns_resolutions_staged"] = _copy_into_staging(db, "staging_dns_resolutions", (
+            (row["resolved_domain"], row["ip_address"], row["ttl"], row["raw_data"])
+            for row in (_dns_resolution_row(0, resolution) for resolution in resolutions)
+        ))
+        counts["dns_resolutions"] = db.execute(text(_MERGE_DNS_RESOLUTIONS), {"domain": domain}).rowcount
+
+        columns = _STAGING_TABLES["staging_http_probe_results"][1:]
+        counts["http_probe_results_staged"] = _copy_into_staging(db, "staging_http_probe_results", (
+            (result['input'], *(row[column] for column in columns))
+            for result, row in ((result, _http_probe_row(0, result)) for result in probe_results)
+        ))
+        counts["http_probe_results"] = db.execute(text(_MERGE_HTTP_PROBE_RESULTS), {"domain": domain}).rowcount
+
+        db.commit()
+        return counts
+    except Exception as e:
+        logger.error(f"Error ingesting through COPY for {domain}: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _ingest_insert(domain: str, subdomains: Iterable[str], resolutions: Iterable[Dict],
+                   probe_results: Iterable[Dict]) -> Dict[str, int]:
+    subdomains, resolutions, probe_results = list(subdomains), list(resolutions), list(probe_results)
+    counts = {"subdomains_staged": len(subdomains), "subdomains": 0,
+              "dns_resolutions_staged": len(resolutions), "http_probe_results_staged": len(probe_results)}
+    for start in range(0, len(subdomains), settings.DNS_INSERT_CHUNK_SIZE):
+        counts["subdomains"] += add_subdomains(domain, subdomains[start:start + settings.DNS_INSERT_CHUNK_SIZE])
+    subdomain_ids = get_subdomain_ids(domain, list({resolution['host'] for resolution in resolutions}))
+    counts["dns_resolutions"] = add_dns_resolutions_bulk(subdomain_ids, resolutions)
+    db = SessionLocal()
+    try:
+        stored = add_http_probe_results(db, domain, probe_results) if probe_results else {}
+        counts["http_probe_results"] = stored.get("inserted", 0) + stored.get("updated", 0)
+    finally:
+        db.close()
+    return counts
+
+def ingest(domain: str, subdomains: Iterable[str] = (), resolutions: Iterable[Dict] = (),
+           probe_results: Iterable[Dict] = (), method: Optional[str] = None) -> Dict[str, int]:
+    """Store subdomains, then DNS resolutions and HTTP probe results of them.
+
+    With method "copy" every input is streamed into a temporary staging
+    table with COPY FROM STDIN and merged with one upsert per table, in a
+    single transaction; iterables are consumed lazily. "insert" (the
+    INGEST_METHOD default) uses the chunked multi-row upserts. Returns the
+    number of rows received (`*_staged`) and upserted per table. Resolutions
+    and probe results of hosts that are not stored subdomains are skipped.
+    Database errors are raised, with the "copy" transaction rolled back.
+    """
+    method = method or settings.INGEST_METHOD
+    logger.info(f"Ingesting results for {domain} using {method}")
+    if method == "copy":
+        counts = _ingest_copy(domain, subdomains, resolutions, probe_results)
+    elif method == "insert":
+        counts = _ingest_insert(domain, subdomains, resolutions, probe_results)
+    else:
+        raise ValueError(f"Unknown ingest method: {method}")
+    logger.info(f"Ingested results for {domain}: {counts}")
+    return counts
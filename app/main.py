@@ -1,21 +1,30 @@
 # app/main.py
 
+import asyncio
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
-from app.db.database import engine
+from app.db.database import engine, async_engine
 from app.db import models
-from app.api.endpoints import subdomain, dns, http, automation
+from app.db.migrations import run_migrations
+from app.api.endpoints import subdomain, dns, http, automation, governor, tasks, schedule, ingest
 from app.core.logging_config import setup_logging
+from app.services.task_store import cleanup_tasks, heartbeat_tasks
+from app.services.execution_governor import current_requester
+from app.services.scheduler import scheduler
+from app.config import settings
 
 logger = setup_logging()
 
 #models.Base.metadata.drop_all(bind=engine)
 models.Base.metadata.create_all(bind=engine)
+run_migrations()
 
 app = FastAPI()
 
 @app.middleware("http")
 async def error_handling_middleware(request: Request, call_next):
+    # Tool slots are shared fairly between requesters, see ExecutionGovernor
+    current_requester.set(request.headers.get("X-Requester") or (request.client.host if request.client else "anonymous"))
     try:
         return await call_next(request)
     except Exception as e:
@@ -25,6 +34,25 @@ async def error_handling_middleware(request: Request, call_next):
             content={"detail": "An internal server error occurred."}
         )
 
+@app.on_event("startup")
+async def start_task_cleanup():
+    # Task state is shared through the database, so one loop covers every router
+    asyncio.create_task(cleanup_tasks())
+
+@app.on_event("startup")
+async def start_task_heartbeat():
+    # Also resumes tasks interrupted by a restart from their checkpoints
+    asyncio.create_task(heartbeat_tasks())
+
+@app.on_event("startup")
+async def start_scheduler():
+    if settings.SCHEDULER_ENABLED:
+        asyncio.create_task(scheduler.run())
+
+@app.on_event("shutdown")
+async def close_database_pools():
+    await async_engine.dispose()
+
 @app.get("/")
 async def root():
     logger.info("Root endpoint accessed")
@@ -42,6 +70,18 @@ app.include_router(http.router, prefix="/api/v1/http", tags=["http"])
 # Basic Recon Implementation
 app.include_router(automation.router, prefix="/api/v1/automation", tags=["automation"])
 
+# Task resume
+app.include_router(tasks.router, prefix="/api/v1/tasks", tags=["tasks"])
+
+# External tool slots and queues
+app.include_router(governor.router, prefix="/api/v1/governor", tags=["governor"])
+
+# Recurring scans
+app.include_router(schedule.router, prefix="/api/v1/schedules", tags=["schedules"])
+
+# Bulk import of external tool output
+app.include_router(ingest.router, prefix="/api/v1/import", tags=["import"])
+
 
 
 if __name__ == "__main__":
@@ -1,11 +1,31 @@
 # app/schemas/automation.py
 
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Literal, Union
 from datetime import datetime
 
 class AutomationRequest(BaseModel):
     domain: str
+    max_staleness: Optional[int] = None
+    # Defaults to RECON_MODE
+    mode: Optional[Literal["sequential", "pipelined", "delta"]] = None
+
+class ReconProfileStep(BaseModel):
+    node: str
+    # Overrides the node's default timeout, in seconds
+    timeout: Optional[float] = None
+
+class ReconProfileRequest(BaseModel):
+    domain: str
+    max_staleness: Optional[int] = None
+    profile: List[Union[str, ReconProfileStep]]
+
+class ReconNodeInfo(BaseModel):
+    name: str
+    inputs: List[str]
+    outputs: List[str]
+    concurrency: int
+    timeout: Optional[float] = None
 
 class AutomationResponse(BaseModel):
     task_id: str
@@ -15,6 +35,12 @@ class ReconResult(BaseModel):
     subdomains_added: int
     dns_results_added: int
     http_results_added: int
+    wildcard_pruned: Optional[Dict[str, int]] = None
+    http_changes: Optional[Dict[str, int]] = None
+    # Only set by delta runs
+    delta: Optional[Dict[str, int]] = None
+    # Status and timing per workflow node, only set by sequential runs
+    nodes: Optional[Dict[str, Dict]] = None
 
 class AutomationTaskStatus(BaseModel):
     task_id: str
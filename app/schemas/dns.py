@@ -9,7 +9,8 @@ class DNSResolutionBase(BaseModel):
     domain: str
 
 class DNSResolutionCreate(DNSResolutionBase):
-    pass
+    # Accept cached answers younger than this many seconds instead of their TTL
+    max_staleness: Optional[int] = None
 
 class DNSResolutionInDB(DNSResolutionBase):
     id: int
@@ -24,6 +25,8 @@ class DNSResolutionInDB(DNSResolutionBase):
         from_attributes = True
 
 class DNSResolutionResponse(BaseModel):
+    # Cursor for after_id; not set on the subdomains-with-resolutions listing
+    id: Optional[int] = None
     subdomain: str
     resolved_domain: str
     ip_address: Optional[str]
@@ -40,12 +43,28 @@ class TaskStatus(TaskBase):
     status: str
     progress: Optional[int] = None
     resolutions: Optional[List[Dict]] = None
+    wildcards: Optional[Dict[str, int]] = None
     error: Optional[str] = None
     timestamp: float = Field(default_factory=time.time)
 
 class TaskResponse(TaskBase):
     pass
 
+class ResolverStatus(BaseModel):
+    resolver: str
+    score: float
+    latency_ms: Optional[float]
+    timeout_rate: float
+    error_rate: float
+    window: float
+    in_flight: int
+    total_queries: int
+    total_timeouts: int
+    total_errors: int
+    quarantined: bool
+    quarantined_for: float
+    quarantine_count: int
+
 class SubdomainWithResolutions(BaseModel):
     subdomain: str
     resolutions: List[DNSResolutionResponse]
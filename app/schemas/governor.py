@@ -0,0 +1,15 @@
+# app/schemas/governor.py
+
+from pydantic import BaseModel
+from typing import Dict
+
+class ToolSlotStatus(BaseModel):
+    tool: str
+    slots: int
+    in_use: int
+    queue_depth: int
+    queued_by_requester: Dict[str, int]
+    total_runs: int
+    avg_wait_seconds: float
+    p95_wait_seconds: float
+    max_wait_seconds: float
@@ -12,6 +12,7 @@ class HTTPProbeCreate(HTTPProbeBase):
     pass
 
 class HTTPProbeResponse(BaseModel):
+    id: Optional[int] = None
     subdomain: str
     url: str
     status_code: Optional[int]
@@ -23,6 +24,7 @@ class HTTPProbeResponse(BaseModel):
     cdn_type: Optional[str]
     ip_address: Optional[str]
     response_time: Optional[str]
+    duplicate_of: Optional[str] = None
     created_at: datetime
 
 class TaskBase(BaseModel):
@@ -32,6 +34,7 @@ class TaskStatus(TaskBase):
     status: str
     progress: Optional[int] = None
     probes: Optional[List[Dict]] = None
+    changes: Optional[Dict[str, int]] = None
     error: Optional[str] = None
     timestamp: float = Field(default_factory=time.time)
 
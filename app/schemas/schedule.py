@@ -0,0 +1,27 @@
+# app/schemas/schedule.py
+
+from pydantic import BaseModel, Field
+from typing import Optional, Literal
+from datetime import datetime
+
+class ScheduledReconCreate(BaseModel):
+    domain: str
+    interval_seconds: int = Field(..., gt=0)
+    # Each run is delayed by a random 0..jitter_seconds on top of the interval
+    jitter_seconds: int = Field(0, ge=0)
+    max_staleness: Optional[int] = None
+    mode: Optional[Literal["sequential", "pipelined", "delta"]] = None
+
+class ScheduledJobResponse(BaseModel):
+    id: int
+    domain: str
+    kind: str
+    params: dict
+    interval_seconds: int
+    jitter_seconds: int
+    enabled: bool
+    next_run_at: datetime
+    last_run_at: Optional[datetime] = None
+    last_task_id: Optional[str] = None
+    skipped_runs: int
+    created_at: Optional[datetime] = None
@@ -1,8 +1,9 @@
 # app/schemas/subdomain.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Dict
+import time
 
 class SubdomainBase(BaseModel):
     domain: str
@@ -10,6 +11,13 @@ class SubdomainBase(BaseModel):
 class SubdomainCreate(SubdomainBase):
     pass
 
+class BulkSubdomainCreate(BaseModel):
+    domains: List[str]
+
+class PermutationCreate(SubdomainBase):
+    # Falls back to PERMUTATION_WORDLIST, then the built-in list
+    words: Optional[List[str]] = None
+
 class SubdomainInDB(SubdomainBase):
     id: int
     subdomain: str
@@ -35,4 +43,28 @@ class TaskStatus(TaskBase):
     error: Optional[str] = None
 
 class TaskResponse(TaskBase):
-    pass
\ No newline at end of file
+    pass
+
+class DomainEnumerationProgress(BaseModel):
+    status: str
+    subdomain_count: int = 0
+    error: Optional[str] = None
+
+class BulkTaskStatus(TaskBase):
+    status: str
+    progress: int = 0
+    total_subdomains: int = 0
+    domains: Dict[str, DomainEnumerationProgress] = {}
+    error: Optional[str] = None
+    timestamp: float = Field(default_factory=time.time)
+
+class ZoneCount(BaseModel):
+    zone: str
+    count: int
+
+class ZoneSubtree(BaseModel):
+    domain: str
+    zone: str
+    total: int
+    subdomains: List[str] = []
+    zones: List[ZoneCount] = []
@@ -0,0 +1,7 @@
+# app/schemas/task.py
+
+from pydantic import BaseModel
+
+class TaskResumeResponse(BaseModel):
+    task_id: str
+    message: str
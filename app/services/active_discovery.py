@@ -0,0 +1,68 @@
+# app/services/active_discovery.py
+
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+from app.config import settings
+from app.db.operations import add_subdomains, add_dns_resolutions_bulk, get_subdomains, get_subdomain_ids
+from app.services.dns_cache import dns_cache
+from app.services.dns_resolver import DNSResolver
+from app.services.execution_governor import current_domain
+from app.services.permutation_generator import PermutationGenerator
+from app.services.wildcard_detector import WildcardFilter
+
+logger = logging.getLogger("bbrf")
+
+class ActiveDiscovery:
+    @staticmethod
+    async def discover(domain: str, words: Optional[List[str]] = None,
+                       on_progress: Optional[Callable[[int], None]] = None) -> List[str]:
+        """Resolve permutations of the stored subdomains and store the ones that exist.
+
+        Candidates are pulled lazily from the generator by the resolver, so
+        they are never held in memory as a full list.
+        """
+        current_domain.set(domain)
+        known = [subdomain.subdomain for subdomain in await asyncio.to_thread(get_subdomains, domain)]
+        if not known:
+            logger.warning(f"No stored subdomains to permute for {domain}")
+            return []
+
+        words = words or PermutationGenerator.load_wordlist(settings.PERMUTATION_WORDLIST)
+        generator = PermutationGenerator(domain, words, max_candidates=settings.PERMUTATION_MAX_CANDIDATES)
+
+        # Under a wildcard zone every candidate resolves, so drop all matches
+        wildcard_filter = WildcardFilter(domain, {}, collapse=False)
+        if settings.WILDCARD_FILTER:
+            wildcard_filter = await WildcardFilter.for_domain(domain, known, settings.WILDCARD_PROBES, collapse=False)
+
+        discovered = []
+        pending: List[Dict] = []
+
+        async def flush():
+            nonlocal pending
+            if not pending:
+                return
+            batch, pending = pending, []
+            names = [resolution['host'] for resolution in batch]
+            await asyncio.to_thread(add_subdomains, domain, names)
+            subdomain_ids = await asyncio.to_thread(get_subdomain_ids, domain, names)
+            await asyncio.to_thread(add_dns_resolutions_bulk, subdomain_ids, batch)
+            discovered.extend(names)
+            if on_progress is not None:
+                on_progress(len(discovered))
+
+        try:
+            async for resolution in DNSResolver.resolve_stream(generator.generate(known)):
+                dns_cache.store(domain, resolution)
+                if not wildcard_filter.keep(resolution):
+                    continue
+                logger.info(f"Discovered {resolution['host']} via permutation")
+                pending.append(resolution)
+                if len(pending) >= settings.SUBDOMAIN_FLUSH_CHUNK_SIZE:
+                    await flush()
+        finally:
+            await flush()
+
+        logger.info(f"Permutation discovery found {len(discovered)} new subdomains for {domain}, pruned {wildcard_filter.report()}")
+        return discovered
@@ -0,0 +1,134 @@
+# app/services/checkpoint.py
+
+import asyncio
+import bisect
+import copy
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+from app.config import settings
+from app.db.operations import get_task_checkpoint, save_task_checkpoint
+
+logger = logging.getLogger("bbrf")
+
+class IdRanges:
+    """Set of integer IDs stored as sorted, non-overlapping [start, end] ranges."""
+
+    def __init__(self, ranges: Optional[Iterable[List[int]]] = None):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for start, end in sorted(ranges or []):
+            if self.starts and start <= self.ends[-1] + 1:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def _merge_forward(self, i: int):
+        while i + 1 < len(self.starts) and self.starts[i + 1] <= self.ends[i] + 1:
+            self.ends[i] = max(self.ends[i], self.ends.pop(i + 1))
+            self.starts.pop(i + 1)
+
+    def __contains__(self, value: int) -> bool:
+        i = bisect.bisect_right(self.starts, value) - 1
+        return i >= 0 and value <= self.ends[i]
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in zip(self.starts, self.ends))
+
+    def add(self, value: int):
+        i = bisect.bisect_right(self.starts, value) - 1
+        if i >= 0 and value <= self.ends[i] + 1:
+            self.ends[i] = max(self.ends[i], value)
+        else:
+            i += 1
+            self.starts.insert(i, value)
+            self.ends.insert(i, value)
+        self._merge_forward(i)
+        if i > 0 and self.starts[i] <= self.ends[i - 1] + 1:
+            self._merge_forward(i - 1)
+
+    def to_list(self) -> List[List[int]]:
+        return [[start, end] for start, end in zip(self.starts, self.ends)]
+
+class Checkpoint:
+    """Resume point of a task: its current stage, how far into that stage's
+    batch every item is finished, and which subdomain IDs past that offset
+    are already done. Stored on the task row, at most once per
+    CHECKPOINT_INTERVAL_SECONDS unless forced.
+
+    A checkpoint without a task ID is never stored, so code paths that are
+    not run as a task can use it unconditionally. Saves made on the event
+    loop are written from a thread by a background writer; saves made while
+    a write is in flight collapse into the newest one.
+    """
+
+    def __init__(self, task_id: Optional[str] = None, data: Optional[Dict] = None):
+        data = data or {}
+        self.task_id = task_id
+        self.stage: Optional[str] = data.get("stage")
+        self.offset: int = data.get("offset", 0)
+        self.done = IdRanges(data.get("done"))
+        # Results of finished stages and anything a stage needs to resume
+        self.state: Dict = data.get("state", {})
+        self._saved_at = time.monotonic()
+        self._pending: Optional[Dict] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def load(task_id: Optional[str]) -> "Checkpoint":
+        data = get_task_checkpoint(task_id) if task_id else None
+        if data:
+            logger.info(f"Resuming task {task_id} at stage {data.get('stage')}, offset {data.get('offset', 0)}")
+        return Checkpoint(task_id, data)
+
+    def passed(self, stage: str, stages: List[str]) -> bool:
+        """True if the checkpoint is already beyond `stage`."""
+        return self.stage in stages and stages.index(self.stage) > stages.index(stage)
+
+    def enter(self, stage: str):
+        if self.stage == stage:
+            return
+        self.stage = stage
+        self.offset = 0
+        self.done = IdRanges()
+        self.save(force=True)
+
+    def advance(self, offset: int):
+        # Everything before the offset is finished, so the done IDs are no longer needed
+        self.offset = offset
+        self.done = IdRanges()
+        self.save(force=True)
+
+    def mark_done(self, subdomain_id: int):
+        self.done.add(subdomain_id)
+        self.save()
+
+    def to_dict(self) -> Dict:
+        return {"stage": self.stage, "offset": self.offset, "done": self.done.to_list(), "state": self.state}
+
+    def save(self, force: bool = False):
+        if self.task_id is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._saved_at < settings.CHECKPOINT_INTERVAL_SECONDS:
+            return
+        self._saved_at = now
+        # Copied now, since the stage keeps changing its state while the write runs
+        data = copy.deepcopy(self.to_dict())
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            save_task_checkpoint(self.task_id, data)
+            return
+        self._pending = data
+        if self._writer is None:
+            self._writer = loop.create_task(self._write())
+
+    async def _write(self):
+        try:
+            while self._pending is not None:
+                data, self._pending = self._pending, None
+                await asyncio.to_thread(save_task_checkpoint, self.task_id, data)
+        finally:
+            self._writer = None
@@ -0,0 +1,105 @@
+# app/services/delta_recon.py
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from app.config import settings
+from app.db.operations import (
+    add_dns_resolutions_bulk, get_database_time, get_latest_dns_resolutions, get_subdomain_activity, get_subdomain_ids
+)
+from app.services.dns_cache import dns_cache
+from app.services.dns_resolver import DNSResolver
+from app.services.enumeration_scheduler import enumeration_scheduler
+from app.services.http_prober import HTTPProber
+from app.services.wildcard_detector import WildcardFilter
+
+logger = logging.getLogger("bbrf")
+
+class DeltaRecon:
+    """Recon that only pushes what changed since the last run through DNS and HTTP.
+
+    The DNS frontier is every name without a still-valid answer: names
+    created by this run's enumeration and names whose TTL (or
+    `max_staleness`) has expired. The HTTP frontier is every resolving
+    name that is new, whose A records differ from its previous answer, or
+    that has never been probed. Everything else keeps its stored results.
+    """
+
+    @staticmethod
+    def ip_set(record: Optional[Dict]) -> Set[str]:
+        return set((record or {}).get('a') or [])
+
+    @staticmethod
+    async def store_resolutions(domain: str, resolutions: List[Dict]) -> int:
+        subdomain_ids = await asyncio.to_thread(get_subdomain_ids, domain, [record['host'] for record in resolutions])
+        return await asyncio.to_thread(add_dns_resolutions_bulk, subdomain_ids, resolutions)
+
+    @staticmethod
+    async def run(domain: str, max_staleness: Optional[int] = None) -> Dict:
+        logger.info(f"Starting delta recon for domain: {domain}")
+        start_time = datetime.now()
+
+        # Database clock, so created_at/updated_at comparisons are not skewed by the app host
+        run_started = await asyncio.to_thread(get_database_time)
+
+        subdomains = await enumeration_scheduler.enumerate(domain)
+        activity = await asyncio.to_thread(get_subdomain_activity, domain, run_started)
+        all_names = activity["new"] + activity["seen"] + activity["missing"]
+
+        # Step 1: DNS frontier
+        fresh, to_resolve = await asyncio.to_thread(dns_cache.partition, domain, all_names, max_staleness)
+        # Previous answers of the names about to be re-resolved, read before this run stores new ones
+        previous_dns = await asyncio.to_thread(get_latest_dns_resolutions, domain, to_resolve)
+        new_names = set(activity["new"])
+        expired = [name for name in to_resolve if name not in new_names and name in previous_dns]
+        logger.info(f"Delta for {domain}: {len(new_names)} new, {len(expired)} expired, {len(fresh)} still fresh")
+        dns_results = await DNSResolver.resolve(to_resolve)
+        for result in dns_results:
+            dns_cache.store(domain, result)
+
+        wildcard_filter = WildcardFilter(domain, {})
+        if settings.WILDCARD_FILTER:
+            wildcard_filter = await WildcardFilter.for_domain(domain, all_names, settings.WILDCARD_PROBES)
+        fresh = wildcard_filter.filter(fresh)
+        dns_results = wildcard_filter.filter(dns_results)
+        dns_added = await DeltaRecon.store_resolutions(domain, dns_results)
+
+        # Step 2: HTTP frontier
+        ip_changed = {
+            result['host'] for result in dns_results
+            if result['host'] in previous_dns
+            and DeltaRecon.ip_set(result) != DeltaRecon.ip_set(previous_dns[result['host']].get('raw_data'))
+        }
+        validators = await asyncio.to_thread(HTTPProber.get_validators, domain)
+        probed_hosts = {validator.get('host') for validator in validators.values()}
+        resolving = {record['host'] for record in fresh + dns_results if record.get('a')}
+        unprobed = resolving - probed_hosts
+        frontier = resolving & (new_names | ip_changed | unprobed)
+
+        http_changes = {}
+        if frontier:
+            _, http_changes = await HTTPProber.probe_domain(domain, exclude=wildcard_filter.pruned_hosts, only=frontier)
+        added_http_results = http_changes.get("inserted", 0) + http_changes.get("updated", 0)
+
+        delta = {
+            "new_subdomains": len(new_names),
+            "missing_subdomains": len(activity["missing"]),
+            "dns_fresh": len(fresh),
+            "dns_expired": len(expired),
+            "dns_resolved": len(dns_results),
+            "ip_changed": len(ip_changed),
+            "http_frontier": len(frontier),
+            "http_skipped": len(resolving) - len(frontier),
+        }
+        total_time = datetime.now() - start_time
+        logger.info(f"Delta recon for {domain} finished in {total_time}: {delta}")
+        return {
+            "subdomains_added": len(subdomains),
+            "dns_results_added": dns_added,
+            "http_results_added": added_http_results,
+            "wildcard_pruned": wildcard_filter.report(),
+            "http_changes": http_changes,
+            "delta": delta,
+            "total_time": str(total_time)
+        }
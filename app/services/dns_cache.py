@@ -0,0 +1,81 @@
+# app/services/dns_cache.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.config import settings
+from app.db.operations import get_latest_dns_resolutions
+
+logger = logging.getLogger("bbrf")
+
+class DNSCache:
+    """In-process LRU of DNS answers, backed by the dns_resolutions table.
+
+    An answer is fresh while its age is below its TTL, or below
+    `max_staleness` seconds when the caller overrides it.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Dict, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: Tuple[str, str]) -> Optional[Tuple[Dict, float, int]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key: Tuple[str, str], record: Dict, resolved_at: float, ttl: int):
+        with self._lock:
+            self._entries[key] = (record, resolved_at, ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _is_fresh(resolved_at: float, ttl: int, now: float, max_staleness: Optional[int]) -> bool:
+        lifetime = max_staleness if max_staleness is not None else ttl
+        return now - resolved_at < lifetime
+
+    def partition(self, domain: str, subdomains: Iterable[str], max_staleness: Optional[int] = None) -> Tuple[List[Dict], List[str]]:
+        """Split subdomains into cached answers that are still valid and
+        names that must be sent to the resolver."""
+        now = time.time()
+        fresh, misses, stale = [], [], []
+
+        for subdomain in subdomains:
+            entry = self._get((domain, subdomain))
+            if entry is None:
+                misses.append(subdomain)
+            elif self._is_fresh(entry[1], entry[2], now, max_staleness):
+                fresh.append(entry[0])
+            else:
+                stale.append(subdomain)
+
+        if misses:
+            stored = get_latest_dns_resolutions(domain, misses)
+            for subdomain in misses:
+                row = stored.get(subdomain)
+                if row is None or row["created_at"] is None or not row["raw_data"]:
+                    stale.append(subdomain)
+                    continue
+                resolved_at = row["created_at"].timestamp()
+                ttl = row["ttl"] or 0
+                self._put((domain, subdomain), row["raw_data"], resolved_at, ttl)
+                if self._is_fresh(resolved_at, ttl, now, max_staleness):
+                    fresh.append(row["raw_data"])
+                else:
+                    stale.append(subdomain)
+
+        logger.info(f"DNS cache for {domain}: {len(fresh)} fresh, {len(stale)} to resolve")
+        return fresh, stale
+
+    def store(self, domain: str, record: Dict):
+        if record.get('host'):
+            self._put((domain, record['host']), record, time.time(), record.get('ttl') or 0)
+
+dns_cache = DNSCache(settings.DNS_CACHE_SIZE)
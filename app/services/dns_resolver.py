@@ -1,48 +1,70 @@
 # app/services/dns_resolver.py
 
-import asyncio
-import json
-from typing import List, Dict
+from typing import List, Dict, AsyncIterator, Optional
 import logging
 import shutil
+from app.config import settings
+from app.services.tool_stream import stream_json_lines, Inputs
+from app.services.native_dns import NativeDNSResolver
+from app.services.resolver_pool import resolver_pool
 
 logger = logging.getLogger("bbrf")
 
 class DNSResolver:
     @staticmethod
-    async def resolve(subdomains: List[str]) -> List[Dict]:
+    async def resolve_stream(subdomains: Inputs, processes: Optional[int] = None, backend: Optional[str] = None) -> AsyncIterator[Dict]:
+        backend = backend or settings.DNS_BACKEND
+        if backend == "native":
+            stream = DNSResolver._resolve_native(subdomains)
+        elif backend == "dnsx":
+            stream = DNSResolver._resolve_dnsx(subdomains, processes)
+        else:
+            raise ValueError(f"Unknown DNS backend: {backend}")
+
+        async for result in stream:
+            yield result
+
+    @staticmethod
+    async def _resolve_native(subdomains: Inputs) -> AsyncIterator[Dict]:
+        logger.info(f"Starting native DNS resolution against {len(settings.DNS_RESOLVERS)} resolvers")
+        async for result in NativeDNSResolver.resolve_stream(
+            subdomains,
+            settings.DNS_RESOLVERS,
+            concurrency=settings.DNS_CONCURRENCY,
+            timeout=settings.DNS_TIMEOUT,
+            retries=settings.DNS_RETRIES,
+            pool=resolver_pool
+        ):
+            logger.debug(f"Resolved {result.get('host')}: {result}")
+            yield result
+
+    @staticmethod
+    async def _resolve_dnsx(subdomains: Inputs, processes: Optional[int] = None) -> AsyncIterator[Dict]:
         if not shutil.which('dnsx'):
             logger.error("dnsx is not installed or not in PATH")
-            return []
+            return
 
-        logger.info(f"Starting DNS resolution for {len(subdomains)} subdomains")
-        results = []
-
-        for subdomain in subdomains:
-            try:
-                logger.debug(f"Processing subdomain: {subdomain}")
-                process = await asyncio.create_subprocess_exec(
-                    'dnsx', '-a', '-resp', '-json','-silent', 
-                    stdin=asyncio.subprocess.PIPE,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                
-                stdout, stderr = await process.communicate(subdomain.encode())
-                
-                if process.returncode != 0:
-                    logger.error(f"dnsx failed for {subdomain}: {stderr.decode()}")
-                    continue
-                
-                try:
-                    result = json.loads(stdout.decode().strip())
-                    results.append(result)
-                    logger.info(f"Resolved {subdomain}: {result}")
-                except json.JSONDecodeError:
-                    logger.error(f"Failed to parse JSON for {subdomain}")
-            
-            except Exception as e:
-                logger.exception(f"Error processing {subdomain}: {str(e)}")
+        processes = processes or settings.DNSX_PROCESSES
+        logger.info(f"Starting streaming DNS resolution with {processes} dnsx process(es)")
+        # dnsx balances and retries across its resolvers itself and reports no
+        # per-query outcomes, so the resolver pool only steers the native backend
+        args = [
+            'dnsx', '-a', '-resp', '-json', '-silent',
+            '-t', str(settings.DNSX_THREADS),
+            '-r', ','.join(settings.DNS_RESOLVERS)
+        ]
+
+        resolved_count = 0
+        async for result in stream_json_lines(args, subdomains, processes):
+            resolved_count += 1
+            logger.debug(f"Resolved {result.get('host')}: {result}")
+            yield result
+
+        logger.info(f"Streaming DNS resolution completed. Resolved {resolved_count} subdomains")
 
+    @staticmethod
+    async def resolve(subdomains: List[str]) -> List[Dict]:
+        logger.info(f"Starting DNS resolution for {len(subdomains)} subdomains")
+        results = [result async for result in DNSResolver.resolve_stream(subdomains)]
         logger.info(f"DNS resolution completed. Resolved {len(results)} out of {len(subdomains)} subdomains")
-        return results
\ No newline at end of file
+        return results
@@ -0,0 +1,89 @@
+# app/services/dns_stage.py
+
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from app.config import settings
+from app.db.operations import add_dns_resolutions_bulk, get_subdomains
+from app.services.checkpoint import Checkpoint
+from app.services.dns_cache import dns_cache
+from app.services.dns_resolver import DNSResolver
+from app.services.wildcard_detector import WildcardFilter
+
+logger = logging.getLogger("bbrf")
+
+class DNSStage:
+    @staticmethod
+    async def run(domain: str, max_staleness: Optional[int] = None, checkpoint: Optional[Checkpoint] = None,
+                  on_progress: Optional[Callable[[int, int], None]] = None) -> Tuple[List[Dict], int, WildcardFilter]:
+        """Resolve every stored subdomain of a domain and persist the answers.
+
+        Subdomains are taken in ID order and resolved in chunks of
+        DNS_CHECKPOINT_CHUNK_SIZE. The checkpoint offset moves to the end of
+        each finished chunk and within a chunk the persisted subdomain IDs
+        are marked done, so a resumed run skips everything already stored.
+        Returns the kept resolutions (cached and new), the number of rows
+        added and the wildcard filter that was applied.
+        """
+        checkpoint = checkpoint or Checkpoint()
+        subdomains = await asyncio.to_thread(get_subdomains, domain)
+        subdomain_ids = {subdomain.subdomain: subdomain.id for subdomain in subdomains}
+        position = {subdomain.subdomain: i for i, subdomain in enumerate(subdomains)}
+        total_subdomains = len(subdomains)
+        logger.info(f"Found {total_subdomains} subdomains for {domain}")
+
+        # Answers that are still within their TTL are reused without querying
+        cached, to_resolve = await asyncio.to_thread(dns_cache.partition, domain, list(subdomain_ids), max_staleness)
+        to_resolve = sorted(
+            (name for name in to_resolve if position[name] >= checkpoint.offset and subdomain_ids[name] not in checkpoint.done),
+            key=position.get
+        )
+        logger.info(f"Reusing {len(cached)} cached DNS answers, resolving {len(to_resolve)} subdomains")
+
+        wildcard_filter = WildcardFilter(domain, {})
+        if settings.WILDCARD_FILTER:
+            wildcard_filter = await WildcardFilter.for_domain(domain, list(subdomain_ids), settings.WILDCARD_PROBES)
+
+        resolved = wildcard_filter.filter(cached)
+        total_added = 0
+        pending: List[Dict] = []
+        pending_ids: List[int] = []
+
+        async def flush():
+            nonlocal total_added, pending, pending_ids
+            batch, batch_ids, pending, pending_ids = pending, pending_ids, [], []
+            if batch:
+                total_added += await asyncio.to_thread(add_dns_resolutions_bulk, subdomain_ids, batch)
+            # Marked only once stored; a failed store raises before this, so a
+            # resume re-resolves the batch instead of skipping it
+            for subdomain_id in batch_ids:
+                checkpoint.mark_done(subdomain_id)
+
+        chunk_size = settings.DNS_CHECKPOINT_CHUNK_SIZE
+        for start in range(0, len(to_resolve), chunk_size):
+            chunk = to_resolve[start:start + chunk_size]
+            # Results are persisted in batches as the resolver emits them instead of after the whole chunk
+            async for resolution in DNSResolver.resolve_stream(chunk):
+                subdomain_id = subdomain_ids.get(resolution.get('host'))
+                if subdomain_id is None:
+                    logger.warning(f"Resolved host {resolution.get('host')} does not match a known subdomain. Skipping.")
+                    continue
+
+                dns_cache.store(domain, resolution)
+                if wildcard_filter.keep(resolution):
+                    pending.append(resolution)
+                    resolved.append(resolution)
+                pending_ids.append(subdomain_id)
+                if len(pending_ids) >= settings.DNS_PERSIST_CHUNK_SIZE:
+                    await flush()
+
+            await flush()
+            checkpoint.advance(position[chunk[-1]] + 1)
+            if on_progress is not None:
+                on_progress(start + len(chunk), len(to_resolve))
+
+        logger.info(f"DNS resolution completed. Resolved {len(resolved)} out of {total_subdomains} subdomains")
+        logger.info(f"Total DNS resolutions added to database: {total_added}")
+        for zone, count in wildcard_filter.report().items():
+            logger.info(f"Pruned {count} wildcard answers under *.{zone}")
+        return resolved, total_added, wildcard_filter
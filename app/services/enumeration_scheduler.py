@@ -0,0 +1,84 @@
+# app/services/enumeration_scheduler.py
+
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from app.config import settings
+from app.services.subdomain_enumerator import SubdomainEnumerator
+
+logger = logging.getLogger("bbrf")
+
+class EnumerationScheduler:
+    """Runs subfinder for many root domains with bounded parallelism.
+
+    Passive-source budgets (requests per second) are shared by every run
+    the scheduler can have in flight: each of the `max_parallel` slots gets
+    an equal slice, so the sum across concurrent runs never exceeds the
+    configured budget for a source. The slots are process-wide, so every
+    subfinder run has to go through the shared `enumeration_scheduler`.
+    """
+
+    def __init__(self, max_parallel: int, rate_limit: Optional[int] = None,
+                 source_rate_limits: Optional[Dict[str, int]] = None):
+        self.max_parallel = max(1, max_parallel)
+        self.rate_limit = rate_limit
+        self.source_rate_limits = source_rate_limits or {}
+        self.semaphore = asyncio.Semaphore(self.max_parallel)
+
+    def per_run_rate_limit(self) -> Optional[int]:
+        if not self.rate_limit:
+            return None
+        return max(1, self.rate_limit // self.max_parallel)
+
+    def per_run_source_rate_limits(self) -> Dict[str, int]:
+        return {source: max(1, budget // self.max_parallel) for source, budget in self.source_rate_limits.items()}
+
+    async def enumerate(self, domain: str, on_progress: Optional[Callable[[int], None]] = None,
+                        on_start: Optional[Callable[[], None]] = None) -> List[str]:
+        """Enumerate and store one domain in a slot; subfinder errors are raised."""
+        async with self.semaphore:
+            if on_start is not None:
+                on_start()
+            return await SubdomainEnumerator.enumerate_and_store(
+                domain,
+                on_progress=on_progress,
+                rate_limit=self.per_run_rate_limit(),
+                source_rate_limits=self.per_run_source_rate_limits()
+            )
+
+    async def stream(self, domain: str) -> AsyncIterator[str]:
+        async with self.semaphore:
+            async for subdomain in SubdomainEnumerator.enumerate_stream(
+                domain, self.per_run_rate_limit(), self.per_run_source_rate_limits()
+            ):
+                yield subdomain
+
+    async def run(self, domains: List[str], on_update: Optional[Callable[[str, Dict], None]] = None) -> Dict[str, Dict]:
+        progress = {domain: {"status": "queued", "subdomain_count": 0, "error": None} for domain in domains}
+
+        def update(domain: str, **changes):
+            progress[domain].update(changes)
+            if on_update is not None:
+                on_update(domain, progress[domain])
+
+        async def run_one(domain: str):
+            try:
+                subdomains = await self.enumerate(
+                    domain,
+                    on_progress=lambda count: update(domain, subdomain_count=count),
+                    on_start=lambda: update(domain, status="in_progress")
+                )
+                update(domain, status="completed", subdomain_count=len(subdomains))
+            except Exception as e:
+                logger.exception(f"Error enumerating subdomains for {domain}: {str(e)}")
+                update(domain, status="failed", error=str(e))
+
+        logger.info(f"Scheduling enumeration of {len(domains)} domains with {self.max_parallel} parallel runs")
+        await asyncio.gather(*(run_one(domain) for domain in domains))
+        return progress
+
+enumeration_scheduler = EnumerationScheduler(
+    settings.SUBFINDER_MAX_PARALLEL,
+    rate_limit=settings.SUBFINDER_RATE_LIMIT,
+    source_rate_limits=settings.SUBFINDER_SOURCE_RATE_LIMITS
+)
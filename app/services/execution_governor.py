@@ -0,0 +1,149 @@
+# app/services/execution_governor.py
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+from app.config import settings
+
+logger = logging.getLogger("bbrf")
+
+# Set per request by the API middleware and per run by the services that know
+# the domain; tool processes started further down inherit them through the task context
+current_requester: contextvars.ContextVar[str] = contextvars.ContextVar("requester", default="anonymous")
+current_domain: contextvars.ContextVar[str] = contextvars.ContextVar("domain", default="-")
+
+class _ToolQueue:
+    """Slots for one tool with two-level round robin: requesters take turns,
+    and within a requester its domains take turns."""
+
+    def __init__(self, tool: str, slots: int):
+        self.tool = tool
+        self.slots = max(1, slots)
+        self.in_use = 0
+        self.waiters: "OrderedDict[str, OrderedDict[str, Deque[asyncio.Future]]]" = OrderedDict()
+        self.queued = 0
+        self.total_runs = 0
+        self.waits: Deque[float] = deque(maxlen=1000)
+        self.max_wait = 0.0
+
+    def _enqueue(self, requester: str, domain: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(requester, OrderedDict()).setdefault(domain, deque()).append(future)
+        self.queued += 1
+        return future
+
+    def _dispatch(self):
+        while self.in_use < self.slots and self.waiters:
+            requester, domains = next(iter(self.waiters.items()))
+            domain, futures = next(iter(domains.items()))
+            future = futures.popleft()
+            self.queued -= 1
+            if not futures:
+                del domains[domain]
+            else:
+                domains.move_to_end(domain)
+            if not domains:
+                del self.waiters[requester]
+            else:
+                self.waiters.move_to_end(requester)
+            if future.cancelled():
+                continue
+            self.in_use += 1
+            future.set_result(None)
+
+    def _discard(self, requester: str, domain: str, future: asyncio.Future):
+        futures = self.waiters.get(requester, {}).get(domain)
+        if futures is None or future not in futures:
+            return
+        futures.remove(future)
+        self.queued -= 1
+        if not futures:
+            del self.waiters[requester][domain]
+            if not self.waiters[requester]:
+                del self.waiters[requester]
+
+    async def acquire(self, requester: str, domain: str) -> float:
+        started = time.monotonic()
+        if self.in_use < self.slots and not self.waiters:
+            self.in_use += 1
+        else:
+            future = self._enqueue(requester, domain)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over just as we were cancelled
+                    self.release()
+                else:
+                    self._discard(requester, domain, future)
+                raise
+        waited = time.monotonic() - started
+        self.total_runs += 1
+        self.waits.append(waited)
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def release(self):
+        self.in_use -= 1
+        self._dispatch()
+
+    def snapshot(self) -> Dict:
+        waits = sorted(self.waits)
+        return {
+            "tool": self.tool,
+            "slots": self.slots,
+            "in_use": self.in_use,
+            "queue_depth": self.queued,
+            "queued_by_requester": {
+                requester: sum(len(futures) for futures in domains.values())
+                for requester, domains in self.waiters.items()
+            },
+            "total_runs": self.total_runs,
+            "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "p95_wait_seconds": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+            "max_wait_seconds": round(self.max_wait, 3),
+        }
+
+class ExecutionGovernor:
+    """Caps how many processes of each external tool run at once.
+
+    Every subfinder/dnsx/httpx process is started inside `slot()`. When a
+    tool is at its limit, callers queue and are served fairly across
+    requesters and, for one requester, across domains, so one large recon
+    cannot starve everyone else.
+    """
+
+    def __init__(self, slots: Dict[str, int], default_slots: int = 2):
+        self.slots = slots
+        self.default_slots = default_slots
+        self._queues: Dict[str, _ToolQueue] = {}
+
+    def _queue(self, tool: str) -> _ToolQueue:
+        queue = self._queues.get(tool)
+        if queue is None:
+            queue = self._queues[tool] = _ToolQueue(tool, self.slots.get(tool, self.default_slots))
+        return queue
+
+    @asynccontextmanager
+    async def slot(self, tool: str, domain: Optional[str] = None):
+        queue = self._queue(tool)
+        requester = current_requester.get()
+        domain = domain or current_domain.get()
+        waited = await queue.acquire(requester, domain)
+        if waited > 1:
+            logger.info(f"Waited {waited:.1f}s for a {tool} slot ({requester}, {domain})")
+        try:
+            yield
+        finally:
+            queue.release()
+
+    def snapshot(self):
+        for tool in self.slots:
+            self._queue(tool)
+        return [queue.snapshot() for queue in self._queues.values()]
+
+governor = ExecutionGovernor(settings.GOVERNOR_TOOL_SLOTS, settings.GOVERNOR_DEFAULT_SLOTS)
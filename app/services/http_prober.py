@@ -1,63 +1,112 @@
 # app/services/http_prober.py
 
 import asyncio
-import json
 import logging
 import shutil
-from typing import List, Dict
-from sqlalchemy.orm import Session
+from typing import List, Dict, Optional, Set, Tuple, AsyncIterator, Callable
+from app.config import settings
 from app.db.database import SessionLocal
-from app.db.operations import get_dns_resolutions_for_probing, add_http_probe_results
+from app.db.operations import (
+    get_dns_resolutions_for_probing, add_http_probe_results, get_http_probe_validators, get_subdomains, touch_http_probe_results
+)
+from app.services.tool_stream import stream_json_lines, Inputs
+from app.services.native_http import NativeHTTPProber
+from app.services.probe_planner import ProbePlanner
+from app.services.execution_governor import current_domain
+from app.services.checkpoint import Checkpoint
+from app.services.wildcard_detector import WildcardFilter
 
 logger = logging.getLogger("bbrf")
 
 class HTTPProber:
     @staticmethod
-    async def probe(domains: List[str]) -> List[Dict]:
+    async def probe_stream(domains: Inputs, shards: Optional[int] = None, threads: Optional[int] = None,
+                           rate_limit: Optional[int] = None, backend: Optional[str] = None,
+                           validators: Optional[Dict[str, Dict]] = None) -> AsyncIterator[Dict]:
+        backend = backend or settings.HTTP_BACKEND
+        if backend == "native":
+            stream = HTTPProber._probe_native(domains, validators)
+        elif backend == "httpx":
+            stream = HTTPProber._probe_httpx(domains, shards, threads, rate_limit)
+        else:
+            raise ValueError(f"Unknown HTTP backend: {backend}")
+
+        async for result in stream:
+            yield result
+
+    @staticmethod
+    async def _probe_native(domains: Inputs, validators: Optional[Dict[str, Dict]] = None) -> AsyncIterator[Dict]:
+        logger.info(f"Starting native HTTP probing with concurrency {settings.HTTP_CONCURRENCY}")
+        async for result in NativeHTTPProber.probe_stream(
+            domains,
+            concurrency=settings.HTTP_CONCURRENCY,
+            per_host=settings.HTTP_PER_HOST_CONCURRENCY,
+            max_body=settings.HTTP_MAX_BODY_KB * 1024,
+            timeout=settings.HTTP_TIMEOUT,
+            validators=validators
+        ):
+            logger.debug(f"Probed {result.get('url')}: {result.get('status_code')} {result.get('title')}")
+            yield result
+
+    @staticmethod
+    async def _probe_httpx(domains: Inputs, shards: Optional[int] = None, threads: Optional[int] = None,
+                           rate_limit: Optional[int] = None) -> AsyncIterator[Dict]:
         if not shutil.which('httpx'):
             logger.error("httpx is not installed or not in PATH")
-            return []
+            return
 
-        logger.info(f"Starting HTTP probing for {len(domains)} domains")
-        results = []
-
-        for domain in domains:
-            try:
-                logger.debug(f"Probing domain: {domain}")
-                process = await asyncio.create_subprocess_exec(
-                    'httpx', '-silent', '-status-code', '-title', '-content-length', '-tech-detect', '-json',
-                    stdin=asyncio.subprocess.PIPE,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                
-                stdout, stderr = await process.communicate(domain.encode())
-                
-                if process.returncode != 0:
-                    logger.error(f"httpx failed for {domain}: {stderr.decode()}")
-                    continue
-                
-                try:
-                    result = json.loads(stdout.decode().strip())
-                    results.append(result)
-                    logger.info(f"Probed {domain}: {result.get('status_code')} {result.get('title')}")
-                except json.JSONDecodeError:
-                    logger.error(f"Failed to parse JSON for {domain}")
-            
-            except Exception as e:
-                logger.exception(f"Error probing {domain}: {str(e)}")
+        shards = shards or settings.HTTPX_SHARDS
+        threads = threads or settings.HTTPX_THREADS
+        rate_limit = rate_limit or settings.HTTPX_RATE_LIMIT
+        logger.info(f"Starting streaming HTTP probing with {shards} httpx process(es), {threads} threads and {rate_limit} req/s each")
+
+        args = [
+            'httpx', '-silent', '-status-code', '-title', '-content-length', '-tech-detect', '-json',
+            # Body hash and response headers let unchanged hosts be detected on refresh
+            '-hash', 'sha256', '-include-response-header',
+            '-threads', str(threads),
+            '-rate-limit', str(rate_limit)
+        ]
 
+        probed_count = 0
+        async for result in stream_json_lines(args, domains, shards):
+            probed_count += 1
+            headers = result.get('header') or {}
+            result.setdefault('etag', headers.get('etag'))
+            result.setdefault('last_modified', headers.get('last_modified') or headers.get('last-modified'))
+            logger.debug(f"Probed {result.get('input')}: {result.get('status_code')} {result.get('title')}")
+            yield result
+
+        logger.info(f"Streaming HTTP probing completed. Got {probed_count} responses")
+
+    @staticmethod
+    async def probe(domains: List[str]) -> List[Dict]:
+        logger.info(f"Starting HTTP probing for {len(domains)} domains")
+        results = [result async for result in HTTPProber.probe_stream(domains)]
         logger.info(f"HTTP probing completed. Probed {len(results)} out of {len(domains)} domains")
         return results
 
     @staticmethod
-    def get_domains_for_probing(domain: str) -> List[str]:
+    def get_targets_for_probing(domain: str, exclude: Optional[Set[str]] = None,
+                                wildcard_filter: Optional[WildcardFilter] = None) -> List[Tuple[str, Optional[str]]]:
         db = SessionLocal()
         try:
             resolutions = get_dns_resolutions_for_probing(db, domain)
-            domains = [resolution.resolved_domain for resolution in resolutions]
-            logger.info(f"Retrieved {len(domains)} domains for HTTP probing")
-            return domains
+            if wildcard_filter is not None:
+                # Stored answers that only repeat a zone's wildcard, e.g. from runs before the filter
+                resolutions = [
+                    resolution for resolution in resolutions
+                    if wildcard_filter.keep(resolution.raw_data or {
+                        "host": resolution.resolved_domain, "a": [resolution.ip_address] if resolution.ip_address else []
+                    })
+                ]
+            exclude = exclude or set()
+            targets = [
+                (resolution.resolved_domain, resolution.ip_address)
+                for resolution in resolutions if resolution.resolved_domain not in exclude
+            ]
+            logger.info(f"Retrieved {len(targets)} domains for HTTP probing")
+            return targets
         except Exception as e:
             logger.exception(f"Error retrieving domains for probing: {str(e)}")
             return []
@@ -65,19 +114,154 @@ class HTTPProber:
             db.close()
 
     @staticmethod
-    async def probe_domain(domain: str) -> List[Dict]:
-        domains = HTTPProber.get_domains_for_probing(domain)
-        if not domains:
+    def get_domains_for_probing(domain: str, exclude: Optional[Set[str]] = None) -> List[str]:
+        return [host for host, _ in HTTPProber.get_targets_for_probing(domain, exclude)]
+
+    @staticmethod
+    def persist_results(domain: str, probe_results: List[Dict], unchanged_urls: Optional[List[str]] = None) -> Dict[str, int]:
+        db = SessionLocal()
+        try:
+            stored = add_http_probe_results(db, domain, probe_results)
+            stored["touched"] = touch_http_probe_results(db, domain, unchanged_urls or [])
+            return stored
+        finally:
+            db.close()
+
+    @staticmethod
+    def classify(result: Dict, previous: Optional[Dict]) -> str:
+        if previous is None:
+            return "new"
+        if result.get('not_modified'):
+            return "unchanged"
+        body_hash = (result.get('hash') or {}).get('body_sha256')
+        if body_hash and body_hash == previous.get('body_hash') and result.get('status_code') == previous.get('status_code'):
+            return "unchanged"
+        return "changed"
+
+    @staticmethod
+    def count_gone(previous: Dict[str, Dict], seen_urls: Set[str], probed_hosts: Set[str]) -> int:
+        return sum(
+            1 for url, validator in previous.items()
+            if url not in seen_urls and validator.get('host') in probed_hosts
+        )
+
+    @staticmethod
+    async def probe_domain(domain: str, exclude: Optional[Set[str]] = None,
+                           on_progress: Optional[Callable[[List[Dict], int], None]] = None,
+                           only: Optional[Set[str]] = None,
+                           on_persisted: Optional[Callable[[List[str]], None]] = None,
+                           wildcard_filter: Optional[WildcardFilter] = None) -> Tuple[List[Dict], Dict[str, int]]:
+        """Probe the resolved hosts of a domain and store what changed.
+
+        `on_persisted` is called after every flush with the hosts whose
+        results are now stored (or were unchanged), for checkpointing.
+        """
+        current_domain.set(domain)
+        targets = await asyncio.to_thread(HTTPProber.get_targets_for_probing, domain, exclude, wildcard_filter)
+        if only is not None:
+            targets = [(host, ip_address) for host, ip_address in targets if host in only]
+        if not targets:
             logger.warning(f"No domains found for HTTP probing for {domain}")
-            return []
-        
-        probe_results = await HTTPProber.probe(domains)
-        
+            return [], {}
+
+        chunk_size = settings.HTTP_PERSIST_CHUNK_SIZE
+        probe_results = []
+        pending = []
+        unchanged_urls = []
+        recorded_hosts = []
+        stored = {"inserted": 0, "updated": 0, "skipped": 0, "touched": 0}
+
+        # Validators from the previous run let unchanged URLs skip the upsert,
+        # and the native backend turn them into conditional requests
+        previous = await asyncio.to_thread(HTTPProber.get_validators, domain)
+        seen_urls = set()
+        summary = {"new": 0, "changed": 0, "unchanged": 0, "gone": 0}
+
+        def record(result: Dict):
+            seen_urls.add(result.get('url'))
+            probe_results.append(result)
+            recorded_hosts.append(result.get('input'))
+            status = HTTPProber.classify(result, previous.get(result.get('url')))
+            summary[status] += 1
+            # Unchanged rows only get their last seen time refreshed
+            if status == "unchanged":
+                unchanged_urls.append(result.get('url'))
+            else:
+                pending.append(result)
+
+        domains = [host for host, _ in targets]
+        if settings.HTTP_DEDUP_BY_IP and settings.HTTP_BACKEND == "native":
+            plan = await ProbePlanner.plan(targets, settings.HTTP_DEDUP_MIN_GROUP)
+            domains = plan.to_probe
+            for result in plan.duplicates:
+                record(result)
+        elif settings.HTTP_DEDUP_BY_IP:
+            logger.info(f"HTTP_DEDUP_BY_IP has no effect with the {settings.HTTP_BACKEND} backend, probing every host")
+
+        async def flush():
+            nonlocal pending, unchanged_urls, recorded_hosts
+            if pending or unchanged_urls:
+                counts = await asyncio.to_thread(HTTPProber.persist_results, domain, pending, unchanged_urls)
+                for key, count in counts.items():
+                    stored[key] += count
+            # A failed write raises above, so hosts are only reported once stored
+            if on_persisted is not None:
+                on_persisted(recorded_hosts)
+            pending, unchanged_urls, recorded_hosts = [], [], []
+
+        # Persist in chunks while httpx is still running so results survive a crash.
+        # Chunks count every recorded host, so runs of unchanged hosts still report progress
+        async for result in HTTPProber.probe_stream(domains, validators=previous):
+            record(result)
+            if len(recorded_hosts) >= chunk_size:
+                await flush()
+                if on_progress is not None:
+                    on_progress(probe_results, len(targets))
+
+        await flush()
+
+        summary["gone"] = HTTPProber.count_gone(previous, seen_urls, {host for host, _ in targets})
+
+        logger.info(f"Stored HTTP probe results in the database: {stored}")
+        logger.info(f"HTTP probe changes for {domain}: {summary}")
+        # Row counts of the upserts next to the change classification
+        summary.update(stored)
+        return probe_results, summary
+
+    @staticmethod
+    async def probe_domain_checkpointed(domain: str, checkpoint: Checkpoint, exclude: Optional[Set[str]] = None,
+                                        on_progress: Optional[Callable[[List[Dict], int], None]] = None,
+                                        wildcard_filter: Optional[WildcardFilter] = None) -> Tuple[List[Dict], Dict[str, int]]:
+        """probe_domain that skips hosts the checkpoint has marked done and
+        marks every host done once its results are stored."""
+        subdomain_ids = {subdomain.subdomain: subdomain.id for subdomain in await asyncio.to_thread(get_subdomains, domain)}
+        done_hosts = {host for host, subdomain_id in subdomain_ids.items() if subdomain_id in checkpoint.done}
+        if done_hosts:
+            logger.info(f"Skipping {len(done_hosts)} hosts of {domain} probed before the checkpoint")
+
+        def on_persisted(hosts: List[str]):
+            for host in hosts:
+                if host in subdomain_ids:
+                    checkpoint.mark_done(subdomain_ids[host])
+
+        return await HTTPProber.probe_domain(
+            domain, exclude=(exclude or set()) | done_hosts, on_progress=on_progress, on_persisted=on_persisted,
+            wildcard_filter=wildcard_filter
+        )
+
+    @staticmethod
+    async def wildcard_filter_for(domain: str) -> Optional[WildcardFilter]:
+        """Wildcard fingerprints of a domain's zones, for probes not preceded
+        by a DNS stage that already pruned wildcard answers."""
+        if not settings.WILDCARD_FILTER:
+            return None
+        subdomains = [subdomain.subdomain for subdomain in await asyncio.to_thread(get_subdomains, domain)]
+        return await WildcardFilter.for_domain(domain, subdomains, settings.WILDCARD_PROBES)
+
+    @staticmethod
+    def get_validators(domain: str) -> Dict[str, Dict]:
         db = SessionLocal()
         try:
-            added_count = add_http_probe_results(db, domain, probe_results)
-            logger.info(f"Added/updated {added_count} HTTP probe results in the database")
+            return get_http_probe_validators(db, domain)
         finally:
             db.close()
-        
-        return probe_results
\ No newline at end of file
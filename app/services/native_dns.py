@@ -0,0 +1,310 @@
+# app/services/native_dns.py
+
+import asyncio
+import logging
+import random
+import socket
+import struct
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.services.tool_stream import InputFeed, Inputs
+from app.services.resolver_pool import ResolverPool, SUCCESS, TIMEOUT, ERROR
+
+logger = logging.getLogger("bbrf")
+
+DNS_PORT = 53
+UDP_RECEIVE_BUFFER = 4 * 1024 * 1024
+
+TYPE_A = 1
+TYPE_CNAME = 5
+TYPE_AAAA = 28
+CLASS_IN = 1
+
+FLAG_TC = 0x0200
+FLAG_RD = 0x0100
+
+RCODES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+
+# Answers with these codes are final; anything else is retried on another resolver
+FINAL_RCODES = {"NOERROR", "NXDOMAIN"}
+
+_DONE = object()
+
+class DNSQueryError(Exception):
+    pass
+
+def build_query(query_id: int, name: str, qtype: int = TYPE_A) -> bytes:
+    header = struct.pack("!HHHHHH", query_id, FLAG_RD, 1, 0, 0, 0)
+    qname = b"".join(
+        bytes([len(label)]) + label for label in (part.encode("idna") for part in name.rstrip(".").split(".")) if label
+    ) + b"\x00"
+    return header + qname + struct.pack("!HH", qtype, CLASS_IN)
+
+def _read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    labels = []
+    end = None
+    hops = 0
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            hops += 1
+            if hops > 64:
+                raise DNSQueryError("Compression pointer loop in DNS response")
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode("ascii", errors="replace"))
+        offset += length
+    return ".".join(labels), end if end is not None else offset
+
+def parse_response(data: bytes) -> Dict:
+    if len(data) < 12:
+        raise DNSQueryError("DNS response shorter than header")
+    query_id, flags, qdcount, ancount, _, _ = struct.unpack("!HHHHHH", data[:12])
+    offset = 12
+
+    question = None
+    for _ in range(qdcount):
+        question, offset = _read_name(data, offset)
+        offset += 4
+
+    answers = []
+    for _ in range(ancount):
+        name, offset = _read_name(data, offset)
+        rtype, _, ttl, rdlength = struct.unpack("!HHIH", data[offset:offset + 10])
+        offset += 10
+        rdata = data[offset:offset + rdlength]
+        if rtype == TYPE_A and rdlength == 4:
+            value = socket.inet_ntop(socket.AF_INET, rdata)
+        elif rtype == TYPE_AAAA and rdlength == 16:
+            value = socket.inet_ntop(socket.AF_INET6, rdata)
+        elif rtype == TYPE_CNAME:
+            value, _ = _read_name(data, offset)
+        else:
+            value = None
+        answers.append({"name": name, "type": rtype, "ttl": ttl, "value": value})
+        offset += rdlength
+
+    return {
+        "id": query_id,
+        "truncated": bool(flags & FLAG_TC),
+        "rcode": RCODES.get(flags & 0x000F, str(flags & 0x000F)),
+        "question": question,
+        "answers": answers,
+    }
+
+class _ResolverProtocol(asyncio.DatagramProtocol):
+    """One UDP socket per upstream resolver, demultiplexing answers by query ID."""
+
+    def __init__(self):
+        self.transport = None
+        self.pending: Dict[int, Tuple[str, asyncio.Future]] = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 12:
+            return
+        query_id = struct.unpack("!H", data[:2])[0]
+        entry = self.pending.get(query_id)
+        if entry is None:
+            return
+        name, future = entry
+        try:
+            response = parse_response(data)
+        except (DNSQueryError, IndexError, struct.error) as e:
+            if not future.done():
+                future.set_exception(DNSQueryError(f"Malformed response for {name}: {str(e)}"))
+            return
+        if (response["question"] or "").lower().rstrip(".") != name.lower().rstrip("."):
+            return
+        if not future.done():
+            future.set_result(response)
+
+    def error_received(self, exc):
+        logger.debug(f"UDP error from resolver: {str(exc)}")
+
+    def next_query_id(self) -> int:
+        while True:
+            query_id = random.randrange(65536)
+            if query_id not in self.pending:
+                return query_id
+
+class NativeDNSClient:
+    def __init__(self, resolvers: List[str], timeout: float = 2.0, retries: int = 2, pool: Optional[ResolverPool] = None):
+        self.resolvers = resolvers
+        self.pool = pool
+        self.timeout = timeout
+        self.retries = retries
+        self._protocols: Dict[str, _ResolverProtocol] = {}
+        self._next_resolver = 0
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        for resolver in self.resolvers:
+            host, port = self._address(resolver)
+            transport, protocol = await loop.create_datagram_endpoint(_ResolverProtocol, remote_addr=(host, port))
+            # Thousands of answers can arrive in a burst; avoid kernel-side drops
+            sock = transport.get_extra_info('socket')
+            if sock is not None:
+                try:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECEIVE_BUFFER)
+                except OSError:
+                    pass
+            self._protocols[resolver] = protocol
+
+    def close(self):
+        for protocol in self._protocols.values():
+            if protocol.transport is not None:
+                protocol.transport.close()
+        self._protocols.clear()
+
+    @staticmethod
+    def _address(resolver: str) -> Tuple[str, int]:
+        host, _, port = resolver.rpartition(":") if resolver.count(":") == 1 else (resolver, "", "")
+        return host, int(port) if port else DNS_PORT
+
+    async def acquire_resolver(self) -> str:
+        if self.pool is not None:
+            return await self.pool.acquire()
+        resolver = self.resolvers[self._next_resolver % len(self.resolvers)]
+        self._next_resolver += 1
+        return resolver
+
+    async def release_resolver(self, resolver: str, outcome: str, latency: Optional[float] = None):
+        if self.pool is not None:
+            await self.pool.release(resolver, outcome, latency)
+
+    async def _query_udp(self, resolver: str, name: str, qtype: int) -> Dict:
+        protocol = self._protocols[resolver]
+        query_id = protocol.next_query_id()
+        future = asyncio.get_running_loop().create_future()
+        protocol.pending[query_id] = (name, future)
+        try:
+            protocol.transport.sendto(build_query(query_id, name, qtype))
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            protocol.pending.pop(query_id, None)
+
+    async def _query_tcp(self, resolver: str, name: str, qtype: int) -> Dict:
+        host, port = self._address(resolver)
+        query = build_query(random.randrange(65536), name, qtype)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+        try:
+            writer.write(struct.pack("!H", len(query)) + query)
+            await writer.drain()
+            length = struct.unpack("!H", await asyncio.wait_for(reader.readexactly(2), self.timeout))[0]
+            return parse_response(await asyncio.wait_for(reader.readexactly(length), self.timeout))
+        finally:
+            writer.close()
+
+    async def query(self, name: str, qtype: int = TYPE_A) -> Tuple[Optional[Dict], Optional[str]]:
+        """Resolve a name, rotating resolvers across retries. Returns the parsed
+        response and the resolver that produced it, or (None, None)."""
+        for attempt in range(self.retries + 1):
+            resolver = await self.acquire_resolver()
+            started = time.monotonic()
+            try:
+                response = await self._query_udp(resolver, name, qtype)
+                if response["truncated"]:
+                    logger.debug(f"Truncated answer for {name} from {resolver}, retrying over TCP")
+                    response = await self._query_tcp(resolver, name, qtype)
+            except asyncio.TimeoutError:
+                logger.debug(f"Timeout resolving {name} via {resolver} (attempt {attempt + 1})")
+                await self.release_resolver(resolver, TIMEOUT)
+                continue
+            except (DNSQueryError, OSError, asyncio.IncompleteReadError) as e:
+                logger.debug(f"Error resolving {name} via {resolver}: {str(e)}")
+                await self.release_resolver(resolver, ERROR)
+                continue
+            except BaseException:
+                await self.release_resolver(resolver, ERROR)
+                raise
+
+            if response["rcode"] in FINAL_RCODES:
+                await self.release_resolver(resolver, SUCCESS, time.monotonic() - started)
+                return response, resolver
+            await self.release_resolver(resolver, ERROR)
+            logger.debug(f"{response['rcode']} for {name} from {resolver} (attempt {attempt + 1})")
+        return None, None
+
+    async def resolve(self, name: str) -> Optional[Dict]:
+        response, resolver = await self.query(name)
+        if response is None or response["rcode"] != "NOERROR":
+            return None
+        return to_dnsx_record(name, response, resolver)
+
+def to_dnsx_record(name: str, response: Dict, resolver: str) -> Optional[Dict]:
+    """Shape a parsed response like a `dnsx -a -resp -json` line."""
+    a_records = [answer["value"] for answer in response["answers"] if answer["type"] == TYPE_A and answer["value"]]
+    if not a_records:
+        return None
+    record = {
+        "host": name,
+        "ttl": min(answer["ttl"] for answer in response["answers"] if answer["type"] == TYPE_A),
+        "resolver": [resolver if ":" in resolver else f"{resolver}:{DNS_PORT}"],
+        "a": a_records,
+        "status_code": response["rcode"],
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    cnames = [answer["value"] for answer in response["answers"] if answer["type"] == TYPE_CNAME and answer["value"]]
+    if cnames:
+        record["cname"] = cnames
+    return record
+
+class NativeDNSResolver:
+    @staticmethod
+    async def resolve_stream(subdomains: Inputs, resolvers: List[str], concurrency: int = 1000,
+                             timeout: float = 2.0, retries: int = 2, pool: Optional[ResolverPool] = None) -> AsyncIterator[Dict]:
+        client = NativeDNSClient(resolvers, timeout=timeout, retries=retries, pool=pool)
+        await client.open()
+
+        feed = InputFeed(subdomains)
+        results = asyncio.Queue(maxsize=concurrency)
+        start = time.monotonic()
+
+        async def worker():
+            try:
+                while True:
+                    name = await feed.next()
+                    if name is None:
+                        break
+                    try:
+                        record = await client.resolve(name)
+                    except Exception as e:
+                        logger.exception(f"Error resolving {name}: {str(e)}")
+                        continue
+                    if record is not None:
+                        await results.put(record)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"DNS worker stopped unexpectedly: {str(e)}")
+            await results.put(_DONE)
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+        remaining = len(workers)
+        resolved_count = 0
+        try:
+            while remaining:
+                item = await results.get()
+                if item is _DONE:
+                    remaining -= 1
+                    continue
+                resolved_count += 1
+                yield item
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await feed.close()
+            client.close()
+
+        logger.info(f"Native DNS resolution resolved {resolved_count} names in {time.monotonic() - start:.2f}s")
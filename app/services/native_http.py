@@ -0,0 +1,154 @@
+# app/services/native_http.py
+
+import asyncio
+import hashlib
+import html
+import logging
+import re
+import time
+from typing import AsyncIterator, Dict, Optional, Sequence
+
+import aiohttp
+
+from app.services.tool_stream import InputFeed, Inputs
+
+logger = logging.getLogger("bbrf")
+
+TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+USER_AGENT = "Mozilla/5.0 (compatible; reconthing)"
+
+_DONE = object()
+
+def extract_title(body: bytes, charset: Optional[str]) -> Optional[str]:
+    match = TITLE_RE.search(body)
+    if not match:
+        return None
+    title = match.group(1).decode(charset or "utf-8", errors="replace")
+    return " ".join(html.unescape(title).split()) or None
+
+async def read_limited(response: aiohttp.ClientResponse, max_bytes: int) -> bytes:
+    chunks = []
+    remaining = max_bytes
+    while remaining > 0:
+        chunk = await response.content.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+class NativeHTTPProber:
+    @staticmethod
+    async def fetch(session: aiohttp.ClientSession, host: str, scheme: str, max_body: int,
+                    validator: Optional[Dict] = None) -> Optional[Dict]:
+        url = f"{scheme}://{host}"
+        headers = {}
+        if validator:
+            if validator.get("etag"):
+                headers["If-None-Match"] = validator["etag"]
+            if validator.get("last_modified"):
+                headers["If-Modified-Since"] = validator["last_modified"]
+        started = time.monotonic()
+        try:
+            async with session.get(url, allow_redirects=False, headers=headers) as response:
+                peer = None
+                if response.connection is not None and response.connection.transport is not None:
+                    peer = response.connection.transport.get_extra_info("peername")
+                body = await read_limited(response, max_body)
+                elapsed = time.monotonic() - started
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeError, ValueError) as e:
+            logger.debug(f"No HTTP response from {url}: {str(e) or type(e).__name__}")
+            return None
+
+        content_length = response.headers.get("Content-Length")
+        return {
+            "input": host,
+            "url": url,
+            "scheme": scheme,
+            "port": str(response.url.port) if response.url.port else None,
+            "status_code": response.status,
+            "title": extract_title(body, response.charset),
+            "content_length": int(content_length) if content_length and content_length.isdigit() else len(body),
+            "content_type": response.content_type,
+            "webserver": response.headers.get("Server"),
+            "location": response.headers.get("Location"),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "not_modified": response.status == 304 and bool(headers),
+            "host": peer[0] if peer else None,
+            "time": f"{elapsed * 1000:.2f}ms",
+            # Same shape as `httpx -hash sha256`, computed over the bytes actually read
+            "hash": {"body_sha256": hashlib.sha256(body).hexdigest()},
+        }
+
+    @staticmethod
+    def create_session(concurrency: int, per_host: int, timeout: float) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=concurrency,
+            limit_per_host=per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=300,
+            ssl=False
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            headers={"User-Agent": USER_AGENT}
+        )
+
+    @staticmethod
+    async def probe_stream(hosts: Inputs, concurrency: int = 200, per_host: int = 4, max_body: int = 64 * 1024,
+                           timeout: float = 10.0, schemes: Sequence[str] = ("https", "http"),
+                           validators: Optional[Dict[str, Dict]] = None) -> AsyncIterator[Dict]:
+        """Probe every host on each scheme over one pooled keep-alive connector.
+
+        `concurrency` caps requests in flight globally and `per_host` caps
+        them per host; at most `max_body` bytes of each body are read.
+        URLs found in `validators` are requested conditionally with their
+        stored ETag / Last-Modified values.
+        """
+        validators = validators or {}
+        session = NativeHTTPProber.create_session(concurrency, per_host, timeout)
+        feed = InputFeed(hosts)
+        results = asyncio.Queue(maxsize=concurrency)
+        worker_count = max(1, concurrency // max(1, len(schemes)))
+
+        async def worker():
+            try:
+                while True:
+                    host = await feed.next()
+                    if host is None:
+                        break
+                    responses = await asyncio.gather(
+                        *(NativeHTTPProber.fetch(session, host, scheme, max_body, validators.get(f"{scheme}://{host}"))
+                          for scheme in schemes)
+                    )
+                    for response in responses:
+                        if response is not None:
+                            await results.put(response)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"HTTP probe worker stopped unexpectedly: {str(e)}")
+            await results.put(_DONE)
+
+        workers = [asyncio.create_task(worker()) for _ in range(worker_count)]
+        remaining = len(workers)
+        probed_count = 0
+        started = time.monotonic()
+        try:
+            while remaining:
+                item = await results.get()
+                if item is _DONE:
+                    remaining -= 1
+                    continue
+                probed_count += 1
+                yield item
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await feed.close()
+            await session.close()
+
+        logger.info(f"Native HTTP probing got {probed_count} responses in {time.monotonic() - started:.2f}s")
@@ -0,0 +1,130 @@
+# app/services/permutation_generator.py
+
+import hashlib
+import itertools
+import logging
+import math
+import re
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger("bbrf")
+
+LABEL_RE = re.compile(r"^[a-z0-9]([a-z0-9-]{0,61}[a-z0-9])?$")
+NUMBER_RE = re.compile(r"\d+")
+
+DEFAULT_WORDS = [
+    "dev", "development", "stage", "staging", "test", "qa", "uat", "prod", "production", "preprod",
+    "beta", "demo", "sandbox", "internal", "int", "corp", "admin", "api", "app", "portal",
+    "old", "new", "legacy", "backup", "v1", "v2", "mail", "vpn", "cdn", "static",
+]
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one blake2b digest."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class PermutationGenerator:
+    """Lazily generates permutation candidates from known subdomains.
+
+    Produces label insertions, word-label dash joins, number increments
+    and dash/dot swaps. Candidates are deduplicated against the known
+    names and each other with a Bloom filter sized for `max_candidates`,
+    so memory stays flat however many candidates are produced.
+    """
+
+    def __init__(self, domain: str, words: Optional[List[str]] = None, max_number_delta: int = 2,
+                 max_candidates: int = 5_000_000, error_rate: float = 0.001):
+        self.domain = domain.lower().rstrip(".")
+        self.words = [word.strip().lower() for word in (words or DEFAULT_WORDS) if word.strip()]
+        self.max_number_delta = max_number_delta
+        self.max_candidates = max_candidates
+        self.error_rate = error_rate
+
+    def relative_labels(self, subdomain: str) -> Optional[List[str]]:
+        subdomain = subdomain.lower().rstrip(".")
+        suffix = f".{self.domain}"
+        if not subdomain.endswith(suffix):
+            return None
+        return subdomain[:-len(suffix)].split(".")
+
+    def is_valid(self, labels: List[str]) -> bool:
+        if not all(LABEL_RE.match(label) for label in labels):
+            return False
+        return sum(len(label) + 1 for label in labels) + len(self.domain) <= 253
+
+    def permutations(self, labels: List[str]) -> Iterator[List[str]]:
+        count = len(labels)
+        for word in self.words:
+            for i in range(count + 1):
+                yield labels[:i] + [word] + labels[i:]
+            for i, label in enumerate(labels):
+                yield labels[:i] + [f"{word}-{label}"] + labels[i + 1:]
+                yield labels[:i] + [f"{label}-{word}"] + labels[i + 1:]
+
+        for i, label in enumerate(labels):
+            for match in NUMBER_RE.finditer(label):
+                value, width = int(match.group()), len(match.group())
+                for delta in range(-self.max_number_delta, self.max_number_delta + 1):
+                    if delta == 0 or value + delta < 0:
+                        continue
+                    number = str(value + delta).zfill(width)
+                    yield labels[:i] + [label[:match.start()] + number + label[match.end():]] + labels[i + 1:]
+
+            if "-" in label:
+                yield labels[:i] + [part for part in label.split("-") if part] + labels[i + 1:]
+
+        for i in range(count - 1):
+            yield labels[:i] + [f"{labels[i]}-{labels[i + 1]}"] + labels[i + 2:]
+
+    def generate(self, known: List[str]) -> Iterator[str]:
+        seen = BloomFilter(len(known) + self.max_candidates, self.error_rate)
+        for subdomain in known:
+            seen.add(subdomain.lower().rstrip("."))
+
+        emitted = 0
+        # The bare domain comes first so plain word.domain candidates are tried too
+        bases = itertools.chain([[]], (labels for labels in map(self.relative_labels, known) if labels))
+        for labels in bases:
+            for candidate_labels in self.permutations(labels):
+                if not self.is_valid(candidate_labels):
+                    continue
+                candidate = ".".join(candidate_labels + [self.domain])
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                yield candidate
+                emitted += 1
+                if emitted >= self.max_candidates:
+                    logger.warning(f"Stopping permutation generation for {self.domain} at {emitted} candidates")
+                    return
+
+        logger.info(f"Generated {emitted} permutation candidates for {self.domain}")
+
+    @staticmethod
+    def load_wordlist(path: Optional[str]) -> Optional[List[str]]:
+        if not path:
+            return None
+        try:
+            with open(path) as wordlist:
+                return [line.strip() for line in wordlist if line.strip() and not line.startswith("#")]
+        except OSError as e:
+            logger.error(f"Failed to read permutation wordlist {path}: {str(e)}")
+            return None
@@ -0,0 +1,109 @@
+# app/services/probe_planner.py
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.native_http import NativeHTTPProber
+
+logger = logging.getLogger("bbrf")
+
+SCHEMES = ("https", "http")
+
+class ProbePlan:
+    def __init__(self):
+        self.to_probe: List[str] = []
+        # Lightweight results for hosts collapsed onto a representative, ready to store
+        self.duplicates: List[Dict] = []
+        self.groups = 0
+
+class ProbePlanner:
+    """Collapses hosts that share an IP and only serve its default vhost.
+
+    For every IP with several hosts, the default vhost is fetched by IP and
+    fingerprinted (status, title, body hash per scheme). The first host of
+    the group is the representative and always gets a full probe; every
+    other host gets a cheap fetch with the body cut at `fingerprint_bytes`,
+    and hosts whose fingerprint equals the default vhost's are stored from
+    that fetch as duplicates of the representative instead of being fully
+    probed.
+
+    The fetches go through the native prober, so the planner is only used
+    with HTTP_BACKEND=native. It never saves requests: every host in a
+    shared group is still fetched, plus one fetch per shared IP. What it
+    saves is the full body of each duplicate; hosts that turn out to be
+    distinct are fetched twice. It pays off for large shared-hosting or CDN
+    groups whose pages are big, which is why it is off by default.
+    """
+
+    @staticmethod
+    def group_by_ip(targets: List[Tuple[str, Optional[str]]]) -> Dict[Optional[str], List[str]]:
+        groups = defaultdict(list)
+        for host, ip_address in targets:
+            groups[ip_address].append(host)
+        return groups
+
+    @staticmethod
+    def fingerprint(responses: Dict[str, Optional[Dict]]) -> Tuple:
+        return tuple(
+            (scheme, response["status_code"], response["title"], response["hash"]["body_sha256"]) if response else (scheme, None)
+            for scheme, response in sorted(responses.items())
+        )
+
+    @staticmethod
+    async def plan(targets: List[Tuple[str, Optional[str]]], min_group: int = 2, fingerprint_bytes: int = 4096) -> ProbePlan:
+        plan = ProbePlan()
+        groups = ProbePlanner.group_by_ip(targets)
+
+        shared = {ip: hosts for ip, hosts in groups.items() if ip and len(hosts) >= min_group}
+        for ip, hosts in groups.items():
+            if ip not in shared:
+                plan.to_probe.extend(hosts)
+        if not shared:
+            return plan
+
+        plan.groups = len(shared)
+        logger.info(f"Fingerprinting default vhosts for {len(shared)} shared IPs covering {sum(len(h) for h in shared.values())} hosts")
+        await ProbePlanner._plan_native(plan, shared, fingerprint_bytes)
+
+        logger.info(
+            f"Probe plan: {len(plan.to_probe)} hosts to probe, {len(plan.duplicates)} duplicate responses collapsed"
+        )
+        return plan
+
+    @staticmethod
+    async def _plan_native(plan: ProbePlan, shared: Dict[str, List[str]], fingerprint_bytes: int):
+        session = NativeHTTPProber.create_session(settings.HTTP_CONCURRENCY, settings.HTTP_PER_HOST_CONCURRENCY, settings.HTTP_TIMEOUT)
+        semaphore = asyncio.Semaphore(settings.HTTP_CONCURRENCY)
+
+        async def fetch_all(host: str) -> Dict[str, Optional[Dict]]:
+            async with semaphore:
+                responses = await asyncio.gather(
+                    *(NativeHTTPProber.fetch(session, host, scheme, fingerprint_bytes) for scheme in SCHEMES)
+                )
+            return dict(zip(SCHEMES, responses))
+
+        async def plan_group(ip: str, hosts: List[str]):
+            default = await fetch_all(f"[{ip}]" if ":" in ip else ip)
+            representative = hosts[0]
+            plan.to_probe.append(representative)
+            if all(response is None for response in default.values()):
+                plan.to_probe.extend(hosts[1:])
+                return
+
+            default_fingerprint = ProbePlanner.fingerprint(default)
+            host_responses = await asyncio.gather(*(fetch_all(host) for host in hosts[1:]))
+            for host, responses in zip(hosts[1:], host_responses):
+                if ProbePlanner.fingerprint(responses) != default_fingerprint:
+                    plan.to_probe.append(host)
+                    continue
+                for scheme, response in responses.items():
+                    if response is not None:
+                        response["duplicate_of"] = f"{scheme}://{representative}"
+                        plan.duplicates.append(response)
+
+        try:
+            await asyncio.gather(*(plan_group(ip, hosts) for ip, hosts in shared.items()))
+        finally:
+            await session.close()
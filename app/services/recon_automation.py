@@ -1,61 +1,53 @@
-from app.services.subdomain_enumerator import SubdomainEnumerator
-from app.services.dns_resolver import DNSResolver
-from app.services.http_prober import HTTPProber
-from app.db.database import SessionLocal
-from app.db.operations import add_subdomains, add_dns_resolutions, add_http_probe_results, get_subdomains
+from app.services.checkpoint import Checkpoint
+from app.services.recon_workflow import ReconWorkflow, ReconContext, DEFAULT_PROFILE
+from app.services.recon_pipeline import ReconPipeline
+from app.services.delta_recon import DeltaRecon
+from app.services.execution_governor import current_domain
+from app.config import settings
+import asyncio
 import logging
 from datetime import datetime
+from typing import Any, List, Optional
 
 logger = logging.getLogger("bbrf")
 
 class ReconAutomation:
     @staticmethod
-    async def basic_recon(domain: str):
+    async def basic_recon(domain: str, max_staleness: Optional[int] = None, mode: Optional[str] = None,
+                          task_id: Optional[str] = None, profile: Optional[List[Any]] = None):
+        current_domain.set(domain)
+        if profile is not None:
+            # Profiles are run by the workflow, which only the sequential mode uses
+            if mode not in (None, "sequential"):
+                raise ValueError(f"A recon profile cannot run in {mode} mode")
+            mode = "sequential"
+        mode = mode or settings.RECON_MODE
+        # Pipelined and delta runs are not checkpointed; a resumed one starts
+        # over, relying on the DNS cache and stored results to skip done work
+        if mode == "pipelined":
+            logger.info(f"Starting pipelined recon for domain: {domain}")
+            return await ReconPipeline(domain, max_staleness).run()
+        if mode == "delta":
+            return await DeltaRecon.run(domain, max_staleness)
+
         logger.info(f"Starting basic recon for domain: {domain}")
-        db = SessionLocal()
+        workflow = ReconWorkflow(profile or DEFAULT_PROFILE)
+        ctx = ReconContext(domain, max_staleness, await asyncio.to_thread(Checkpoint.load, task_id))
         start_time = datetime.now()
-        
-        try:
-            # Step 1: Subdomain Enumeration
-            subdomains = await SubdomainEnumerator.enumerate(domain)
-            added_subdomains = add_subdomains(domain, subdomains)
-            logger.info(f"Enumerated and added {added_subdomains} subdomains for {domain}")
-
-            # Step 2: DNS Resolution
-            all_subdomains = get_subdomains(domain)
-            subdomain_list = [subdomain.subdomain for subdomain in all_subdomains]
-            dns_results = await DNSResolver.resolve(subdomain_list)
-            
-            total_dns_added = 0
-            for subdomain in all_subdomains:
-                subdomain_resolutions = [d for d in dns_results if d['host'] == subdomain.subdomain]
-                if subdomain_resolutions:
-                    added_count = add_dns_resolutions(subdomain.id, subdomain_resolutions)
-                    total_dns_added += added_count
-            
-            logger.info(f"Resolved and added DNS for {total_dns_added} subdomains of {domain}")
-
-            # Step 3: HTTP Probing
-            http_results = await HTTPProber.probe_domain(domain)
-            added_http_results = add_http_probe_results(db, domain, http_results)
-            logger.info(f"Completed HTTP probing and added {added_http_results} results for {domain}")
-
-            db.commit()
-            
-            end_time = datetime.now()
-            total_time = end_time - start_time
 
+        try:
+            timings = await workflow.run(ctx)
+            total_time = datetime.now() - start_time
             return {
-                "subdomains_added": added_subdomains,
-                "dns_results_added": total_dns_added,
-                "http_results_added": added_http_results,
+                "subdomains_added": ctx.get("subdomains", 0) + ctx.get("permuted_subdomains", 0),
+                "dns_results_added": ctx.get("resolutions", 0),
+                "http_results_added": ctx.get("http_results", 0),
+                "wildcard_pruned": ctx.get("wildcard_pruned", {}),
+                "http_changes": ctx.get("http_changes", {}),
+                "nodes": timings,
                 "total_time": str(total_time)
             }
-        
+
         except Exception as e:
             logger.error(f"Error during basic recon for {domain}: {str(e)}")
-            db.rollback()
             raise
-        
-        finally:
-            db.close()
\ No newline at end of file
@@ -0,0 +1,195 @@
+# app/services/recon_pipeline.py
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from app.config import settings
+from app.db.operations import add_subdomains, add_dns_resolutions_bulk, get_subdomains, get_subdomain_ids
+from app.services.dns_cache import dns_cache
+from app.services.dns_resolver import DNSResolver
+from app.services.enumeration_scheduler import enumeration_scheduler
+from app.services.http_prober import HTTPProber
+from app.services.wildcard_detector import WildcardFilter
+
+logger = logging.getLogger("bbrf")
+
+_DONE = object()
+
+class QueueDrain:
+    """Items of a stage queue up to its end marker. `exhausted` tells whether
+    the consumer reached the marker, i.e. the upstream stage can finish."""
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+        self.exhausted = False
+
+    def __aiter__(self) -> AsyncIterator:
+        return self
+
+    async def __anext__(self):
+        item = await self.queue.get()
+        if item is _DONE:
+            self.exhausted = True
+            raise StopAsyncIteration
+        return item
+
+class StageError(RuntimeError):
+    pass
+
+class ReconPipeline:
+    """Enumeration, DNS and HTTP running concurrently over bounded queues.
+
+    A name goes to the resolver as soon as subfinder prints it and a host
+    goes to the prober as soon as it resolves. Each queue holds at most
+    `queue_size` items, so a slow stage blocks the one feeding it instead
+    of letting work pile up in memory.
+
+    Wildcard fingerprints are taken from the zones of already stored names
+    before the pipeline starts. IP-based probe deduplication needs every
+    target up front and is not applied in this mode.
+    """
+
+    def __init__(self, domain: str, max_staleness: Optional[int] = None, queue_size: Optional[int] = None):
+        self.domain = domain
+        self.max_staleness = max_staleness
+        self.queue_size = queue_size or settings.RECON_PIPELINE_QUEUE_SIZE
+        self.chunk_size = settings.SUBDOMAIN_FLUSH_CHUNK_SIZE
+        self.discovered = asyncio.Queue(maxsize=self.queue_size)
+        # (record, from_cache) pairs; cached answers are probed but not stored again
+        self.resolved = asyncio.Queue(maxsize=self.queue_size)
+        self.to_probe = asyncio.Queue(maxsize=self.queue_size)
+        self.wildcard_filter = WildcardFilter(domain, {})
+        self.counts = {"subdomains_added": 0, "dns_results_added": 0, "http_results_added": 0}
+        self.http_changes = {"new": 0, "changed": 0, "unchanged": 0, "gone": 0}
+
+    async def replay_stored(self, stored: List[str]):
+        cached, stale = await asyncio.to_thread(dns_cache.partition, self.domain, stored, self.max_staleness)
+        logger.info(f"Pipeline for {self.domain}: reusing {len(cached)} cached DNS answers")
+        for record in cached:
+            await self.resolved.put((record, True))
+        for subdomain in stale:
+            await self.discovered.put(subdomain)
+
+    async def discover_new(self, stored: List[str]):
+        # Stored names are replayed separately but still upserted when
+        # subfinder reports them, as in sequential mode
+        queued = set(stored)
+        found = set()
+        pending = []
+        async for subdomain in enumeration_scheduler.stream(self.domain):
+            if subdomain in found:
+                continue
+            found.add(subdomain)
+            pending.append(subdomain)
+            if subdomain not in queued:
+                queued.add(subdomain)
+                await self.discovered.put(subdomain)
+            if len(pending) >= self.chunk_size:
+                await asyncio.to_thread(add_subdomains, self.domain, pending)
+                pending = []
+        if pending:
+            await asyncio.to_thread(add_subdomains, self.domain, pending)
+        self.counts["subdomains_added"] = len(found)
+
+    async def enumerate_stage(self, stored: List[str]):
+        await asyncio.gather(self.replay_stored(stored), self.discover_new(stored))
+        await self.discovered.put(_DONE)
+
+    async def dns_stage(self):
+        names = QueueDrain(self.discovered)
+        async for result in DNSResolver.resolve_stream(names):
+            dns_cache.store(self.domain, result)
+            await self.resolved.put((result, False))
+        # A resolver that gave up early (e.g. dnsx missing) would leave enumeration blocked on a full queue
+        if not names.exhausted:
+            raise StageError(f"DNS stage for {self.domain} stopped before resolving every discovered name")
+        await self.resolved.put(_DONE)
+
+    async def store_resolutions(self, batch: List[Dict]):
+        names = [record['host'] for record in batch]
+        subdomain_ids = await asyncio.to_thread(get_subdomain_ids, self.domain, names)
+        # Names can resolve before the enumeration stage has flushed them
+        missing = [name for name in names if name not in subdomain_ids]
+        if missing:
+            await asyncio.to_thread(add_subdomains, self.domain, missing)
+            subdomain_ids.update(await asyncio.to_thread(get_subdomain_ids, self.domain, missing))
+        self.counts["dns_results_added"] += await asyncio.to_thread(add_dns_resolutions_bulk, subdomain_ids, batch)
+
+    async def store_probe_results(self, batch: List[Dict]):
+        stored = await asyncio.to_thread(HTTPProber.persist_results, self.domain, batch)
+        self.counts["http_results_added"] += stored["inserted"] + stored["updated"]
+
+    async def filter_stage(self):
+        pending = []
+        async for record, from_cache in QueueDrain(self.resolved):
+            if not self.wildcard_filter.keep(record):
+                continue
+            if not from_cache:
+                pending.append(record)
+                if len(pending) >= self.chunk_size:
+                    await self.store_resolutions(pending)
+                    pending = []
+            if record.get('a'):
+                await self.to_probe.put(record['host'])
+        if pending:
+            await self.store_resolutions(pending)
+        await self.to_probe.put(_DONE)
+
+    async def http_stage(self):
+        previous = await asyncio.to_thread(HTTPProber.get_validators, self.domain)
+        probed_hosts = set()
+        seen_urls = set()
+        pending = []
+
+        to_probe = QueueDrain(self.to_probe)
+
+        async def hosts():
+            async for host in to_probe:
+                probed_hosts.add(host)
+                yield host
+
+        async for result in HTTPProber.probe_stream(hosts(), validators=previous):
+            seen_urls.add(result.get('url'))
+            status = HTTPProber.classify(result, previous.get(result.get('url')))
+            self.http_changes[status] += 1
+            if status == "unchanged":
+                continue
+            pending.append(result)
+            if len(pending) >= settings.HTTP_PERSIST_CHUNK_SIZE:
+                await self.store_probe_results(pending)
+                pending = []
+        if pending:
+            await self.store_probe_results(pending)
+        if not to_probe.exhausted:
+            raise StageError(f"HTTP stage for {self.domain} stopped before probing every resolved host")
+        self.http_changes["gone"] = HTTPProber.count_gone(previous, seen_urls, probed_hosts)
+
+    async def run(self) -> Dict:
+        start_time = datetime.now()
+        stored = [subdomain.subdomain for subdomain in await asyncio.to_thread(get_subdomains, self.domain)]
+        if settings.WILDCARD_FILTER:
+            self.wildcard_filter = await WildcardFilter.for_domain(self.domain, stored, settings.WILDCARD_PROBES)
+
+        stages = [
+            asyncio.create_task(self.enumerate_stage(stored)),
+            asyncio.create_task(self.dns_stage()),
+            asyncio.create_task(self.filter_stage()),
+            asyncio.create_task(self.http_stage()),
+        ]
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            # A failed stage would leave its neighbours blocked on a queue
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+
+        total_time = datetime.now() - start_time
+        logger.info(f"Pipelined recon for {self.domain} finished in {total_time}: {self.counts}, HTTP changes {self.http_changes}")
+        return {
+            **self.counts,
+            "wildcard_pruned": self.wildcard_filter.report(),
+            "http_changes": self.http_changes,
+            "total_time": str(total_time)
+        }
@@ -0,0 +1,213 @@
+# app/services/recon_workflow.py
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.services.active_discovery import ActiveDiscovery
+from app.services.checkpoint import Checkpoint
+from app.services.dns_stage import DNSStage
+from app.services.enumeration_scheduler import enumeration_scheduler
+from app.services.http_prober import HTTPProber
+
+logger = logging.getLogger("bbrf")
+
+class ReconNode:
+    """A recon stage: what it needs, what it produces and how many runs of it
+    may be in flight across all recon tasks of this process."""
+
+    def __init__(self, name: str, run: Callable[["ReconContext", Checkpoint], Awaitable[Dict[str, Any]]],
+                 inputs: List[str], outputs: List[str], concurrency: int = 1,
+                 timeout: Optional[float] = None, checkpointed: bool = False):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs
+        self.concurrency = concurrency
+        self.timeout = timeout
+        # Uses the task checkpoint's offset and done IDs to resume mid-stage
+        self.checkpointed = checkpointed
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+NODES: Dict[str, ReconNode] = {}
+
+def recon_node(name: str, inputs: List[str], outputs: List[str], concurrency: int = 1,
+               timeout: Optional[float] = None, checkpointed: bool = False):
+    def register(run: Callable[["ReconContext", Checkpoint], Awaitable[Dict[str, Any]]]):
+        NODES[name] = ReconNode(name, run, inputs, outputs, concurrency, timeout, checkpointed)
+        return run
+    return register
+
+class ReconContext:
+    def __init__(self, domain: str, max_staleness: Optional[int], checkpoint: Checkpoint):
+        self.domain = domain
+        self.max_staleness = max_staleness
+        self.checkpoint = checkpoint
+        # Outputs of finished nodes, kept in the checkpoint so a resumed run skips them
+        self.finished: Dict[str, Dict[str, Any]] = checkpoint.state.setdefault("nodes", {})
+        self.values: Dict[str, Any] = {}
+        for outputs in self.finished.values():
+            self.values.update(outputs)
+        # Only one node at a time can own the checkpoint's offset and done IDs
+        self.cursor: Optional[str] = None
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.values.get(name, default)
+
+class ReconWorkflowError(ValueError):
+    pass
+
+class ReconWorkflow:
+    """Runs a recon profile as a DAG.
+
+    A node depends on the nodes in the profile that produce its inputs; an
+    input nothing in the profile produces is read from what is already
+    stored. Nodes start as soon as their dependencies finish, so independent
+    branches run in parallel. Each step is a node name or a dict with a
+    `node` and an optional `timeout` overriding the node's default.
+    """
+
+    def __init__(self, profile: List[Any]):
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        for step in profile:
+            step = {"node": step} if isinstance(step, str) else dict(step)
+            if step["node"] not in NODES:
+                raise ReconWorkflowError(f"Unknown recon node: {step['node']}")
+            if step["node"] in self.steps:
+                raise ReconWorkflowError(f"Recon node listed twice: {step['node']}")
+            self.steps[step["node"]] = step
+
+        producers: Dict[str, str] = {}
+        for name in self.steps:
+            for output in NODES[name].outputs:
+                if output in producers:
+                    raise ReconWorkflowError(f"Both {producers[output]} and {name} produce {output}")
+                producers[output] = name
+        self.dependencies = {
+            name: {producers[i] for i in NODES[name].inputs if i in producers} for name in self.steps
+        }
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order, remaining = [], dict(self.dependencies)
+        while remaining:
+            ready = [name for name, deps in remaining.items() if deps <= set(order)]
+            if not ready:
+                raise ReconWorkflowError(f"Recon profile has a dependency cycle between {sorted(remaining)}")
+            order.extend(ready)
+            for name in ready:
+                del remaining[name]
+        return order
+
+    def _claim_cursor(self, ctx: ReconContext, name: str) -> Checkpoint:
+        checkpoint = ctx.checkpoint
+        # An interrupted checkpointed node keeps the cursor it was resuming from
+        reserved = checkpoint.stage in self.steps and checkpoint.stage not in ctx.finished
+        if NODES[name].checkpointed and ctx.cursor is None and (not reserved or checkpoint.stage == name):
+            ctx.cursor = name
+            checkpoint.enter(name)
+            return checkpoint
+        return Checkpoint()
+
+    async def _run_node(self, ctx: ReconContext, name: str, timings: Dict[str, Dict]):
+        node = NODES[name]
+        timeout = self.steps[name].get("timeout", node.timeout)
+        queued = time.monotonic()
+        async with node.semaphore:
+            started = time.monotonic()
+            timing = timings[name] = {
+                "status": "running",
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "waited_seconds": round(started - queued, 3),
+            }
+            checkpoint = self._claim_cursor(ctx, name)
+            try:
+                outputs = await asyncio.wait_for(node.run(ctx, checkpoint), timeout=timeout)
+                timing["status"] = "completed"
+            except asyncio.TimeoutError:
+                timing["status"] = "timed_out"
+                raise TimeoutError(f"Recon node {name} timed out after {timeout}s")
+            except asyncio.CancelledError:
+                timing["status"] = "cancelled"
+                raise
+            except Exception:
+                timing["status"] = "failed"
+                raise
+            finally:
+                timing["duration_seconds"] = round(time.monotonic() - started, 3)
+                if ctx.cursor == name:
+                    ctx.cursor = None
+
+        missing = set(node.outputs) - set(outputs)
+        if missing:
+            raise ReconWorkflowError(f"Recon node {name} did not produce {sorted(missing)}")
+        ctx.values.update(outputs)
+        ctx.finished[name] = outputs
+        ctx.checkpoint.save(force=True)
+
+    async def run(self, ctx: ReconContext) -> Dict[str, Dict]:
+        """Run every node not finished before, returning per-node timing."""
+        timings: Dict[str, Dict] = {name: {"status": "resumed"} for name in self.order if name in ctx.finished}
+        done = set(timings)
+        running: Dict[asyncio.Task, str] = {}
+        try:
+            while len(done) < len(self.order):
+                started = set(running.values())
+                for name in self.order:
+                    if name not in done and name not in started and self.dependencies[name] <= done:
+                        logger.info(f"Starting recon node {name} for {ctx.domain}")
+                        running[asyncio.create_task(self._run_node(ctx, name, timings))] = name
+
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    name = running.pop(task)
+                    task.result()
+                    logger.info(f"Recon node {name} for {ctx.domain} finished in {timings[name]['duration_seconds']}s")
+                    done.add(name)
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+        return timings
+
+# Default nodes
+
+@recon_node("enumeration", inputs=[], outputs=["subdomains"], concurrency=4)
+async def enumerate_node(ctx: ReconContext, checkpoint: Checkpoint) -> Dict[str, Any]:
+    subdomains = await enumeration_scheduler.enumerate(ctx.domain)
+    logger.info(f"Enumerated and added {len(subdomains)} subdomains for {ctx.domain}")
+    return {"subdomains": len(subdomains)}
+
+@recon_node("permutations", inputs=["subdomains"], outputs=["permuted_subdomains"], concurrency=2)
+async def permutation_node(ctx: ReconContext, checkpoint: Checkpoint) -> Dict[str, Any]:
+    discovered = await ActiveDiscovery.discover(ctx.domain)
+    return {"permuted_subdomains": len(discovered)}
+
+@recon_node("dns", inputs=["subdomains"], outputs=["resolutions", "wildcard_hosts", "wildcard_pruned"],
+            concurrency=4, checkpointed=True)
+async def dns_node(ctx: ReconContext, checkpoint: Checkpoint) -> Dict[str, Any]:
+    _, dns_added, wildcard_filter = await DNSStage.run(ctx.domain, ctx.max_staleness, checkpoint)
+    logger.info(f"Resolved and added DNS for {dns_added} subdomains of {ctx.domain}")
+    return {
+        "resolutions": dns_added,
+        # Hosts dropped by the wildcard filter stay out of HTTP probing after a resume too
+        "wildcard_hosts": sorted(wildcard_filter.pruned_hosts),
+        "wildcard_pruned": wildcard_filter.report(),
+    }
+
+# Permutations resolve and store the hosts they find, so http waits for them
+# when that node is in the profile and probes them from the stored resolutions
+@recon_node("http", inputs=["resolutions", "wildcard_hosts", "permuted_subdomains"],
+            outputs=["http_results", "http_changes"], concurrency=4, checkpointed=True)
+async def http_node(ctx: ReconContext, checkpoint: Checkpoint) -> Dict[str, Any]:
+    # probe_domain persists results in chunks while probing
+    _, http_changes = await HTTPProber.probe_domain_checkpointed(
+        ctx.domain, checkpoint, exclude=set(ctx.get("wildcard_hosts", []))
+    )
+    added = http_changes.get("inserted", 0) + http_changes.get("updated", 0)
+    logger.info(f"Completed HTTP probing and added {added} results for {ctx.domain}")
+    return {"http_results": added, "http_changes": http_changes}
+
+# The sequence basic_recon has always run
+DEFAULT_PROFILE = ["enumeration", "dns", "http"]
@@ -0,0 +1,188 @@
+# app/services/resolver_pool.py
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from app.config import settings
+
+logger = logging.getLogger("bbrf")
+
+SUCCESS = "success"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+class ResolverHealth:
+    def __init__(self, address: str, window: int, initial_cwnd: float):
+        self.address = address
+        self.latency_ewma: Optional[float] = None
+        self.outcomes = deque(maxlen=window)
+        self.outcome_counts = {SUCCESS: 0, TIMEOUT: 0, ERROR: 0}
+        self.total_queries = 0
+        self.total_timeouts = 0
+        self.total_errors = 0
+        self.cwnd = initial_cwnd
+        self.in_flight = 0
+        self.quarantined_until = 0.0
+        self.quarantine_count = 0
+
+    def record(self, outcome: str):
+        if len(self.outcomes) == self.outcomes.maxlen:
+            self.outcome_counts[self.outcomes[0]] -= 1
+        self.outcomes.append(outcome)
+        self.outcome_counts[outcome] += 1
+
+    def reset_outcomes(self):
+        self.outcomes.clear()
+        self.outcome_counts = {SUCCESS: 0, TIMEOUT: 0, ERROR: 0}
+
+    def rate(self, outcome: str) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcome_counts[outcome] / len(self.outcomes)
+
+    def is_quarantined(self, now: float) -> bool:
+        return self.quarantined_until > now
+
+    def score(self) -> float:
+        # Healthy, fast resolvers get proportionally more traffic
+        success_rate = 1.0 - self.rate(TIMEOUT) - self.rate(ERROR)
+        latency = self.latency_ewma if self.latency_ewma is not None else 0.05
+        return max(success_rate, 0.01) / max(latency, 0.001)
+
+    def snapshot(self, now: float) -> Dict:
+        return {
+            "resolver": self.address,
+            "score": round(self.score(), 3),
+            "latency_ms": round(self.latency_ewma * 1000, 2) if self.latency_ewma is not None else None,
+            "timeout_rate": round(self.rate(TIMEOUT), 4),
+            "error_rate": round(self.rate(ERROR), 4),
+            "window": round(self.cwnd, 2),
+            "in_flight": self.in_flight,
+            "total_queries": self.total_queries,
+            "total_timeouts": self.total_timeouts,
+            "total_errors": self.total_errors,
+            "quarantined": self.is_quarantined(now),
+            "quarantined_for": max(0.0, round(self.quarantined_until - now, 1)),
+            "quarantine_count": self.quarantine_count,
+        }
+
+class ResolverPool:
+    """Tracks health per upstream resolver and hands out query slots.
+
+    Each resolver has an AIMD congestion window: every success grows it by
+    1/cwnd, every timeout or SERVFAIL halves it. Resolvers whose failure
+    rate over the recent window exceeds `quarantine_threshold` are taken
+    out of rotation with exponential backoff.
+    """
+
+    def __init__(self, resolvers: List[str], initial_cwnd: float = 32.0, min_cwnd: float = 1.0,
+                 max_cwnd: float = 1024.0, window: int = 200, quarantine_threshold: float = 0.5,
+                 quarantine_seconds: float = 30.0, max_quarantine_seconds: float = 600.0):
+        self.initial_cwnd = initial_cwnd
+        self.min_cwnd = min_cwnd
+        self.max_cwnd = max_cwnd
+        self.window = window
+        self.quarantine_threshold = quarantine_threshold
+        self.quarantine_seconds = quarantine_seconds
+        self.max_quarantine_seconds = max_quarantine_seconds
+        self.resolvers: Dict[str, ResolverHealth] = {
+            address: ResolverHealth(address, window, initial_cwnd) for address in resolvers
+        }
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _available(self, now: float) -> List[ResolverHealth]:
+        available = [
+            health for health in self.resolvers.values()
+            if not health.is_quarantined(now) and health.in_flight < max(self.min_cwnd, int(health.cwnd))
+        ]
+        if available:
+            return available
+
+        # Never stall completely: when every resolver is quarantined, put the
+        # one closest to release back on probation with a minimal window
+        if all(health.is_quarantined(now) for health in self.resolvers.values()):
+            candidate = min(self.resolvers.values(), key=lambda health: health.quarantined_until)
+            logger.warning(f"All resolvers quarantined, releasing {candidate.address} on probation")
+            candidate.quarantined_until = 0.0
+            candidate.cwnd = self.min_cwnd
+            if candidate.in_flight < self.min_cwnd:
+                return [candidate]
+        return []
+
+    def healthy_resolvers(self) -> List[str]:
+        now = time.monotonic()
+        healthy = [address for address, health in self.resolvers.items() if not health.is_quarantined(now)]
+        return healthy or list(self.resolvers)
+
+    async def acquire(self) -> str:
+        async with self.condition:
+            while True:
+                available = self._available(time.monotonic())
+                if available:
+                    health = random.choices(available, weights=[h.score() for h in available])[0]
+                    health.in_flight += 1
+                    return health.address
+                try:
+                    # Wake up periodically so expired quarantines are noticed
+                    await asyncio.wait_for(self.condition.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self, address: str, outcome: str, latency: Optional[float] = None):
+        health = self.resolvers[address]
+        health.in_flight = max(0, health.in_flight - 1)
+        health.total_queries += 1
+        health.record(outcome)
+
+        if outcome == SUCCESS:
+            if latency is not None:
+                health.latency_ewma = latency if health.latency_ewma is None else 0.8 * health.latency_ewma + 0.2 * latency
+            health.cwnd = min(self.max_cwnd, health.cwnd + 1.0 / health.cwnd)
+            if health.quarantine_count and health.cwnd >= self.initial_cwnd:
+                # Recovered fully since the last quarantine, so forget the backoff
+                health.quarantine_count = 0
+        else:
+            if outcome == TIMEOUT:
+                health.total_timeouts += 1
+            else:
+                health.total_errors += 1
+            health.cwnd = max(self.min_cwnd, health.cwnd / 2)
+            self._maybe_quarantine(health)
+
+        async with self.condition:
+            self.condition.notify_all()
+
+    def _maybe_quarantine(self, health: ResolverHealth):
+        if len(health.outcomes) < min(20, self.window):
+            return
+        failure_rate = health.rate(TIMEOUT) + health.rate(ERROR)
+        if failure_rate < self.quarantine_threshold:
+            return
+
+        duration = min(self.max_quarantine_seconds, self.quarantine_seconds * (2 ** health.quarantine_count))
+        health.quarantine_count += 1
+        health.quarantined_until = time.monotonic() + duration
+        health.reset_outcomes()
+        health.cwnd = self.min_cwnd
+        logger.warning(f"Quarantining resolver {health.address} for {duration:.0f}s (failure rate {failure_rate:.0%})")
+
+    def snapshot(self) -> List[Dict]:
+        now = time.monotonic()
+        return sorted((health.snapshot(now) for health in self.resolvers.values()), key=lambda s: -s["score"])
+
+resolver_pool = ResolverPool(
+    settings.DNS_RESOLVERS,
+    initial_cwnd=settings.DNS_RESOLVER_INITIAL_WINDOW,
+    max_cwnd=settings.DNS_RESOLVER_MAX_WINDOW,
+    quarantine_threshold=settings.DNS_RESOLVER_QUARANTINE_THRESHOLD,
+    quarantine_seconds=settings.DNS_RESOLVER_QUARANTINE_SECONDS
+)
@@ -0,0 +1,148 @@
+# app/services/scheduler.py
+
+import asyncio
+import heapq
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.db.async_operations import add_scheduled_job, delete_scheduled_job
+from app.db.operations import get_scheduled_jobs, get_scheduled_job, claim_scheduled_run, get_running_scheduled_task_ids
+from app.services.execution_governor import current_requester, current_domain
+from app.services.task_store import TaskStore
+
+logger = logging.getLogger("bbrf")
+
+class Scheduler:
+    """Runs recurring scans from the scheduled_jobs table inside the API process.
+
+    Due times are kept in a min-heap, so the loop only sleeps until the
+    earliest one. The table is the source of truth: every run is claimed
+    with a conditional update on next_run_at, so with several API processes
+    each run still fires once. A run is skipped while the job's previous
+    task is still in progress, and deferred by SCHEDULER_RETRY_SECONDS while
+    SCHEDULER_MAX_CONCURRENT scheduled tasks are running.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int]] = []
+        # Current due timestamp per job; heap entries that disagree are stale
+        self._due: Dict[int, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = set()
+
+    @staticmethod
+    def next_run(job: Dict, now: datetime) -> datetime:
+        return now + timedelta(seconds=job["interval_seconds"] + random.uniform(0, job["jitter_seconds"] or 0))
+
+    def _push(self, job_id: int, due: float):
+        self._due[job_id] = due
+        heapq.heappush(self._heap, (due, job_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _pop_due(self, now: float) -> List[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            timestamp, job_id = heapq.heappop(self._heap)
+            if self._due.get(job_id) == timestamp:
+                del self._due[job_id]
+                due.append(job_id)
+        return due
+
+    def _load(self, jobs: List[Dict]):
+        now = datetime.now(timezone.utc)
+        enabled = {job["id"] for job in jobs}
+        for job_id in list(self._due):
+            if job_id not in enabled:
+                del self._due[job_id]
+        for job in jobs:
+            due = job["next_run_at"]
+            if due < now:
+                if job["id"] in self._due:
+                    # Catch-up time picked at an earlier sync; rolling it again would
+                    # keep pushing the run back when the jitter exceeds the sync interval
+                    continue
+                # Spread jobs that became due while no process was scheduling
+                due = now + timedelta(seconds=random.uniform(0, job["jitter_seconds"] or 0))
+            if self._due.get(job["id"]) != due.timestamp():
+                self._push(job["id"], due.timestamp())
+
+    async def add(self, domain: str, kind: str, params: Dict, interval_seconds: int,
+                  jitter_seconds: int = 0) -> Optional[Dict]:
+        # The first run lands somewhere in the first interval, so jobs created
+        # together don't keep firing together
+        first_run = datetime.now(timezone.utc) + timedelta(seconds=random.uniform(0, interval_seconds))
+        job = await add_scheduled_job(domain, kind, params, interval_seconds, jitter_seconds, first_run)
+        if job is not None:
+            self._push(job["id"], first_run.timestamp())
+        return job
+
+    async def remove(self, job_id: int) -> bool:
+        self._due.pop(job_id, None)
+        return await delete_scheduled_job(job_id)
+
+    async def _fire(self, job_id: int):
+        job = await asyncio.to_thread(get_scheduled_job, job_id)
+        if job is None or not job["enabled"]:
+            return
+        now = datetime.now(timezone.utc)
+        store = TaskStore.stores.get(job["kind"])
+        if store is None or store.runner is None:
+            logger.error(f"Scheduled job {job_id} has no runner for task kind {job['kind']}")
+            return
+
+        running = await asyncio.to_thread(get_running_scheduled_task_ids)
+        next_run, task_id, skipped = self.next_run(job, now), None, False
+        if job["last_task_id"] in running:
+            logger.info(f"Skipping scheduled {job['kind']} for {job['domain']}, previous run {job['last_task_id']} is still running")
+            skipped = True
+        elif len(running) >= settings.SCHEDULER_MAX_CONCURRENT:
+            logger.info(f"Deferring scheduled {job['kind']} for {job['domain']}, {len(running)} scheduled runs in progress")
+            next_run = now + timedelta(seconds=settings.SCHEDULER_RETRY_SECONDS)
+        else:
+            task_id = str(uuid.uuid4())
+
+        if not await asyncio.to_thread(claim_scheduled_run, job_id, job["next_run_at"], next_run, task_id, skipped):
+            # Another process took this run; the next sync picks up its next_run_at
+            return
+        self._push(job_id, next_run.timestamp())
+        if task_id is not None:
+            await self._start(store, task_id, job)
+
+    async def _start(self, store: TaskStore, task_id: str, job: Dict):
+        params = {"domain": job["domain"], **job["params"]}
+        logger.info(f"Starting scheduled {job['kind']} task {task_id} for {job['domain']}")
+        await store.save_async(store.model(task_id=task_id, status="in_progress"), job["domain"], params=params)
+        current_requester.set(f"scheduler:{job['id']}")
+        current_domain.set(job["domain"])
+        task = asyncio.create_task(store.runner(task_id, **params))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        next_sync = 0.0
+        while True:
+            try:
+                if loop.time() >= next_sync:
+                    self._load(await asyncio.to_thread(get_scheduled_jobs, True))
+                    next_sync = loop.time() + settings.SCHEDULER_SYNC_SECONDS
+                for job_id in self._pop_due(datetime.now(timezone.utc).timestamp()):
+                    await self._fire(job_id)
+            except Exception as e:
+                logger.exception(f"Error in scheduler loop: {str(e)}")
+
+            timeout = next_sync - loop.time()
+            if self._heap:
+                timeout = min(timeout, self._heap[0][0] - datetime.now(timezone.utc).timestamp())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, timeout))
+            except asyncio.TimeoutError:
+                pass
+
+scheduler = Scheduler()
@@ -1,31 +1,102 @@
 # app/services/subdomain_enumerator.py
 
 import asyncio
-from typing import List
+from typing import List, Dict, AsyncIterator, Callable, Optional
 import logging
+from app.config import settings
+from app.db.operations import add_subdomains
+from app.services.execution_governor import governor
 
 logger = logging.getLogger("bbrf")
 
 class SubdomainEnumerator:
     @staticmethod
-    async def enumerate(domain: str) -> List[str]:
-        try:
-            logger.info(f"Starting subdomain enumeration for {domain}")
+    async def enumerate_stream(domain: str, rate_limit: Optional[int] = None,
+                               source_rate_limits: Optional[Dict[str, int]] = None) -> AsyncIterator[str]:
+        logger.info(f"Starting subdomain enumeration for {domain}")
+        args = ['subfinder', '-d', domain, '-silent']
+        if rate_limit:
+            args += ['-rl', str(rate_limit)]
+        if source_rate_limits:
+            args += ['-rls', ','.join(f"{source}={limit}/s" for source, limit in source_rate_limits.items())]
+
+        async with governor.slot('subfinder', domain):
             process = await asyncio.create_subprocess_exec(
-                'subfinder', '-d', domain, '-silent',
+                *args,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE
             )
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode != 0:
-                logger.error(f"Subfinder failed for {domain}: {stderr.decode()}")
-                return []
-            
-            subdomains = stdout.decode().strip().split('\n')
-            valid_subdomains = [subdomain for subdomain in subdomains if subdomain]
-            logger.info(f"Found {len(valid_subdomains)} subdomains for {domain}")
-            return valid_subdomains
+            stderr_reader = asyncio.create_task(process.stderr.read())
+            try:
+                async for raw_line in process.stdout:
+                    subdomain = raw_line.decode(errors='replace').strip()
+                    if subdomain:
+                        yield subdomain
+
+                if await process.wait() != 0:
+                    stderr = await stderr_reader
+                    logger.error(f"Subfinder failed for {domain}: {stderr.decode(errors='replace')}")
+                    raise RuntimeError(f"subfinder exited with code {process.returncode} for {domain}")
+            finally:
+                stderr_reader.cancel()
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+
+    @staticmethod
+    async def enumerate_and_store(domain: str, chunk_size: Optional[int] = None,
+                                  on_progress: Optional[Callable[[int], None]] = None,
+                                  rate_limit: Optional[int] = None,
+                                  source_rate_limits: Optional[Dict[str, int]] = None) -> List[str]:
+        """Stream subfinder output into the database in fixed-size chunks.
+
+        Names are deduplicated in memory and flushed every `chunk_size` new
+        names, so results are visible while subfinder runs and whatever was
+        found before a failure is already stored. A subfinder failure is
+        raised after that flush, so callers can report the run as failed.
+        """
+        chunk_size = chunk_size or settings.SUBDOMAIN_FLUSH_CHUNK_SIZE
+        seen = set()
+        pending = []
+        stored_count = 0
+
+        async def flush():
+            nonlocal pending, stored_count
+            if not pending:
+                return
+            batch, pending = pending, []
+            stored_count += await asyncio.to_thread(add_subdomains, domain, batch)
+            if on_progress is not None:
+                on_progress(len(seen))
+
+        try:
+            async for subdomain in SubdomainEnumerator.enumerate_stream(domain, rate_limit, source_rate_limits):
+                if subdomain in seen:
+                    continue
+                seen.add(subdomain)
+                pending.append(subdomain)
+                if len(pending) >= chunk_size:
+                    await flush()
+        except Exception as e:
+            logger.exception(f"Unexpected error during subdomain enumeration for {domain}: {str(e)}")
+            raise
+        finally:
+            await flush()
+
+        logger.info(f"Found {len(seen)} subdomains for {domain}, stored {stored_count}")
+        return list(seen)
+
+    @staticmethod
+    async def enumerate(domain: str) -> List[str]:
+        try:
+            subdomains = []
+            seen = set()
+            async for subdomain in SubdomainEnumerator.enumerate_stream(domain):
+                if subdomain not in seen:
+                    seen.add(subdomain)
+                    subdomains.append(subdomain)
+            logger.info(f"Found {len(subdomains)} subdomains for {domain}")
+            return subdomains
         except Exception as e:
             logger.exception(f"Unexpected error during subdomain enumeration for {domain}: {str(e)}")
-            return []
\ No newline at end of file
+            return []
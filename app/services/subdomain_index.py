@@ -0,0 +1,117 @@
+# app/services/subdomain_index.py
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+from app.db.models import Subdomain
+from app.db.operations import backfill_reversed_subdomains, count_subdomains, get_reversed_subdomains
+
+logger = logging.getLogger("bbrf")
+
+T = TypeVar("T")
+
+class _Node:
+    __slots__ = ("children", "count", "terminal")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # Number of stored names at or below this node
+        self.count = 0
+        self.terminal = False
+
+class LabelTrie:
+    """Trie keyed on DNS labels from the root down (com -> example -> dev)."""
+
+    def __init__(self):
+        self.root = _Node()
+        self.size = 0
+
+    def insert(self, reversed_name: str):
+        labels = reversed_name.split(".")
+        node = self.root
+        path = [node]
+        for label in labels:
+            node = node.children.setdefault(label, _Node())
+            path.append(node)
+        if node.terminal:
+            return
+        node.terminal = True
+        for visited in path:
+            visited.count += 1
+        self.size += 1
+
+    def find(self, zone: str) -> Optional[_Node]:
+        node = self.root
+        for label in Subdomain.reverse_labels(zone).split("."):
+            node = node.children.get(label)
+            if node is None:
+                return None
+        return node
+
+    def count(self, zone: str) -> int:
+        node = self.find(zone)
+        return node.count if node else 0
+
+    def zone_counts(self, zone: str, depth: int = 1) -> List[Tuple[str, int]]:
+        """Subtree sizes of the zones `depth` labels below `zone`, largest first."""
+        node = self.find(zone)
+        if node is None:
+            return []
+        zone = zone.lower().rstrip(".")
+        level = [(zone, node)]
+        for _ in range(max(1, depth)):
+            level = [
+                (f"{label}.{name}", child)
+                for name, parent in level
+                for label, child in parent.children.items()
+            ]
+        return sorted(((name, child.count) for name, child in level), key=lambda item: (-item[1], item[0]))
+
+class SubdomainIndex:
+    """Per-domain label tries, kept up to date incrementally.
+
+    Each get inserts the rows stored past the newest subdomain ID the trie
+    has seen. IDs are assigned before commit, so a row can still become
+    visible below that ID; when the number of rows up to it no longer
+    matches what the trie has taken in, the trie is rebuilt.
+    """
+
+    def __init__(self):
+        self._tries: Dict[str, LabelTrie] = {}
+        # Newest subdomain ID and number of rows each trie has taken in
+        self._seen: Dict[str, Tuple[int, int]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _update(self, domain: str, trie: LabelTrie, max_id: int, rows: int) -> Tuple[int, int]:
+        for subdomain_id, reversed_name in get_reversed_subdomains(domain, max_id):
+            trie.insert(reversed_name)
+            max_id = subdomain_id
+            rows += 1
+        return max_id, rows
+
+    def _get(self, domain: str) -> LabelTrie:
+        trie = self._tries.get(domain)
+        if trie is not None:
+            max_id, rows = self._update(domain, trie, *self._seen[domain])
+            if count_subdomains(domain, max_id) == rows:
+                self._seen[domain] = (max_id, rows)
+                return trie
+            logger.info(f"Subdomains of {domain} committed out of ID order, rebuilding its label trie")
+
+        backfill_reversed_subdomains(domain)
+        trie = LabelTrie()
+        self._seen[domain] = self._update(domain, trie, 0, 0)
+        self._tries[domain] = trie
+        logger.info(f"Built label trie for {domain} with {trie.size} subdomains")
+        return trie
+
+    def read(self, domain: str, reader: Callable[[LabelTrie], T]) -> T:
+        """Bring the domain's trie up to date and call `reader` on it. Tries
+        change in place, so they are only read while holding their lock."""
+        with self._lock:
+            lock = self._locks.setdefault(domain, threading.Lock())
+        with lock:
+            return reader(self._get(domain))
+
+subdomain_index = SubdomainIndex()
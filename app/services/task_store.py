@@ -0,0 +1,132 @@
+# app/services/task_store.py
+
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable, Dict, Generic, Optional, Tuple, Type, TypeVar
+from pydantic import BaseModel
+from app.config import settings
+from app.db import async_operations
+from app.db.operations import (
+    save_task, get_task, delete_finished_tasks, touch_tasks, claim_task, get_stale_task_ids
+)
+
+logger = logging.getLogger("bbrf")
+
+T = TypeVar("T", bound=BaseModel)
+
+# Identifies this API process as the owner of the tasks it runs
+INSTANCE_ID = uuid.uuid4().hex
+
+_resumed = set()
+
+class TaskStore(Generic[T]):
+    """Task status kept in the tasks table, so a poll can land on any API
+    worker and running tasks are still visible after a restart.
+
+    A store with a runner registered through `resumable` can have its
+    interrupted tasks restarted; the runner is called with the task ID and
+    the params the task was saved with, and picks up its own checkpoint.
+    """
+
+    stores: Dict[str, "TaskStore"] = {}
+
+    def __init__(self, kind: str, model: Type[T]):
+        self.kind = kind
+        self.model = model
+        self.runner: Optional[Callable[..., Awaitable]] = None
+        # Newest unwritten save and its writer, per task ID
+        self._latest: Dict[str, Tuple[Dict, Optional[str], Optional[Dict]]] = {}
+        self._writers: Dict[str, asyncio.Task] = {}
+        TaskStore.stores[kind] = self
+
+    def resumable(self, runner: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+        self.runner = runner
+        return runner
+
+    # The sync methods are for worker threads; on the event loop use the
+    # async ones, or save_soon from sync callbacks
+
+    def save(self, task: T, domain: Optional[str] = None, params: Optional[Dict] = None):
+        data = task.model_dump(mode="json")
+        save_task(
+            task.task_id, self.kind, data.get("status"), data.get("progress"), data.get("error"), data,
+            domain, params, INSTANCE_ID
+        )
+
+    def get(self, task_id: str) -> Optional[T]:
+        data = get_task(task_id, self.kind)
+        return self.model(**data) if data is not None else None
+
+    def save_soon(self, task: T, domain: Optional[str] = None, params: Optional[Dict] = None):
+        """Queue a save from a sync callback running on the event loop.
+
+        One writer per task writes its saves in order; saves queued while a
+        write is in flight collapse into the newest one.
+        """
+        self._latest[task.task_id] = (task.model_dump(mode="json"), domain, params)
+        if task.task_id not in self._writers:
+            self._writers[task.task_id] = asyncio.get_running_loop().create_task(self._write(task.task_id))
+
+    async def _write(self, task_id: str):
+        try:
+            while task_id in self._latest:
+                data, domain, params = self._latest.pop(task_id)
+                await async_operations.save_task(
+                    task_id, self.kind, data.get("status"), data.get("progress"), data.get("error"), data,
+                    domain, params, INSTANCE_ID
+                )
+        finally:
+            del self._writers[task_id]
+
+    async def save_async(self, task: T, domain: Optional[str] = None, params: Optional[Dict] = None):
+        # Goes through the task's writer so it cannot be overwritten by an older queued save
+        self.save_soon(task, domain, params)
+        await asyncio.shield(self._writers[task.task_id])
+
+    async def get_async(self, task_id: str) -> Optional[T]:
+        data = await async_operations.get_task(task_id, self.kind)
+        return self.model(**data) if data is not None else None
+
+async def resume_task(task_id: str, include_failed: bool = False) -> bool:
+    kinds = [kind for kind, store in TaskStore.stores.items() if store.runner is not None]
+    claim = await asyncio.to_thread(claim_task, task_id, INSTANCE_ID, kinds, settings.TASK_STALE_SECONDS, include_failed)
+    if claim is None:
+        return False
+    logger.info(f"Resuming {claim['kind']} task {task_id}")
+    runner = TaskStore.stores[claim["kind"]].runner
+    task = asyncio.create_task(runner(task_id, **claim["params"]))
+    _resumed.add(task)
+    task.add_done_callback(_resumed.discard)
+    return True
+
+async def resume_interrupted_tasks():
+    for task in await asyncio.to_thread(get_stale_task_ids, settings.TASK_STALE_SECONDS):
+        store = TaskStore.stores.get(task["kind"])
+        if store is None:
+            continue
+        if store.runner is not None:
+            await resume_task(task["id"])
+            continue
+        status = await asyncio.to_thread(store.get, task["id"])
+        if status is not None:
+            status.status = "failed"
+            status.error = "Interrupted by an API restart"
+            await asyncio.to_thread(store.save, status)
+
+async def heartbeat_tasks():
+    # Resume right away on startup, then keep the tasks we own fresh and
+    # pick up any that another process stopped heartbeating
+    while True:
+        try:
+            await asyncio.to_thread(touch_tasks, INSTANCE_ID)
+            await resume_interrupted_tasks()
+        except Exception as e:
+            logger.exception(f"Error during task heartbeat: {str(e)}")
+        await asyncio.sleep(settings.TASK_HEARTBEAT_SECONDS)
+
+async def cleanup_tasks():
+    while True:
+        await asyncio.sleep(settings.TASK_CLEANUP_INTERVAL)
+        removed = await asyncio.to_thread(delete_finished_tasks, settings.TASK_TTL_SECONDS)
+        logger.info(f"Cleaned up {removed} completed or failed tasks")
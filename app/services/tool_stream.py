@@ -0,0 +1,184 @@
+# app/services/tool_stream.py
+
+import asyncio
+import json
+import logging
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Union
+from app.config import settings
+from app.services.execution_governor import governor
+
+logger = logging.getLogger("bbrf")
+
+Inputs = Union[Iterable[str], AsyncIterable[str]]
+
+# Tools like httpx can emit long JSON lines, so raise the StreamReader limit
+LINE_LIMIT = 4 * 1024 * 1024
+
+_DONE = object()
+
+class InputFeed:
+    """Shared input source pulled from by every process in the pool.
+
+    Async inputs come from an upstream stage that can be idle for a long
+    time, so they are read by a pump task into a bounded queue and handed
+    out in batches; a tool slot is only taken once a batch is in hand.
+    """
+
+    def __init__(self, inputs: Inputs, queue_size: int = 1000):
+        self._lock = asyncio.Lock()
+        if hasattr(inputs, '__aiter__'):
+            self._iter = None
+            self._queue = asyncio.Queue(maxsize=queue_size)
+            self.pump: Optional[asyncio.Task] = asyncio.create_task(self._pump(inputs))
+        else:
+            self._iter = iter(inputs)
+            self._queue = None
+            self.pump = None
+
+    async def _pump(self, inputs: AsyncIterable[str]):
+        try:
+            async for item in inputs:
+                await self._queue.put(item)
+        except Exception as e:
+            logger.exception(f"Error reading tool input: {str(e)}")
+        await self._queue.put(_DONE)
+
+    async def next(self):
+        """Next input, or None once the inputs are exhausted."""
+        if self._queue is not None:
+            item = await self._queue.get()
+            if item is _DONE:
+                # Left in place for the other consumers
+                self._queue.put_nowait(_DONE)
+                return None
+            return item
+        async with self._lock:
+            try:
+                return next(self._iter)
+            except StopIteration:
+                return None
+
+    async def next_batch(self, size: int, linger: float) -> List[str]:
+        """Wait for an input, then collect more for up to `linger` seconds.
+        An empty batch means the inputs are exhausted."""
+        item = await self._queue.get()
+        if item is _DONE:
+            # Left in place for the other processes of the pool
+            self._queue.put_nowait(_DONE)
+            return []
+        batch = [item]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + linger
+        while len(batch) < size and loop.time() < deadline:
+            try:
+                item = await asyncio.wait_for(self._queue.get(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                break
+            if item is _DONE:
+                self._queue.put_nowait(_DONE)
+                break
+            batch.append(item)
+        return batch
+
+    async def close(self):
+        if self.pump is not None:
+            self.pump.cancel()
+            await asyncio.gather(self.pump, return_exceptions=True)
+
+async def _feed_stdin(process, feed: InputFeed):
+    try:
+        while True:
+            item = await feed.next()
+            if item is None:
+                break
+            process.stdin.write(f"{item}\n".encode())
+            await process.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        logger.warning("Tool process closed stdin before all input was written")
+    finally:
+        if not process.stdin.is_closing():
+            process.stdin.close()
+
+async def _run_process(args: List[str], feed: InputFeed, results: asyncio.Queue):
+    if feed.pump is None:
+        # Every input is already in hand, so the process never idles on an upstream stage
+        async with governor.slot(args[0]):
+            await _run_governed_process(args, feed, results)
+    else:
+        # One short-lived process per batch, so no slot is held while upstream is idle
+        while True:
+            batch = await feed.next_batch(settings.TOOL_STREAM_BATCH_SIZE, settings.TOOL_STREAM_BATCH_LINGER)
+            if not batch:
+                break
+            async with governor.slot(args[0]):
+                if not await _run_governed_process(args, InputFeed(batch), results):
+                    break
+    await results.put(_DONE)
+
+async def _run_governed_process(args: List[str], feed: InputFeed, results: asyncio.Queue) -> bool:
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=LINE_LIMIT
+        )
+    except Exception as e:
+        logger.exception(f"Failed to start {args[0]}: {str(e)}")
+        return False
+
+    writer = asyncio.create_task(_feed_stdin(process, feed))
+    stderr_reader = asyncio.create_task(process.stderr.read())
+    try:
+        async for raw_line in process.stdout:
+            line = raw_line.decode(errors='replace').strip()
+            if not line:
+                continue
+            try:
+                await results.put(json.loads(line))
+            except json.JSONDecodeError:
+                logger.error(f"Failed to parse JSON line from {args[0]}: {line}")
+
+        await writer
+        returncode = await process.wait()
+        if returncode != 0:
+            stderr = await stderr_reader
+            logger.error(f"{args[0]} exited with code {returncode}: {stderr.decode(errors='replace')}")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.exception(f"Error while streaming output from {args[0]}: {str(e)}")
+    finally:
+        writer.cancel()
+        stderr_reader.cancel()
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    return True
+
+async def stream_json_lines(args: List[str], inputs: Inputs, processes: int = 1, queue_size: int = 1000) -> AsyncIterator[Dict]:
+    """Feed inputs line by line into a pool of tool processes over stdin and
+    yield each JSON line they print as soon as it arrives.
+
+    Iterable inputs go to long-lived processes. Async inputs can stall on
+    an upstream stage, so they are fed in batches of TOOL_STREAM_BATCH_SIZE
+    with one process per batch, and tool slots are only held while there
+    is work to do."""
+    feed = InputFeed(inputs)
+    results = asyncio.Queue(maxsize=queue_size)
+    workers = [asyncio.create_task(_run_process(args, feed, results)) for _ in range(max(1, processes))]
+    remaining = len(workers)
+
+    try:
+        while remaining:
+            item = await results.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await feed.close()
@@ -0,0 +1,94 @@
+# app/services/wildcard_detector.py
+
+import logging
+import secrets
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Set
+from app.services.dns_resolver import DNSResolver
+
+logger = logging.getLogger("bbrf")
+
+class WildcardDetector:
+    @staticmethod
+    def parent_zones(domain: str, subdomain: str) -> List[str]:
+        """Zones a name could inherit a wildcard from, nearest first."""
+        zones = []
+        labels = subdomain.rstrip('.').split('.')
+        for i in range(1, len(labels)):
+            zone = '.'.join(labels[i:])
+            if zone != domain and not zone.endswith(f".{domain}"):
+                break
+            zones.append(zone)
+        return zones
+
+    @staticmethod
+    async def detect(domain: str, subdomains: Iterable[str], probes: int = 3) -> Dict[str, FrozenSet[str]]:
+        """Resolve random labels under every parent zone and return the
+        answer set fingerprint of each zone that has a wildcard record."""
+        zones = {domain}
+        for subdomain in subdomains:
+            zones.update(WildcardDetector.parent_zones(domain, subdomain))
+
+        probe_names = {f"{secrets.token_hex(8)}.{zone}": zone for zone in zones for _ in range(probes)}
+        logger.info(f"Checking {len(zones)} zones of {domain} for wildcard DNS with {len(probe_names)} probes")
+
+        answers = defaultdict(set)
+        async for result in DNSResolver.resolve_stream(list(probe_names)):
+            zone = probe_names.get(result.get('host'))
+            if zone is not None and result.get('a'):
+                answers[zone].update(result['a'])
+
+        fingerprints = {zone: frozenset(ips) for zone, ips in answers.items()}
+        for zone, ips in fingerprints.items():
+            logger.info(f"Wildcard DNS detected for *.{zone}: {sorted(ips)}")
+        return fingerprints
+
+class WildcardFilter:
+    """Collapses resolutions that only repeat a zone's wildcard answer.
+
+    The first name matching a zone's fingerprint is kept so the wildcard
+    target is still stored and probed once; the rest are dropped. With
+    `collapse=False` every match is dropped.
+    """
+
+    def __init__(self, domain: str, fingerprints: Dict[str, FrozenSet[str]], collapse: bool = True):
+        self.domain = domain
+        self.fingerprints = fingerprints
+        self.collapse = collapse
+        self.pruned: Dict[str, int] = defaultdict(int)
+        self.pruned_hosts: Set[str] = set()
+        self._representatives = set()
+
+    def matching_zone(self, resolution: Dict):
+        ips = set(resolution.get('a') or [])
+        if not ips:
+            return None
+        for zone in WildcardDetector.parent_zones(self.domain, resolution.get('host', '')):
+            fingerprint = self.fingerprints.get(zone)
+            if fingerprint and ips <= fingerprint:
+                return zone
+        return None
+
+    def keep(self, resolution: Dict) -> bool:
+        if not self.fingerprints:
+            return True
+        zone = self.matching_zone(resolution)
+        if zone is None:
+            return True
+        if self.collapse and zone not in self._representatives:
+            self._representatives.add(zone)
+            return True
+        self.pruned[zone] += 1
+        self.pruned_hosts.add(resolution.get('host'))
+        return False
+
+    def filter(self, resolutions: Iterable[Dict]) -> List[Dict]:
+        return [resolution for resolution in resolutions if self.keep(resolution)]
+
+    def report(self) -> Dict[str, int]:
+        return dict(self.pruned)
+
+    @staticmethod
+    async def for_domain(domain: str, subdomains: List[str], probes: int = 3, collapse: bool = True) -> "WildcardFilter":
+        fingerprints = await WildcardDetector.detect(domain, subdomains, probes)
+        return WildcardFilter(domain, fingerprints, collapse)
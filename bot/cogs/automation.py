@@ -37,6 +37,7 @@ class AutomationCog(commands.Cog):
             async with aiohttp.ClientSession() as session:
                 async with session.post(f'{settings.API_URL}/api/v1/automation/basic-recon', 
                                         json={'domain': domain},
+                                        headers={'X-Requester': str(ctx.author.id)},
                                         timeout=aiohttp.ClientTimeout(total=None)) as response:
                     if response.status == 200:
                         task_data = await response.json()
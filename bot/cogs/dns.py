@@ -39,6 +39,7 @@ class DNSCog(commands.Cog):
             async with aiohttp.ClientSession() as session:
                 async with session.post(f'{settings.API_URL}/api/v1/dns/resolve', 
                                         json={'domain': domain},
+                                        headers={'X-Requester': str(ctx.author.id)},
                                         timeout=aiohttp.ClientTimeout(total=None)) as response:
                     if response.status == 200:
                         task_data = await response.json()
@@ -76,12 +77,15 @@ class DNSCog(commands.Cog):
 
         async with aiohttp.ClientSession() as session:
             try:
+                params = {}
                 if use_all:
                     url = f'{settings.API_URL}/api/v1/dns/subdomains-with-resolutions/{domain}'
                 else:
                     url = f'{settings.API_URL}/api/v1/dns/resolutions/{domain}'
+                    # The bot exports everything, not just the first page
+                    params = {'all': 'true'}
                 
-                async with session.get(url) as response:
+                async with session.get(url, params=params) as response:
                     if response.status == 200:
                         resolutions = await response.json()
                         logger.info(f"Successfully retrieved DNS resolutions for {domain}")
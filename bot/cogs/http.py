@@ -38,6 +38,7 @@ class HTTPCog(commands.Cog):
             async with aiohttp.ClientSession() as session:
                 async with session.post(f'{settings.API_URL}/api/v1/http/probe', 
                                         json={'domain': domain},
+                                        headers={'X-Requester': str(ctx.author.id)},
                                         timeout=aiohttp.ClientTimeout(total=None)) as response:
                     if response.status == 200:
                         task_data = await response.json()
@@ -75,7 +76,7 @@ class HTTPCog(commands.Cog):
         async with aiohttp.ClientSession() as session:
             try:
                 url = f'{settings.API_URL}/api/v1/http/probe/results/{domain}'
-                async with session.get(url) as response:
+                async with session.get(url, params={'all': 'true'}) as response:
                     if response.status == 200:
                         probe_results = await response.json()
                         logger.info(f"Successfully retrieved HTTP probe results for {domain}")
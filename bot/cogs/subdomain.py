@@ -38,6 +38,7 @@ class SubdomainCog(commands.Cog):
             async with aiohttp.ClientSession() as session:
                 async with session.post(f'{settings.API_URL}/api/v1/enumerate', 
                                         json={'domain': domain},
+                                        headers={'X-Requester': str(ctx.author.id)},
                                         timeout=aiohttp.ClientTimeout(total=None)) as response:
                     if response.status == 200:
                         task_data = await response.json()
@@ -139,7 +140,7 @@ class SubdomainCog(commands.Cog):
 
         async with aiohttp.ClientSession() as session:
             try:
-                async with session.get(f'{settings.API_URL}/api/v1/subdomains/{domain}') as response:
+                async with session.get(f'{settings.API_URL}/api/v1/subdomains/{domain}', params={'all': 'true'}) as response:
                     if response.status == 200:
                         subdomains = await response.json()
                         logger.info(f"Successfully retrieved {len(subdomains)} subdomains for {domain}")
@@ -0,0 +1,79 @@
+# scripts/benchmark_ingest.py
+"""Compare ingest methods against the configured Postgres.
+
+Each method ingests the same synthetic subdomains, DNS resolutions and
+HTTP probe results into a throwaway domain, which is deleted afterwards.
+
+    python -m scripts.benchmark_ingest --rows 100000 --methods insert copy
+"""
+
+import argparse
+import time
+import uuid
+from app.db.database import SessionLocal, engine
+from app.db import models
+from app.db.migrations import run_migrations
+from app.db.models import Subdomain, DNSResolution, HTTPProbeResult
+from app.db.operations import ingest
+
+def subdomains(domain: str, rows: int):
+    return (f"host{i}.{domain}" for i in range(rows))
+
+def resolutions(domain: str, rows: int):
+    return (
+        {"host": f"host{i}.{domain}", "a": [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"], "ttl": 300}
+        for i in range(rows)
+    )
+
+def probe_results(domain: str, rows: int):
+    return (
+        {
+            "input": f"host{i}.{domain}", "url": f"https://host{i}.{domain}", "status_code": 200,
+            "title": f"Host {i}", "content_length": 1024, "tech": ["nginx"], "webserver": "nginx",
+            "host": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", "time": "12ms",
+            "hash": {"body_sha256": uuid.uuid4().hex},
+        }
+        for i in range(rows)
+    )
+
+def cleanup(domain: str):
+    db = SessionLocal()
+    try:
+        ids = db.query(Subdomain.id).filter(Subdomain.domain == domain)
+        db.query(HTTPProbeResult).filter(HTTPProbeResult.subdomain_id.in_(ids)).delete(synchronize_session=False)
+        db.query(DNSResolution).filter(DNSResolution.subdomain_id.in_(ids)).delete(synchronize_session=False)
+        db.query(Subdomain).filter(Subdomain.domain == domain).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def run(method: str, rows: int):
+    domain = f"bench-{uuid.uuid4().hex[:8]}.example"
+    try:
+        inputs = {
+            "subdomains": subdomains(domain, rows),
+            "resolutions": resolutions(domain, rows),
+            "probe_results": probe_results(domain, rows),
+        }
+        # One table per call, subdomains first so the other two can join on them
+        for (argument, values), table in zip(inputs.items(), ["subdomains", "dns_resolutions", "http_probe_results"]):
+            start = time.perf_counter()
+            stored = ingest(domain, method=method, **{argument: values}).get(table, 0)
+            seconds = time.perf_counter() - start
+            print(f"{method:>6}  {table:<20} {stored:>9} rows  {seconds:8.2f}s  {rows / seconds:10.0f} rows/s")
+    finally:
+        cleanup(domain)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--methods", nargs="+", default=["insert", "copy"], choices=["insert", "copy"])
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations()
+    for method in args.methods:
+        run(method, args.rows)
+
+if __name__ == "__main__":
+    main()
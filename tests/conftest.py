@@ -0,0 +1,12 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# Settings are read at import time; these tests never open a connection
+for name, value in {
+    "DB_USER": "test", "DB_PASSWORD": "test", "DB_HOST": "localhost", "DB_NAME": "test", "DISCORD_BOT_TOKEN": "test"
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,96 @@
+# tests/test_checkpoint.py
+
+import asyncio
+from app.services import checkpoint as checkpoint_module
+from app.services.checkpoint import Checkpoint, IdRanges
+
+def test_id_ranges_merges_adjacent_and_overlapping_ranges():
+    ranges = IdRanges([[10, 12], [1, 3], [4, 5], [11, 20]])
+    assert ranges.to_list() == [[1, 5], [10, 20]]
+    assert len(ranges) == 16
+
+def test_id_ranges_add_extends_and_bridges_ranges():
+    ranges = IdRanges()
+    for value in [5, 1, 3, 2, 7]:
+        ranges.add(value)
+    assert ranges.to_list() == [[1, 3], [5, 5], [7, 7]]
+
+    ranges.add(6)
+    assert ranges.to_list() == [[1, 3], [5, 7]]
+    ranges.add(4)
+    assert ranges.to_list() == [[1, 7]]
+
+def test_id_ranges_add_is_idempotent():
+    ranges = IdRanges([[1, 5]])
+    ranges.add(3)
+    ranges.add(1)
+    assert ranges.to_list() == [[1, 5]]
+    assert len(ranges) == 5
+
+def test_id_ranges_contains():
+    ranges = IdRanges([[1, 3], [10, 10]])
+    assert 1 in ranges and 3 in ranges and 10 in ranges
+    assert 0 not in ranges and 4 not in ranges and 9 not in ranges and 11 not in ranges
+    assert 1 not in IdRanges()
+
+def test_checkpoint_round_trips_through_dict():
+    checkpoint = Checkpoint(None, {"stage": "dns", "offset": 42, "done": [[50, 52]], "state": {"nodes": {}}})
+    restored = Checkpoint(None, checkpoint.to_dict())
+    assert restored.to_dict() == {"stage": "dns", "offset": 42, "done": [[50, 52]], "state": {"nodes": {}}}
+    assert 51 in restored.done
+
+def test_checkpoint_enter_and_advance_reset_progress():
+    checkpoint = Checkpoint()
+    checkpoint.enter("dns")
+    checkpoint.mark_done(7)
+    checkpoint.enter("dns")
+    assert 7 in checkpoint.done
+
+    checkpoint.advance(100)
+    assert checkpoint.offset == 100 and len(checkpoint.done) == 0
+
+    checkpoint.mark_done(101)
+    checkpoint.enter("http")
+    assert (checkpoint.stage, checkpoint.offset, len(checkpoint.done)) == ("http", 0, 0)
+
+def test_checkpoint_passed():
+    stages = ["enumeration", "dns", "http"]
+    checkpoint = Checkpoint(None, {"stage": "dns"})
+    assert checkpoint.passed("enumeration", stages)
+    assert not checkpoint.passed("dns", stages)
+    assert not checkpoint.passed("http", stages)
+    assert not Checkpoint().passed("dns", stages)
+
+def test_checkpoint_save_is_throttled_unless_forced(monkeypatch):
+    saved = []
+    monkeypatch.setattr(checkpoint_module, "save_task_checkpoint", lambda task_id, data: saved.append((task_id, data)))
+    monkeypatch.setattr(checkpoint_module.settings, "CHECKPOINT_INTERVAL_SECONDS", 3600)
+
+    checkpoint = Checkpoint("task")
+    checkpoint.mark_done(1)
+    assert saved == []
+    checkpoint.advance(10)
+    assert saved == [("task", {"stage": None, "offset": 10, "done": [], "state": {}})]
+
+def test_checkpoint_without_task_id_is_never_saved(monkeypatch):
+    saved = []
+    monkeypatch.setattr(checkpoint_module, "save_task_checkpoint", lambda task_id, data: saved.append(data))
+    Checkpoint().save(force=True)
+    assert saved == []
+
+def test_checkpoint_saves_on_the_loop_collapse_into_the_newest(monkeypatch):
+    saved = []
+    monkeypatch.setattr(checkpoint_module, "save_task_checkpoint", lambda task_id, data: saved.append(data["offset"]))
+
+    async def run():
+        checkpoint = Checkpoint("task")
+        for offset in range(5):
+            checkpoint.advance(offset)
+        # The snapshot is taken at save time, not when the writer runs
+        checkpoint.offset = 99
+        while checkpoint._writer is not None:
+            await asyncio.sleep(0)
+        return checkpoint
+
+    asyncio.run(run())
+    assert saved == [4]
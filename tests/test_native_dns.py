@@ -0,0 +1,74 @@
+# tests/test_native_dns.py
+
+import socket
+import struct
+import pytest
+from app.services.native_dns import (
+    CLASS_IN, FLAG_TC, TYPE_A, TYPE_AAAA, TYPE_CNAME, DNSQueryError, build_query, parse_response
+)
+
+# Pointer to the question name, which always starts right after the header
+QUESTION_POINTER = b"\xc0\x0c"
+
+def response(query_id: int, name: str, answers: bytes, ancount: int, flags: int = 0x8180) -> bytes:
+    query = build_query(query_id, name)
+    header = struct.pack("!HHHHHH", query_id, flags, 1, ancount, 0, 0)
+    return header + query[12:] + answers
+
+def record(rtype: int, ttl: int, rdata: bytes, name: bytes = QUESTION_POINTER) -> bytes:
+    return name + struct.pack("!HHIH", rtype, CLASS_IN, ttl, len(rdata)) + rdata
+
+def test_parse_response_reads_a_and_aaaa_answers():
+    answers = (
+        record(TYPE_A, 300, socket.inet_aton("93.184.216.34"))
+        + record(TYPE_AAAA, 60, socket.inet_pton(socket.AF_INET6, "2606:2800:220:1::248"))
+    )
+    parsed = parse_response(response(4660, "www.example.com", answers, 2))
+
+    assert parsed["id"] == 4660
+    assert parsed["rcode"] == "NOERROR"
+    assert parsed["truncated"] is False
+    assert parsed["question"] == "www.example.com"
+    assert parsed["answers"] == [
+        {"name": "www.example.com", "type": TYPE_A, "ttl": 300, "value": "93.184.216.34"},
+        {"name": "www.example.com", "type": TYPE_AAAA, "ttl": 60, "value": "2606:2800:220:1::248"},
+    ]
+
+def test_parse_response_follows_compression_in_cname_targets():
+    # "cdn" + pointer to "example.com" inside the question name (offset 12 + len("\x03www"));
+    # the A record's owner points back at that CNAME target, 12 + 21 + 12 bytes in
+    cname = b"\x03cdn\xc0\x10"
+    answers = record(TYPE_CNAME, 120, cname) + record(TYPE_A, 30, socket.inet_aton("10.0.0.1"), name=b"\xc0\x2d")
+    parsed = parse_response(response(1, "www.example.com", answers, 2))
+
+    assert parsed["answers"][0] == {"name": "www.example.com", "type": TYPE_CNAME, "ttl": 120, "value": "cdn.example.com"}
+    assert parsed["answers"][1]["name"] == "cdn.example.com"
+    assert parsed["answers"][1]["value"] == "10.0.0.1"
+
+def test_parse_response_flags():
+    nxdomain = parse_response(response(2, "missing.example.com", b"", 0, flags=0x8183))
+    assert nxdomain["rcode"] == "NXDOMAIN" and nxdomain["answers"] == []
+
+    truncated = parse_response(response(3, "big.example.com", b"", 0, flags=0x8180 | FLAG_TC))
+    assert truncated["truncated"] is True
+
+    unknown = parse_response(response(4, "odd.example.com", b"", 0, flags=0x818b))
+    assert unknown["rcode"] == "11"
+
+def test_parse_response_keeps_unknown_record_types_without_value():
+    parsed = parse_response(response(5, "example.com", record(16, 10, b"\x04text"), 1))
+    assert parsed["answers"] == [{"name": "example.com", "type": 16, "ttl": 10, "value": None}]
+
+def test_parse_response_rejects_short_data():
+    with pytest.raises(DNSQueryError):
+        parse_response(b"\x00" * 11)
+
+def test_parse_response_rejects_compression_loops():
+    header = struct.pack("!HHHHHH", 6, 0x8180, 1, 0, 0, 0)
+    with pytest.raises(DNSQueryError):
+        parse_response(header + QUESTION_POINTER + struct.pack("!HH", TYPE_A, CLASS_IN))
+
+def test_build_query_encodes_labels():
+    query = build_query(7, "www.example.com.")
+    assert query[:12] == struct.pack("!HHHHHH", 7, 0x0100, 1, 0, 0, 0)
+    assert query[12:] == b"\x03www\x07example\x03com\x00" + struct.pack("!HH", TYPE_A, CLASS_IN)
@@ -0,0 +1,58 @@
+# tests/test_native_streams.py
+
+import asyncio
+from app.services.native_dns import NativeDNSClient, NativeDNSResolver
+from app.services.native_http import NativeHTTPProber
+
+NAMES = [f"host{i}.example.com" for i in range(25)]
+
+async def upstream(names):
+    # An upstream stage that hands over names with pauses in between
+    for name in names:
+        await asyncio.sleep(0)
+        yield name
+
+async def collect(stream):
+    return [item async for item in stream]
+
+def test_native_dns_resolves_async_inputs(monkeypatch):
+    async def open_client(self):
+        pass
+
+    async def resolve(self, name):
+        return {"host": name, "a": ["10.0.0.1"]}
+
+    monkeypatch.setattr(NativeDNSClient, "open", open_client)
+    monkeypatch.setattr(NativeDNSClient, "close", lambda self: None)
+    monkeypatch.setattr(NativeDNSClient, "resolve", resolve)
+
+    records = asyncio.run(collect(NativeDNSResolver.resolve_stream(upstream(NAMES), ["127.0.0.1"], concurrency=4)))
+    assert sorted(record["host"] for record in records) == sorted(NAMES)
+
+def test_native_dns_resolves_sync_inputs(monkeypatch):
+    async def open_client(self):
+        pass
+
+    async def resolve(self, name):
+        return {"host": name, "a": ["10.0.0.1"]}
+
+    monkeypatch.setattr(NativeDNSClient, "open", open_client)
+    monkeypatch.setattr(NativeDNSClient, "close", lambda self: None)
+    monkeypatch.setattr(NativeDNSClient, "resolve", resolve)
+
+    records = asyncio.run(collect(NativeDNSResolver.resolve_stream(NAMES, ["127.0.0.1"], concurrency=4)))
+    assert sorted(record["host"] for record in records) == sorted(NAMES)
+
+def test_native_http_probes_async_inputs(monkeypatch):
+    async def fetch(session, host, scheme, max_body, validator=None):
+        return {"url": f"{scheme}://{host}", "input": host}
+
+    monkeypatch.setattr(NativeHTTPProber, "fetch", staticmethod(fetch))
+
+    async def probe():
+        return await collect(NativeHTTPProber.probe_stream(upstream(NAMES), concurrency=8))
+
+    results = asyncio.run(probe())
+    assert sorted(result["url"] for result in results) == sorted(
+        f"{scheme}://{name}" for name in NAMES for scheme in ("https", "http")
+    )
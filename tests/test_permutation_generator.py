@@ -0,0 +1,43 @@
+# tests/test_permutation_generator.py
+
+import math
+from app.services.permutation_generator import BloomFilter, PermutationGenerator
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    items = [f"host{i}.example.com" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+
+def test_bloom_filter_false_positive_rate_stays_near_target():
+    bloom = BloomFilter(5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(f"known{i}")
+    false_positives = sum(f"other{i}" in bloom for i in range(20000))
+    # Generous bound so the test does not flake on hash layout
+    assert false_positives / 20000 < 0.03
+
+def test_bloom_filter_sizing():
+    bloom = BloomFilter(1000, error_rate=0.001)
+    assert bloom.size == int(-1000 * math.log(0.001) / (math.log(2) ** 2))
+    assert bloom.hash_count == round(bloom.size / 1000 * math.log(2))
+    assert len(bloom.bits) == (bloom.size + 7) // 8
+
+    tiny = BloomFilter(0)
+    assert tiny.size >= 8 and tiny.hash_count >= 1
+    tiny.add("a")
+    assert "a" in tiny
+
+def test_empty_bloom_filter_contains_nothing():
+    bloom = BloomFilter(100)
+    assert "anything" not in bloom
+
+def test_generate_skips_known_names_and_duplicates():
+    generator = PermutationGenerator("example.com", words=["dev"])
+    known = ["api.example.com", "dev.api.example.com"]
+    candidates = list(generator.generate(known))
+    assert candidates
+    assert len(candidates) == len(set(candidates))
+    assert not set(candidates) & set(known)
+    assert all(candidate.endswith(".example.com") for candidate in candidates)
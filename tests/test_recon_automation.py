@@ -0,0 +1,49 @@
+# tests/test_recon_automation.py
+
+import asyncio
+import pytest
+from app.services import recon_automation
+from app.services.recon_automation import ReconAutomation
+from app.services.recon_workflow import ReconWorkflow
+
+@pytest.fixture
+def runs(monkeypatch):
+    runs = []
+
+    async def run_workflow(self, ctx):
+        runs.append(("workflow", self.order))
+        return {}
+
+    async def run_pipeline(self):
+        runs.append(("pipelined", None))
+        return {}
+
+    async def run_delta(domain, max_staleness=None):
+        runs.append(("delta", None))
+        return {}
+
+    monkeypatch.setattr(ReconWorkflow, "run", run_workflow)
+    monkeypatch.setattr(recon_automation.ReconPipeline, "run", run_pipeline)
+    monkeypatch.setattr(recon_automation.DeltaRecon, "run", staticmethod(run_delta))
+    monkeypatch.setattr(recon_automation.Checkpoint, "load", staticmethod(lambda task_id: recon_automation.Checkpoint()))
+    return runs
+
+@pytest.mark.parametrize("recon_mode", ["pipelined", "delta"])
+def test_profile_runs_sequentially_whatever_the_recon_mode(monkeypatch, runs, recon_mode):
+    monkeypatch.setattr(recon_automation.settings, "RECON_MODE", recon_mode)
+
+    asyncio.run(ReconAutomation.basic_recon("example.com", profile=["enumeration", "dns"]))
+
+    assert runs == [("workflow", ["enumeration", "dns"])]
+
+def test_profile_with_a_non_sequential_mode_is_rejected(runs):
+    with pytest.raises(ValueError):
+        asyncio.run(ReconAutomation.basic_recon("example.com", mode="pipelined", profile=["enumeration"]))
+    assert runs == []
+
+def test_mode_without_profile_uses_recon_mode(monkeypatch, runs):
+    monkeypatch.setattr(recon_automation.settings, "RECON_MODE", "delta")
+
+    asyncio.run(ReconAutomation.basic_recon("example.com"))
+
+    assert runs == [("delta", None)]
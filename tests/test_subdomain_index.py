@@ -0,0 +1,104 @@
+# tests/test_subdomain_index.py
+
+from app.db.models import Subdomain
+from app.services import subdomain_index
+from app.services.subdomain_index import LabelTrie
+
+NAMES = [
+    "example.com",
+    "api.example.com",
+    "v1.api.example.com",
+    "v2.api.example.com",
+    "dev.example.com",
+    "a.dev.example.com",
+    "b.dev.example.com",
+    "c.dev.example.com",
+    "www.example.com",
+]
+
+def build_trie(names=NAMES) -> LabelTrie:
+    trie = LabelTrie()
+    for name in names:
+        trie.insert(Subdomain.reverse_labels(name))
+    return trie
+
+def test_reverse_labels():
+    assert Subdomain.reverse_labels("Dev.Example.com.") == "com.example.dev"
+
+def test_insert_ignores_duplicates():
+    trie = build_trie(NAMES + ["api.example.com", "API.example.com."])
+    assert trie.size == len(NAMES)
+    assert trie.count("example.com") == len(NAMES)
+
+def test_count_covers_the_zone_and_everything_below_it():
+    trie = build_trie()
+    assert trie.count("api.example.com") == 3
+    assert trie.count("dev.example.com") == 4
+    assert trie.count("v1.api.example.com") == 1
+    assert trie.count("missing.example.com") == 0
+    assert trie.count("example.org") == 0
+
+def test_find():
+    trie = build_trie()
+    assert trie.find("dev.example.com").terminal
+    assert set(trie.find("dev.example.com").children) == {"a", "b", "c"}
+    assert trie.find("x.dev.example.com") is None
+
+def test_zone_counts_orders_by_size_then_name():
+    trie = build_trie()
+    assert trie.zone_counts("example.com") == [
+        ("dev.example.com", 4), ("api.example.com", 3), ("www.example.com", 1)
+    ]
+    assert trie.zone_counts("example.com", depth=2) == [
+        ("a.dev.example.com", 1), ("b.dev.example.com", 1), ("c.dev.example.com", 1),
+        ("v1.api.example.com", 1), ("v2.api.example.com", 1),
+    ]
+    assert trie.zone_counts("missing.example.com") == []
+
+def test_intermediate_zones_without_a_stored_name():
+    trie = build_trie(["a.b.c.example.com"])
+    assert trie.count("c.example.com") == 1
+    assert not trie.find("c.example.com").terminal
+    assert trie.zone_counts("example.com") == [("c.example.com", 1)]
+
+class FakeTable:
+    """Stored subdomains of one domain as (id, name) rows, with the queries the index makes."""
+
+    def __init__(self, monkeypatch):
+        self.rows = []
+        self.builds = 0
+        self.fetched_after = []
+        monkeypatch.setattr(subdomain_index, "backfill_reversed_subdomains", self.backfill)
+        monkeypatch.setattr(subdomain_index, "get_reversed_subdomains", self.reversed_after)
+        monkeypatch.setattr(subdomain_index, "count_subdomains", self.count)
+
+    def backfill(self, domain):
+        self.builds += 1
+
+    def reversed_after(self, domain, after_id=0):
+        self.fetched_after.append(after_id)
+        return [(row_id, Subdomain.reverse_labels(name)) for row_id, name in sorted(self.rows) if row_id > after_id]
+
+    def count(self, domain, max_id=None):
+        return sum(1 for row_id, _ in self.rows if max_id is None or row_id <= max_id)
+
+def test_index_takes_in_new_rows_without_rebuilding(monkeypatch):
+    table = FakeTable(monkeypatch)
+    table.rows = [(1, "api.example.com"), (2, "dev.example.com")]
+    index = subdomain_index.SubdomainIndex()
+    assert index.read("example.com", lambda trie: trie.count("example.com")) == 2
+
+    table.rows.append((5, "a.dev.example.com"))
+    assert index.read("example.com", lambda trie: trie.count("dev.example.com")) == 2
+    assert table.builds == 1
+    assert table.fetched_after == [0, 2]
+
+def test_index_rebuilds_when_a_row_commits_below_the_newest_id(monkeypatch):
+    table = FakeTable(monkeypatch)
+    table.rows = [(1, "api.example.com"), (3, "dev.example.com")]
+    index = subdomain_index.SubdomainIndex()
+    index.read("example.com", lambda trie: trie.size)
+
+    table.rows.append((2, "www.example.com"))
+    assert index.read("example.com", lambda trie: trie.count("www.example.com")) == 1
+    assert table.builds == 2